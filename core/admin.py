@@ -1,16 +1,109 @@
 from django.contrib import admin
+from django.core.paginator import Paginator
+from django.db import connections
+from django.urls import reverse
+from django.utils.functional import cached_property
+from django.utils.html import format_html
 
 from .models import Game, Cell
+from .sharding import db_for
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator counting the unfiltered changelists from the planner statistics.
+
+    On Postgres, the number of rows of an unfiltered table is the `reltuples`
+    estimate of `pg_class` instead of a `COUNT(*)` over the whole table. The
+    filtered changelists, the other databases and the tables estimated under
+    `EXACT_COUNT_LIMIT` rows are counted exactly.
+    """
+
+    EXACT_COUNT_LIMIT = 100_000
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        connection = connections[queryset.db]
+        if not queryset.query.where and connection.vendor == "postgresql":
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "SELECT reltuples FROM pg_class WHERE oid = %s::regclass",
+                    [queryset.model._meta.db_table],
+                )
+                row = cursor.fetchone()
+            if row is not None and row[0] >= self.EXACT_COUNT_LIMIT:
+                return int(row[0])
+        return super().count
+
+
+def render_cells(game, cells):
+    """
+    Return the rows of a board with every mine shown.
+
+    Hidden cells are `.` or `#` for the mines, flagged cells `F`, revealed
+    mines `*` and the other revealed cells their number of adjacent mines.
+
+    Args:
+        game (Game): The game of the cells.
+        cells (iterable): The row, column, is_mine, is_revealed, is_flagged
+            and adjacent_mines values of the cells.
+    """
+    board = [["."] * game.columns for _ in range(game.rows)]
+    for row, column, is_mine, is_revealed, is_flagged, adjacent_mines in cells:
+        if is_flagged:
+            symbol = "F"
+        elif not is_revealed:
+            symbol = "#" if is_mine else "."
+        else:
+            symbol = "*" if is_mine else str(adjacent_mines)
+        board[row][column] = symbol
+    return ["".join(row) for row in board]
 
 
 @admin.register(Game)
 class GameAdmin(admin.ModelAdmin):
-    list_display = ("id", "status", "mode")
+    list_display = ("id", "user", "status", "mode", "rows", "columns", "created_at")
+    list_filter = ("status", "mode")
+    readonly_fields = ("board", "cells_link")
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    @admin.display(description="Board")
+    def board(self, game):
+        """Render the cells of the game, read with one query."""
+        if game.id is None:
+            return "-"
+        cells = (
+            Cell.objects.using(db_for(game))
+            .filter(game_id=game.id)
+            .values_list(
+                "row",
+                "column",
+                "is_mine",
+                "is_revealed",
+                "is_flagged",
+                "adjacent_mines",
+            )
+        )
+        return format_html(
+            '<pre style="line-height: 1.2">{}</pre>',
+            "\n".join(render_cells(game, cells)),
+        )
+
+    @admin.display(description="Cells")
+    def cells_link(self, game):
+        if game.id is None:
+            return "-"
+        url = reverse("admin:core_cell_changelist")
+        return format_html('<a href="{}?game__id__exact={}">Cells</a>', url, game.id)
 
 
 @admin.register(Cell)
 class CellAdmin(admin.ModelAdmin):
     list_display = (
+        "id",
+        "game",
         "row",
         "column",
         "is_revealed",
@@ -18,3 +111,7 @@ class CellAdmin(admin.ModelAdmin):
         "is_mine",
         "adjacent_mines",
     )
+    list_select_related = ("game",)
+    raw_id_fields = ("game",)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
@@ -0,0 +1,162 @@
+"""
+Rollups of the finished games for the analytics.
+
+Every finished game is counted, in the background, in the hourly and daily
+`GameRollup` of its mode, so the analytics endpoint reads a few rollup rows
+instead of scanning the games. The `analytics_recorded` flag of the games
+makes the update idempotent, and `manage.py rebuild_rollups` recomputes every
+rollup from the games.
+"""
+
+from datetime import timezone
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, transaction
+
+from .models import GameRollup, GameStatus, RollupPeriod
+from .sharding import db_for, game_queryset, games_on
+from .tasks import enqueue, task
+
+
+def period_start(moment, period):
+    """Return the start, in UTC, of the hour or the day of a moment."""
+    moment = moment.astimezone(timezone.utc).replace(minute=0, second=0, microsecond=0)
+    if period == RollupPeriod.DAY:
+        moment = moment.replace(hour=0)
+    return moment
+
+
+def _finished_at(game):
+    return game.finished_at or game.updated_at
+
+
+def enqueue_rollup_update(game):
+    """Count a finished game in the rollups once the game is committed."""
+    if not game.is_active() and not game.analytics_recorded:
+        enqueue(update_rollups, game.id, using=db_for(game))
+
+
+@task
+def update_rollups(game_id):
+    """Count a finished game in the hourly and daily rollups of its mode."""
+    games = game_queryset(game_id)
+    with transaction.atomic(using=games.db), transaction.atomic(using=DEFAULT_DB_ALIAS):
+        game = games.select_for_update().get(id=game_id)
+        if game.is_active() or game.analytics_recorded:
+            return
+        for period in RollupPeriod.values:
+            rollup, _ = GameRollup.objects.select_for_update().get_or_create(
+                period=period,
+                start=period_start(_finished_at(game), period),
+                mode=game.mode,
+            )
+            rollup.add_game(game)
+            rollup.save()
+        games.filter(id=game_id).update(analytics_recorded=True)
+
+
+def rebuild_rollups(chunk_size=1000):
+    """
+    Recompute every rollup from the finished games of every shard.
+
+    The games are streamed in chunks and only the rollups are kept in memory.
+    Games finishing while the rollups are rebuilt may not be counted.
+
+    Args:
+        chunk_size (int): The number of games fetched at once.
+
+    Returns:
+        int: The number of games counted.
+    """
+    rollups = {}
+    counted = 0
+    for shard in settings.GAME_SHARDS:
+        games = (
+            games_on(shard)
+            .exclude(status=GameStatus.ACTIVE)
+            .only("status", "mode", "duration", "finished_at", "updated_at")
+            .iterator(chunk_size=chunk_size)
+        )
+        for game in games:
+            for period in RollupPeriod.values:
+                start = period_start(_finished_at(game), period)
+                key = (period, start, game.mode)
+                rollup = rollups.get(key)
+                if rollup is None:
+                    rollup = rollups[key] = GameRollup(
+                        period=period, start=start, mode=game.mode
+                    )
+                rollup.add_game(game)
+            counted += 1
+
+    with transaction.atomic(using=DEFAULT_DB_ALIAS):
+        GameRollup.objects.all().delete()
+        GameRollup.objects.bulk_create(rollups.values(), batch_size=chunk_size)
+    for shard in settings.GAME_SHARDS:
+        games_on(shard).exclude(status=GameStatus.ACTIVE).filter(
+            analytics_recorded=False
+        ).update(analytics_recorded=True)
+    return counted
+
+
+def duration_percentile(histogram, percent):
+    """
+    Estimate a duration percentile from a rollup histogram.
+
+    The duration is interpolated linearly inside the bucket holding the
+    percentile, and the lower bound of the last bucket is returned for the
+    games longer than every bound.
+
+    Args:
+        histogram (list): The game counts of the `GameRollup.DURATION_BUCKETS`.
+        percent (float): The percentile, between 0 and 100.
+
+    Returns:
+        float: The estimated duration in seconds, or None without games.
+    """
+    total = sum(histogram)
+    if not total:
+        return None
+    rank = percent / 100 * total
+    bounds = GameRollup.DURATION_BUCKETS
+    cumulative = 0
+    lower = 0
+    for index, count in enumerate(histogram):
+        if index == len(bounds):
+            return float(lower)
+        upper = bounds[index]
+        if count and cumulative + count >= rank:
+            return lower + (upper - lower) * (rank - cumulative) / count
+        cumulative += count
+        lower = upper
+    return float(lower)
+
+
+def total_rollups(rollups, start):
+    """
+    Sum rollups by mode.
+
+    Args:
+        rollups (iterable): The rollups to sum.
+        start (datetime): The start of the summed range.
+
+    Returns:
+        dict: An unsaved `GameRollup` summing the rollups of each mode.
+    """
+    totals = {}
+    for rollup in rollups:
+        total = totals.get(rollup.mode)
+        if total is None:
+            total = totals[rollup.mode] = GameRollup(
+                period=rollup.period,
+                start=start,
+                mode=rollup.mode,
+                duration_histogram=[0] * (len(GameRollup.DURATION_BUCKETS) + 1),
+            )
+        total.games += rollup.games
+        total.wins += rollup.wins
+        total.losses += rollup.losses
+        total.duration_sum += rollup.duration_sum
+        for index, count in enumerate(rollup.duration_histogram):
+            total.duration_histogram[index] += count
+    return totals
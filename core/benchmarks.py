@@ -0,0 +1,204 @@
+"""
+Benchmarks of the GameService hot paths.
+
+Every case is made of a setup, which is not measured, and a run. The boards
+are generated from a seed so the runs can be compared between changes.
+"""
+
+import random
+import statistics
+import tracemalloc
+from time import perf_counter
+
+from django.db import close_old_connections, connection
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from minesweeper.instrumentation import RequestTimer
+
+from .models import Cell, Game, GameMode, GameStatus
+from .serializers import GAME_CONFIG
+from .services import GameService
+from .sharding import all_games, db_for
+
+LEADERBOARD_GAMES_PER_MODE = 200
+BULK_GAMES = 50
+
+
+def parse_board(name):
+    """
+    Return the rows, columns and mines of a board.
+
+    Args:
+        name (str): A game mode (`easy`, `medium`, `hard`) or a custom size
+            like `40x40` or `40x40x300`.
+
+    Returns:
+        tuple: The rows, columns and mines of the board.
+    """
+    if name in GAME_CONFIG:
+        config = GAME_CONFIG[name]
+        return config["rows"], config["columns"], config["mines"]
+    sizes = [int(size) for size in name.split("x")]
+    rows, columns = sizes[:2]
+    mines = sizes[2] if len(sizes) > 2 else rows * columns * 15 // 100
+    return rows, columns, mines
+
+
+def _create_game(rows, columns, mines, initialize=True):
+    game = Game.objects.create(
+        rows=rows, columns=columns, mines=mines, mode=GameMode.CUSTOM
+    )
+    if initialize:
+        GameService.initialize_cells(game)
+    return game
+
+
+def initialize_cells(rows, columns, mines):
+    game = _create_game(rows, columns, mines, initialize=False)
+    return lambda: GameService.initialize_cells(game)
+
+
+def initialize_no_guess(rows, columns, mines):
+    game = Game.objects.create(
+        rows=rows, columns=columns, mines=mines, mode=GameMode.CUSTOM, no_guess=True
+    )
+    return lambda: GameService.initialize_cells(game)
+
+
+def bulk_create(rows, columns, mines):
+    """Create the games of a tournament of BULK_GAMES players, one board each."""
+    config = {"rows": rows, "columns": columns, "mines": mines, "mode": GameMode.CUSTOM}
+    users = [f"player{index}" for index in range(BULK_GAMES)]
+    return lambda: GameService.create_games(users, config, shared_layout=False)
+
+
+def reveal_flood(rows, columns, mines):
+    """Reveal the whole board at once: a single mine, clicking far from it."""
+    game = _create_game(rows, columns, 1)
+    mine = Cell.objects.using(db_for(game)).get(game=game, is_mine=True)
+    row = 0 if mine.row >= rows / 2 else rows - 1
+    column = 0 if mine.column >= columns / 2 else columns - 1
+    return lambda: GameService.reveal_cell(game, row, column)
+
+
+def toggle_flag(rows, columns, mines):
+    game = _create_game(rows, columns, mines)
+    return lambda: GameService.toggle_flag(game, rows // 2, columns // 2)
+
+
+def reveal_all_cells(rows, columns, mines):
+    game = _create_game(rows, columns, mines)
+    return lambda: GameService._reveal_all_cells(game)
+
+
+def leaderboard(rows, columns, mines):
+    if not all_games(lambda games: games.filter(status=GameStatus.WON)[:1]):
+        for mode in GameMode.values:
+            for _ in range(LEADERBOARD_GAMES_PER_MODE):
+                Game.objects.create(
+                    rows=rows,
+                    columns=columns,
+                    mines=mines,
+                    mode=mode,
+                    status=GameStatus.WON,
+                    duration=random.uniform(1, 1000),
+                )
+    client = APIClient()
+    url = reverse("game-leaderboard")
+    return lambda: client.get(url)
+
+
+def request_cycle(rows, columns, mines):
+    """
+    Retrieve a game releasing the connection after the request, like a server.
+
+    Comparing runs with and without `DB_POOL`, or with `DB_CONN_MAX_AGE=0`,
+    shows the cost of opening a database connection on each request.
+    """
+    game = _create_game(rows, columns, mines)
+    client = APIClient()
+    url = reverse("game-detail", args=[game.id])
+
+    def run():
+        close_old_connections()
+        client.get(url)
+        close_old_connections()
+
+    return run
+
+
+CASES = {
+    "initialize_cells": initialize_cells,
+    "initialize_no_guess": initialize_no_guess,
+    "bulk_create": bulk_create,
+    "reveal_flood": reveal_flood,
+    "toggle_flag": toggle_flag,
+    "reveal_all_cells": reveal_all_cells,
+    "leaderboard": leaderboard,
+    "request_cycle": request_cycle,
+}
+BOARD_INDEPENDENT_CASES = {"leaderboard"}
+
+
+def measure(case, board, repeat, seed):
+    """
+    Measure a case on a board.
+
+    The case is timed `repeat` times, then run once more to count the queries
+    and the peak of memory allocated, which would skew the timings. A case
+    failing on a board is reported with its error instead of its timings.
+
+    Returns:
+        dict: The result of the case.
+    """
+    rows, columns, mines = parse_board(board)
+    result = {
+        "case": case,
+        "board": board,
+        "rows": rows,
+        "columns": columns,
+        "mines": mines,
+        "repeat": repeat,
+    }
+    try:
+        result.update(_measure(case, rows, columns, mines, repeat, seed))
+    except Exception as error:
+        result["error"] = repr(error)
+    return result
+
+
+def _measure(case, rows, columns, mines, repeat, seed):
+    timings = []
+    for iteration in range(repeat):
+        random.seed(seed + iteration)
+        run = CASES[case](rows, columns, mines)
+        start = perf_counter()
+        run()
+        timings.append(perf_counter() - start)
+
+    random.seed(seed)
+    run = CASES[case](rows, columns, mines)
+    timer = RequestTimer()
+    tracemalloc.start()
+    try:
+        with connection.execute_wrapper(timer.query_wrapper):
+            run()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "time_min_s": min(timings),
+        "time_median_s": statistics.median(timings),
+        "time_max_s": max(timings),
+        "queries": timer.queries,
+        "peak_memory_kb": round(peak / 1024, 1),
+    }
+
+
+def run_benchmarks(cases, boards, repeat, seed):
+    """Yield the result of every case on every board."""
+    for case in cases:
+        for board in boards[:1] if case in BOARD_INDEPENDENT_CASES else boards:
+            yield measure(case, board, repeat, seed)
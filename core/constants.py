@@ -2,6 +2,7 @@ CANNOT_FLAG_REVEALED_CELL = "Cannot flag a revealed cell"
 CELL_ALREADY_REVEALED = "Cell already revealed"
 CELL_NOT_FOUND = "Cell not found"
 GAME_NOT_ACTIVE = "Game is not active"
+INVALID_REPLAY_START = "The from param must be a positive number of moves"
 MINES_MUST_BE_SMALLER_THAN_CELLS = (
     "Number of mines must be smaller than number of cells"
 )
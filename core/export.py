@@ -0,0 +1,114 @@
+"""
+Streaming export of the finished games.
+
+The games are read from the read replicas of every shard with
+`iterator(chunk_size=...)`, which uses server-side cursors on Postgres, and
+written as NDJSON, one game per line, optionally gzip compressed. Only one
+chunk of games is held in memory at a time, whatever the number of games.
+"""
+
+import json
+import zlib
+from itertools import islice
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import DEFAULT_DB_ALIAS
+
+from minesweeper.routers import replica_reads
+
+from .models import Cell, Game, GameStatus
+from .sharding import games_on
+
+GAME_FIELDS = (
+    "id",
+    "user",
+    "mode",
+    "status",
+    "rows",
+    "columns",
+    "mines",
+    "no_guess",
+    "created_at",
+    "finished_at",
+    "duration",
+)
+
+
+def _board(game, cells):
+    """Return the rows of a board, `*` for the mines and the adjacent mines otherwise."""
+    board = [["0"] * game["columns"] for _ in range(game["rows"])]
+    for row, column, is_mine, adjacent_mines in cells:
+        board[row][column] = "*" if is_mine else str(adjacent_mines)
+    return ["".join(row) for row in board]
+
+
+def _with_boards(games, db):
+    """Add the board of every game of a chunk, with one query."""
+    cells = {}
+    rows = (
+        Cell.objects.using(db)
+        .filter(game_id__in=[game["id"] for game in games])
+        .values_list("game_id", "row", "column", "is_mine", "adjacent_mines")
+    )
+    for game_id, *cell in rows:
+        cells.setdefault(game_id, []).append(cell)
+    for game in games:
+        game["board"] = _board(game, cells.get(game["id"], ()))
+    return games
+
+
+def _read_db(shard):
+    """Return the database to read a shard from, a replica for the default one."""
+    if shard != DEFAULT_DB_ALIAS:
+        return shard
+    with replica_reads():
+        return games_on(shard).db
+
+
+def export_games(since=None, until=None, mode=None, boards=False, chunk_size=500):
+    """
+    Yield the finished games of every shard.
+
+    Args:
+        since (datetime): Only the games finished since then.
+        until (datetime): Only the games finished before then.
+        mode (str): Only the games of this mode.
+        boards (bool): Add the mines and adjacent mines of the cells.
+        chunk_size (int): The number of games fetched at once.
+
+    Yields:
+        dict: The fields of a game.
+    """
+    for shard in settings.GAME_SHARDS:
+        db = _read_db(shard)
+        games = Game.objects.using(db).exclude(status=GameStatus.ACTIVE)
+        if since is not None:
+            games = games.filter(finished_at__gte=since)
+        if until is not None:
+            games = games.filter(finished_at__lt=until)
+        if mode is not None:
+            games = games.filter(mode=mode)
+        games = (
+            games.order_by("id").values(*GAME_FIELDS).iterator(chunk_size=chunk_size)
+        )
+        while chunk := list(islice(games, chunk_size)):
+            if boards:
+                _with_boards(chunk, db)
+            yield from chunk
+
+
+def ndjson(records):
+    """Yield every record as a JSON line."""
+    for record in records:
+        yield (json.dumps(record, cls=DjangoJSONEncoder) + "\n").encode()
+
+
+def gzip_stream(chunks, level=6):
+    """Compress a stream of bytes in the gzip format."""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
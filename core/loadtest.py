@@ -0,0 +1,285 @@
+"""
+Load generation with simulated players.
+
+Each player creates games and plays them to completion through the game API,
+using a simple solver, while the latency of every request is recorded. The
+requests refused by the rate limits are counted apart from the errors, and
+sent again once their `Retry-After` delay has passed, up to
+`THROTTLED_RETRIES` times.
+"""
+
+import json
+import math
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from time import perf_counter, sleep
+from urllib.error import HTTPError
+from urllib.parse import urljoin
+from urllib.request import Request, urlopen
+
+from django.db import connections
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from .models import GameStatus
+
+THROTTLED_RETRIES = 3
+
+
+class Throttled(Exception):
+    """A request refused by the rate limits."""
+
+    def __init__(self, retry_after):
+        super().__init__(retry_after)
+        self.retry_after = retry_after
+
+
+def _retry_after(value):
+    """Return the seconds of a `Retry-After` header, 1 if it is missing."""
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 1.0
+
+
+class InProcessClient:
+    """Send the requests through the Django test client."""
+
+    def __init__(self):
+        self.client = APIClient(raise_request_exception=False)
+
+    def post(self, path, data):
+        response = self.client.post(path, data, format="json")
+        if response.status_code == 429:
+            raise Throttled(_retry_after(response.get("Retry-After")))
+        if response.status_code >= 500:
+            return response.status_code, None
+        return response.status_code, response.json()
+
+
+class HttpClient:
+    """Send the requests to a running server."""
+
+    def __init__(self, base_url, timeout=30):
+        self.base_url = base_url
+        self.timeout = timeout
+
+    def post(self, path, data):
+        request = Request(
+            urljoin(self.base_url, path),
+            data=json.dumps(data).encode(),
+            headers={"Content-Type": "application/json"},
+            method="POST",
+        )
+        try:
+            with urlopen(request, timeout=self.timeout) as response:
+                return response.status, json.loads(response.read())
+        except HTTPError as error:
+            if error.code == 429:
+                raise Throttled(_retry_after(error.headers.get("Retry-After")))
+            return error.code, None
+
+
+class Recorder:
+    """Record the latency and status of the requests of every endpoint."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = {}
+        self.errors = {}
+        self.throttled = {}
+
+    def call(self, endpoint, function, *args):
+        """
+        Send a request, retrying it after its delay while it is throttled.
+
+        Returns:
+            tuple: The status and the data of the response, with a 429 status
+                if the request is still throttled after `THROTTLED_RETRIES`
+                retries.
+        """
+        for attempt in range(THROTTLED_RETRIES + 1):
+            start = perf_counter()
+            try:
+                status, data = function(*args)
+            except Throttled as throttled:
+                with self.lock:
+                    self.throttled[endpoint] = self.throttled.get(endpoint, 0) + 1
+                if attempt < THROTTLED_RETRIES:
+                    sleep(throttled.retry_after)
+                continue
+            except OSError:
+                status, data = None, None
+            elapsed = perf_counter() - start
+            with self.lock:
+                self.latencies.setdefault(endpoint, []).append(elapsed)
+                if status is None or status >= 400:
+                    self.errors[endpoint] = self.errors.get(endpoint, 0) + 1
+            return status, data
+        return 429, None
+
+    def report(self, duration):
+        """
+        Summarize the recorded requests.
+
+        Args:
+            duration (float): The wall time of the load test in seconds.
+
+        Returns:
+            dict: The throughput and latency percentiles of every endpoint,
+                without the throttled requests, which are only counted.
+        """
+        endpoints = {}
+        for endpoint in sorted(self.latencies.keys() | self.throttled.keys()):
+            latencies = sorted(self.latencies.get(endpoint, []))
+            endpoints[endpoint] = {
+                "requests": len(latencies),
+                "errors": self.errors.get(endpoint, 0),
+                "throttled": self.throttled.get(endpoint, 0),
+                "rps": round(len(latencies) / duration, 2),
+                "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+                "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+                "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+            }
+        total = sum(endpoint["requests"] for endpoint in endpoints.values())
+        return {
+            "duration_s": round(duration, 3),
+            "requests": total,
+            "rps": round(total / duration, 2),
+            "endpoints": endpoints,
+        }
+
+
+def percentile(values, percent):
+    """Return the nearest-rank percentile of sorted values."""
+    if not values:
+        return 0.0
+    rank = max(math.ceil(percent / 100 * len(values)), 1)
+    return values[rank - 1]
+
+
+def next_move(board, rng):
+    """
+    Choose the next move on a board with single cell deductions.
+
+    A hidden neighbor of a revealed number is safe when the number is already
+    satisfied by flags, and is a mine when the number needs all of them.
+    Without deductions a random hidden cell is revealed.
+
+    Args:
+        board (dict): The cells of the game by (row, column).
+        rng (Random): The random generator used to guess.
+
+    Returns:
+        tuple: The action (`reveal` or `flag`) and the (row, column) of the cell.
+    """
+    hidden = []
+    for (row, column), cell in board.items():
+        if cell["is_revealed"] or cell["is_flagged"]:
+            continue
+        hidden.append((row, column))
+    for (row, column), cell in board.items():
+        if not cell["is_revealed"] or not cell["adjacent_mines"]:
+            continue
+        unknown = []
+        flagged = 0
+        for neighbor_row in range(row - 1, row + 2):
+            for neighbor_column in range(column - 1, column + 2):
+                neighbor = board.get((neighbor_row, neighbor_column))
+                if neighbor is None or neighbor["is_revealed"]:
+                    continue
+                if neighbor["is_flagged"]:
+                    flagged += 1
+                else:
+                    unknown.append((neighbor_row, neighbor_column))
+        if not unknown:
+            continue
+        if flagged == cell["adjacent_mines"]:
+            return "reveal", unknown[0]
+        if flagged + len(unknown) == cell["adjacent_mines"]:
+            return "flag", unknown[0]
+    return "reveal", rng.choice(hidden)
+
+
+def _index_cells(cells):
+    return {(cell["row"], cell["column"]): cell for cell in cells}
+
+
+def play_game(client, recorder, mode, rng):
+    """
+    Create a game and play it until it is won or lost.
+
+    Returns:
+        str: The final status of the game, or None if a request failed.
+    """
+    status, game = recorder.call(
+        "game-list", client.post, reverse("game-list"), {"mode": mode}
+    )
+    if status != 201:
+        return None
+    reveal_url = reverse("game-reveal", args=[game["id"]])
+    flag_url = reverse("game-flag", args=[game["id"]])
+    board = _index_cells(game["cells"])
+
+    while True:
+        action, (row, column) = next_move(board, rng)
+        data = {"row": row, "column": column}
+        if action == "flag":
+            status, cell = recorder.call("game-flag", client.post, flag_url, data)
+            if status != 200:
+                return None
+            board[(row, column)] = cell
+            continue
+
+        status, game = recorder.call("game-reveal", client.post, reveal_url, data)
+        if status != 200:
+            return None
+        if game["status"] != GameStatus.ACTIVE:
+            return game["status"]
+        board = _index_cells(game["cells"])
+
+
+def _run_player(client_factory, recorder, mode, games, seed):
+    rng = random.Random(seed)
+    client = client_factory()
+    outcomes = []
+    try:
+        for _ in range(games):
+            outcomes.append(play_game(client, recorder, mode, rng))
+    finally:
+        connections.close_all()
+    return outcomes
+
+
+def run_load(client_factory, players, games, mode, seed=0):
+    """
+    Run `players` simulated players concurrently, each playing `games` games.
+
+    Args:
+        client_factory (callable): Return a new client for each player.
+        players (int): The number of concurrent players.
+        games (int): The number of games played by each player.
+        mode (str): The mode of the created games.
+        seed (int): The seed of the players guesses.
+
+    Returns:
+        dict: The report of the recorded requests and the game outcomes.
+    """
+    recorder = Recorder()
+    start = perf_counter()
+    with ThreadPoolExecutor(max_workers=players) as executor:
+        futures = [
+            executor.submit(
+                _run_player, client_factory, recorder, mode, games, seed + player
+            )
+            for player in range(players)
+        ]
+        outcomes = [outcome for future in futures for outcome in future.result()]
+    report = recorder.report(perf_counter() - start)
+    report["games"] = {
+        "won": outcomes.count(GameStatus.WON),
+        "lost": outcomes.count(GameStatus.LOST),
+        "failed": outcomes.count(None),
+    }
+    return report
@@ -0,0 +1,42 @@
+from itertools import islice
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from core.models import PlayerStats
+from core.sharding import games_on
+from core.stats import record_games, unrecorded_games
+
+
+class Command(BaseCommand):
+    help = (
+        "Count the finished games which are not in the player stats yet, in "
+        "chunks. With --reset the stats are rebuilt from every game."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=1000)
+        parser.add_argument(
+            "--reset",
+            action="store_true",
+            help="Delete the stats and count every finished game again.",
+        )
+
+    def handle(self, *args, **options):
+        if options["reset"]:
+            self._reset()
+
+        games = unrecorded_games(options["chunk_size"])
+        total = 0
+        while chunk := list(islice(games, options["chunk_size"])):
+            total += record_games(chunk)
+            self.stdout.write(f"{total} games counted")
+        self.stdout.write(self.style.SUCCESS(f"Done, {total} games counted."))
+
+    @staticmethod
+    def _reset():
+        with transaction.atomic():
+            PlayerStats.objects.all().delete()
+            for shard in settings.GAME_SHARDS:
+                games_on(shard).filter(stats_recorded=True).update(stats_recorded=False)
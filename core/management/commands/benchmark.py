@@ -0,0 +1,80 @@
+import json
+import platform
+
+import django
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from core.benchmarks import CASES, parse_board, run_benchmarks
+from core.management.utils import isolated_test_environment
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark the GameService hot paths on seeded boards and report time, "
+        "query count and peak memory as JSON. Runs against test databases "
+        "created from the configured DATABASE_URL."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--cases",
+            default=",".join(CASES),
+            help=f"Comma separated cases to run (default: {','.join(CASES)}).",
+        )
+        parser.add_argument(
+            "--boards",
+            default="easy,medium,hard,24x24,32x32",
+            help="Comma separated boards: a mode or a custom ROWSxCOLUMNS[xMINES].",
+        )
+        parser.add_argument("--repeat", type=int, default=5)
+        parser.add_argument("--seed", type=int, default=42)
+        parser.add_argument("--output", help="Write the JSON report to this file.")
+        parser.add_argument("--keepdb", action="store_true")
+
+    def handle(self, *args, **options):
+        cases = options["cases"].split(",")
+        unknown = set(cases) - set(CASES)
+        if unknown:
+            raise CommandError(f"Unknown cases: {', '.join(sorted(unknown))}")
+        boards = options["boards"].split(",")
+        try:
+            for board in boards:
+                parse_board(board)
+        except ValueError:
+            raise CommandError(f"Invalid board: {board}")
+
+        with isolated_test_environment(keepdb=options["keepdb"]):
+            results = []
+            for result in run_benchmarks(
+                cases, boards, options["repeat"], options["seed"]
+            ):
+                self.stderr.write(self._format(result))
+                results.append(result)
+            report = {
+                "database": connection.vendor,
+                "python": platform.python_version(),
+                "django": django.get_version(),
+                "conn_max_age": connection.settings_dict["CONN_MAX_AGE"],
+                "pool": bool(connection.settings_dict["OPTIONS"].get("pool")),
+                "seed": options["seed"],
+                "results": results,
+            }
+
+        output = json.dumps(report, indent=2)
+        if options["output"]:
+            with open(options["output"], "w") as report_file:
+                report_file.write(output)
+        else:
+            self.stdout.write(output)
+
+    @staticmethod
+    def _format(result):
+        name = f"{result['case']:<18} {result['board']:<10}"
+        if "error" in result:
+            return f"{name} failed: {result['error']}"
+        return (
+            f"{name} {result['time_median_s'] * 1000:>10.2f} ms "
+            f"{result['queries']:>6} queries "
+            f"{result['peak_memory_kb']:>10.1f} KiB"
+        )
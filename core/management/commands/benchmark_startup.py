@@ -0,0 +1,122 @@
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Run in a fresh interpreter for each sample, so the imports are cold
+STARTUP_SCRIPT = """
+import json
+import os
+import sys
+from time import perf_counter
+from wsgiref.util import setup_testing_defaults
+
+start = perf_counter()
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "minesweeper.settings")
+from minesweeper.wsgi import application
+from minesweeper.warmup import warm_up
+
+loaded = perf_counter()
+if sys.argv[1] == "warm":
+    warm_up(databases=False)
+warmed = perf_counter()
+
+
+def request():
+    environ = {
+        "REQUEST_METHOD": "OPTIONS",
+        "PATH_INFO": "/api/games/",
+        "HTTP_HOST": sys.argv[2],
+    }
+    setup_testing_defaults(environ)
+    begin = perf_counter()
+    b"".join(application(environ, lambda status, headers: None))
+    return perf_counter() - begin
+
+
+first_request = request()
+second_request = request()
+print(json.dumps({
+    "load_s": loaded - start,
+    "warm_up_s": warmed - loaded,
+    "first_request_s": first_request,
+    "second_request_s": second_request,
+}))
+"""
+
+TIMINGS = ("load_s", "warm_up_s", "first_request_s", "second_request_s")
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark the startup of a worker, cold and warmed up: the time to load "
+        "the WSGI application, to warm it up and to serve the first requests, "
+        "each sample in a fresh interpreter. Reports the medians as JSON."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--repeat", type=int, default=5)
+        parser.add_argument("--output", help="Write the JSON report to this file.")
+
+    def handle(self, *args, **options):
+        host = next(
+            (host for host in settings.ALLOWED_HOSTS if "*" not in host), "localhost"
+        )
+        environ = {**os.environ, "THROTTLE_ENABLED": "False"}
+        results = []
+        for mode in ("cold", "warm"):
+            samples = [
+                self._sample(mode, host, environ) for _ in range(options["repeat"])
+            ]
+            result = {"mode": mode}
+            for timing in TIMINGS:
+                result[f"{timing[:-2]}_median_s"] = statistics.median(
+                    sample[timing] for sample in samples
+                )
+            result["ready_median_s"] = statistics.median(
+                sum(sample[timing] for timing in TIMINGS[:3]) for sample in samples
+            )
+            self.stderr.write(self._format(result))
+            results.append(result)
+
+        report = {
+            "python": platform.python_version(),
+            "django": django.get_version(),
+            "repeat": options["repeat"],
+            "results": results,
+        }
+        output = json.dumps(report, indent=2)
+        if options["output"]:
+            with open(options["output"], "w") as report_file:
+                report_file.write(output)
+        else:
+            self.stdout.write(output)
+
+    @staticmethod
+    def _sample(mode, host, environ):
+        process = subprocess.run(
+            [sys.executable, "-c", STARTUP_SCRIPT, mode, host],
+            capture_output=True,
+            text=True,
+            env=environ,
+            cwd=settings.BASE_DIR,
+        )
+        if process.returncode:
+            raise CommandError(process.stderr)
+        return json.loads(process.stdout.splitlines()[-1])
+
+    @staticmethod
+    def _format(result):
+        return (
+            f"{result['mode']:<5} "
+            f"load {result['load_median_s'] * 1000:>8.1f} ms "
+            f"warm-up {result['warm_up_median_s'] * 1000:>7.1f} ms "
+            f"first request {result['first_request_median_s'] * 1000:>7.1f} ms "
+            f"second request {result['second_request_median_s'] * 1000:>6.1f} ms"
+        )
@@ -0,0 +1,48 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_datetime
+
+from core.export import export_games, gzip_stream, ndjson
+from core.models import GameMode
+
+
+def _datetime(value):
+    moment = parse_datetime(value)
+    if moment is None:
+        raise CommandError(f"Invalid date: {value}")
+    return moment
+
+
+class Command(BaseCommand):
+    help = (
+        "Export the finished games as NDJSON, one game per line, to a file or "
+        "to the standard output."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--since", type=_datetime)
+        parser.add_argument("--until", type=_datetime)
+        parser.add_argument("--mode", choices=GameMode.values)
+        parser.add_argument("--boards", action="store_true")
+        parser.add_argument("--gzip", action="store_true")
+        parser.add_argument("--output", help="The file to write, stdout by default.")
+        parser.add_argument("--chunk-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        chunks = ndjson(
+            export_games(
+                since=options["since"],
+                until=options["until"],
+                mode=options["mode"],
+                boards=options["boards"],
+                chunk_size=options["chunk_size"],
+            )
+        )
+        if options["gzip"]:
+            chunks = gzip_stream(chunks)
+        if options["output"]:
+            with open(options["output"], "wb") as output:
+                output.writelines(chunks)
+        else:
+            sys.stdout.buffer.writelines(chunks)
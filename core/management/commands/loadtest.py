@@ -0,0 +1,67 @@
+import json
+from contextlib import nullcontext
+
+from django.core.management.base import BaseCommand
+
+from core.loadtest import HttpClient, InProcessClient, run_load
+from core.management.utils import isolated_test_environment
+from core.models import GameMode
+
+
+class Command(BaseCommand):
+    help = (
+        "Simulate concurrent players creating and playing games, and report the "
+        "requests per second and the latency percentiles of every endpoint. "
+        "Without --url the requests go through the in-process test client, "
+        "against test databases created from DATABASE_URL."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--players", type=int, default=4)
+        parser.add_argument("--games", type=int, default=5, help="Games per player.")
+        parser.add_argument(
+            "--mode",
+            default=GameMode.EASY,
+            choices=(GameMode.EASY, GameMode.MEDIUM, GameMode.HARD),
+        )
+        parser.add_argument(
+            "--url", help="Base URL of a running server, e.g. http://localhost:8000"
+        )
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--json", action="store_true", help="Output JSON.")
+
+    def handle(self, *args, **options):
+        if options["url"]:
+            environment = nullcontext()
+            client_factory = lambda: HttpClient(options["url"])  # noqa: E731
+        else:
+            environment = isolated_test_environment()
+            client_factory = InProcessClient
+
+        with environment:
+            report = run_load(
+                client_factory,
+                options["players"],
+                options["games"],
+                options["mode"],
+                options["seed"],
+            )
+
+        if options["json"]:
+            self.stdout.write(json.dumps(report, indent=2))
+            return
+
+        self.stdout.write(
+            f"{report['requests']} requests in {report['duration_s']} s "
+            f"({report['rps']} req/s), games: {report['games']}"
+        )
+        self.stdout.write(
+            f"{'endpoint':<12} {'requests':>9} {'errors':>7} {'throttled':>9} "
+            f"{'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}"
+        )
+        for endpoint, stats in report["endpoints"].items():
+            self.stdout.write(
+                f"{endpoint:<12} {stats['requests']:>9} {stats['errors']:>7} "
+                f"{stats['throttled']:>9} {stats['rps']:>9} {stats['p50_ms']:>9} "
+                f"{stats['p95_ms']:>9} {stats['p99_ms']:>9}"
+            )
@@ -0,0 +1,49 @@
+import io
+import pstats
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = "Summarize the hottest functions across the collected request profiles."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dir",
+            default=settings.PROFILING_DIR,
+            help="Directory with the .prof dumps (default: PROFILING_DIR).",
+        )
+        parser.add_argument(
+            "--limit", type=int, default=20, help="Number of functions to show."
+        )
+        parser.add_argument(
+            "--sort",
+            default="cumulative",
+            choices=("cumulative", "tottime", "calls"),
+            help="Sort key of the functions.",
+        )
+        parser.add_argument(
+            "--match",
+            default="",
+            help="Only use the dumps whose file name contains this text.",
+        )
+
+    def handle(self, *args, **options):
+        dumps = sorted(
+            path
+            for path in Path(options["dir"]).glob("*.prof")
+            if options["match"] in path.name
+        )
+        if not dumps:
+            raise CommandError(f"No profile dumps found in {options['dir']}")
+
+        output = io.StringIO()
+        stats = pstats.Stats(str(dumps[0]), stream=output)
+        for path in dumps[1:]:
+            stats.add(str(path))
+        stats.strip_dirs().sort_stats(options["sort"]).print_stats(options["limit"])
+
+        self.stdout.write(f"{len(dumps)} profile dumps")
+        self.stdout.write(output.getvalue())
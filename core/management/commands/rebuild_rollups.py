@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from core.analytics import rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the hourly and daily analytics rollups from the finished "
+        "games. Games finishing during the rebuild may not be counted."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        counted = rebuild_rollups(options["chunk_size"])
+        self.stdout.write(self.style.SUCCESS(f"Done, {counted} games counted."))
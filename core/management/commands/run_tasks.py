@@ -0,0 +1,94 @@
+import logging
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, transaction
+from django.db.models import F, Q
+from django.utils.timezone import now
+
+from core.models import Task, TaskStatus
+from core.tasks import load_task
+
+logger = logging.getLogger("minesweeper.tasks")
+
+LEASE_EXPIRED = "The lease of the task expired before it finished"
+
+
+class Command(BaseCommand):
+    help = "Run the tasks queued in the database by the `database` task backend."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--burst", action="store_true", help="Exit once the queue is empty."
+        )
+        parser.add_argument(
+            "--sleep",
+            type=float,
+            default=1,
+            help="Seconds to wait when the queue is empty.",
+        )
+        parser.add_argument("--batch-size", type=int, default=10)
+
+    def handle(self, *args, **options):
+        while True:
+            close_old_connections()
+            tasks = self._claim(options["batch_size"])
+            if not tasks:
+                if options["burst"]:
+                    return
+                time.sleep(options["sleep"])
+                continue
+            for queued_task in tasks:
+                self._run(queued_task)
+
+    @staticmethod
+    def _claim(batch_size):
+        """
+        Mark the next pending tasks as running, skipping the ones locked.
+
+        A running task is leased for `TASK_LEASE_SECONDS`: once the lease has
+        expired, its worker is presumed dead and the task is claimed again, or
+        failed if it has been attempted `TASK_MAX_ATTEMPTS` times.
+        """
+        expired = now() - timedelta(seconds=settings.TASK_LEASE_SECONDS)
+        with transaction.atomic():
+            Task.objects.filter(
+                status=TaskStatus.RUNNING,
+                updated_at__lt=expired,
+                attempts__gte=settings.TASK_MAX_ATTEMPTS,
+            ).update(status=TaskStatus.FAILED, error=LEASE_EXPIRED, updated_at=now())
+            tasks = list(
+                Task.objects.select_for_update(skip_locked=True)
+                .filter(
+                    Q(status=TaskStatus.PENDING)
+                    | Q(status=TaskStatus.RUNNING, updated_at__lt=expired)
+                )
+                .order_by("id")[:batch_size]
+            )
+            Task.objects.filter(
+                id__in=[queued_task.id for queued_task in tasks]
+            ).update(
+                status=TaskStatus.RUNNING,
+                attempts=F("attempts") + 1,
+                updated_at=now(),
+            )
+        return tasks
+
+    @staticmethod
+    def _run(queued_task):
+        """Run a task, deleting it on success and retrying it on failure."""
+        try:
+            load_task(queued_task.name)(*queued_task.args)
+        except Exception as error:
+            logger.exception("Task %s failed", queued_task)
+            attempts = queued_task.attempts + 1
+            status = TaskStatus.PENDING
+            if attempts >= settings.TASK_MAX_ATTEMPTS:
+                status = TaskStatus.FAILED
+            Task.objects.filter(id=queued_task.id).update(
+                status=status, error=repr(error), updated_at=now()
+            )
+            return
+        Task.objects.filter(id=queued_task.id).delete()
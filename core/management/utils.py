@@ -0,0 +1,60 @@
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+
+from django.db import connections
+from django.test.utils import (
+    override_settings,
+    setup_databases,
+    setup_test_environment,
+    teardown_databases,
+    teardown_test_environment,
+)
+
+from core.movelog import buffer
+from core.tasks import ThreadBackend, _get_backend, get_backend
+from minesweeper.test_runner import TEST_SETTINGS
+
+
+def finish_background_work():
+    """Run the pending tasks and write the buffered moves of the process."""
+    backend = get_backend()
+    if isinstance(backend, ThreadBackend):
+        backend.executor.shutdown(wait=True)
+        _get_backend.cache_clear()
+    buffer.flush()
+
+
+@contextmanager
+def isolated_test_environment(keepdb=False, verbosity=0):
+    """
+    Run the block in the test environment, against fresh test databases.
+
+    The databases are created the same way `manage.py test` creates them, so
+    commands generating load never touch the data of the configured databases,
+    and the in-process test client can be used. The rate limits are turned off
+    as in the tests, so they are not measured instead of the API. SQLite test
+    databases are created as temporary files rather than in memory, so they
+    can be written from several threads.
+
+    Args:
+        keepdb (bool): Keep the test databases between runs.
+        verbosity (int): Verbosity of the database creation.
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        for connection in connections.all():
+            test_settings = connection.settings_dict.setdefault("TEST", {})
+            if connection.vendor == "sqlite" and not test_settings.get("NAME"):
+                test_settings["NAME"] = str(
+                    Path(directory, f"{connection.alias}.sqlite3")
+                )
+
+        setup_test_environment()
+        old_config = setup_databases(verbosity, interactive=False, keepdb=keepdb)
+        try:
+            with override_settings(**TEST_SETTINGS):
+                yield
+        finally:
+            finish_background_work()
+            teardown_databases(old_config, verbosity, keepdb=keepdb)
+            teardown_test_environment()
@@ -0,0 +1,368 @@
+"""
+In-process metrics registry exported in the Prometheus text format.
+
+Each process keeps its samples in memory. When `METRICS_DIR` is set, every
+process also writes a snapshot of its samples to that directory at most every
+`METRICS_FLUSH_INTERVAL` seconds, and the export merges the snapshots of all
+processes, so the numbers are the same whichever gunicorn worker serves them.
+The gauges of the processes which are no longer running are left out.
+"""
+
+import atexit
+import contextlib
+import json
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger("minesweeper.metrics")
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels):
+    labels = list(labels)
+    if not labels:
+        return ""
+    pairs = ",".join(f'{name}="{_escape(value)}"' for name, value in labels)
+    return "{" + pairs + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+
+def _is_alive(process_id):
+    """Return True if the process of a snapshot is still running."""
+    pid = int(process_id.split("-")[0])
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class Metric:
+    """Base class of the metrics, holding one sample per set of label values."""
+
+    kind = None
+    live_only = False
+
+    def __init__(self, registry, name, documentation, labelnames=()):
+        self.registry = registry
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.samples = {}
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def merge(self, samples, other):
+        """Merge the `other` serialized samples into `samples`."""
+        raise NotImplementedError
+
+    def render(self, samples):
+        """Return the Prometheus text lines of the given samples."""
+        raise NotImplementedError
+
+
+class Counter(Metric):
+    """A monotonically increasing value."""
+
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self.registry.lock:
+            self.samples[key] = self.samples.get(key, 0) + amount
+        self.registry.maybe_flush()
+
+    def merge(self, samples, other):
+        for key, value in other.items():
+            samples[key] = samples.get(key, 0) + value
+
+    def render(self, samples):
+        for key, value in sorted(samples.items()):
+            labels = _format_labels(zip(self.labelnames, key))
+            yield f"{self.name}{labels} {_format_value(value)}"
+
+
+class Gauge(Metric):
+    """A value which can go up and down, summed across the live processes."""
+
+    kind = "gauge"
+    live_only = True
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self.registry.lock:
+            self.samples[key] = value
+
+    merge = Counter.merge
+    render = Counter.render
+
+
+class Histogram(Metric):
+    """Count observations in buckets and keep their sum."""
+
+    kind = "histogram"
+
+    def __init__(self, registry, name, documentation, buckets, labelnames=()):
+        super().__init__(registry, name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self.registry.lock:
+            sample = self.samples.get(key)
+            if sample is None:
+                sample = self.samples[key] = [0] * len(self.buckets) + [0.0]
+            sample[index] += 1
+            sample[-1] += value
+        self.registry.maybe_flush()
+
+    def merge(self, samples, other):
+        for key, value in other.items():
+            if key in samples:
+                samples[key] = [a + b for a, b in zip(samples[key], value)]
+            else:
+                samples[key] = list(value)
+
+    def render(self, samples):
+        for key, sample in sorted(samples.items()):
+            labels = list(zip(self.labelnames, key))
+            cumulative = 0
+            for bound, count in zip(self.buckets, sample):
+                cumulative += count
+                bucket_labels = _format_labels(labels + [("le", _format_value(bound))])
+                yield f"{self.name}_bucket{bucket_labels} {cumulative}"
+            yield f"{self.name}_sum{_format_labels(labels)} {_format_value(sample[-1])}"
+            yield f"{self.name}_count{_format_labels(labels)} {cumulative}"
+
+
+class MetricsRegistry:
+    """Hold the metrics of the process and export them."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.metrics = {}
+        self.collectors = []
+        self.process_id = f"{os.getpid()}-{time.time_ns()}"
+        self._flush_lock = threading.Lock()
+        self._last_flush = time.monotonic()
+        atexit.register(self.flush)
+
+    def reset(self):
+        """Clear the samples and start a new snapshot, in a forked process."""
+        with self.lock:
+            self.process_id = f"{os.getpid()}-{time.time_ns()}"
+            for metric in self.metrics.values():
+                metric.samples.clear()
+        # A thread of the parent process may have been flushing when it forked
+        self._flush_lock = threading.Lock()
+        self._last_flush = time.monotonic()
+
+    def _register(self, metric):
+        self.metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._register(Counter(self, name, documentation, labelnames))
+
+    def histogram(self, name, documentation, buckets, labelnames=()):
+        return self._register(Histogram(self, name, documentation, buckets, labelnames))
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self._register(Gauge(self, name, documentation, labelnames))
+
+    def add_collector(self, collector):
+        """Register a function updating gauges, called before each snapshot."""
+        self.collectors.append(collector)
+        return collector
+
+    def snapshot(self):
+        """Return the samples of this process in a JSON serializable form."""
+        for collector in self.collectors:
+            try:
+                collector()
+            except Exception:
+                logger.exception("Metrics collector %s failed", collector.__name__)
+        with self.lock:
+            return {
+                name: [[list(key), value] for key, value in metric.samples.items()]
+                for name, metric in self.metrics.items()
+            }
+
+    def _snapshot_path(self):
+        return Path(settings.METRICS_DIR) / f"{self.process_id}.json"
+
+    def maybe_flush(self):
+        """
+        Flush the snapshot if `METRICS_FLUSH_INTERVAL` seconds have passed.
+
+        The flush is skipped if another thread is flushing already.
+        """
+        if time.monotonic() - self._last_flush < settings.METRICS_FLUSH_INTERVAL:
+            return
+        if not self._flush_lock.acquire(blocking=False):
+            return
+        try:
+            self._flush()
+        finally:
+            self._flush_lock.release()
+
+    def flush(self):
+        """Write the snapshot of this process to `METRICS_DIR`, if configured."""
+        with self._flush_lock:
+            self._flush()
+
+    def _flush(self):
+        """Write the snapshot, logging the failures instead of raising them."""
+        self._last_flush = time.monotonic()
+        if not settings.METRICS_DIR:
+            return
+        path = self._snapshot_path()
+        temporary = path.with_name(f"{path.stem}.{threading.get_ident()}.tmp")
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            temporary.write_text(json.dumps(self.snapshot()))
+            os.replace(temporary, path)
+        except Exception:
+            logger.exception("Failed to flush the metrics to %s", path)
+            with contextlib.suppress(OSError):
+                temporary.unlink(missing_ok=True)
+
+    def _snapshots(self):
+        """Yield the snapshots of every process, and whether it is alive."""
+        yield self.snapshot(), True
+        if not settings.METRICS_DIR:
+            return
+        own_path = self._snapshot_path()
+        for path in Path(settings.METRICS_DIR).glob("*.json"):
+            if path == own_path:
+                continue
+            try:
+                yield json.loads(path.read_text()), _is_alive(path.stem)
+            except (OSError, ValueError):
+                continue
+
+    def collect(self):
+        """Return the samples of every metric merged across processes."""
+        merged = {name: {} for name in self.metrics}
+        for snapshot, alive in self._snapshots():
+            for name, samples in snapshot.items():
+                metric = self.metrics.get(name)
+                if metric is None or (metric.live_only and not alive):
+                    continue
+                samples = {tuple(key): value for key, value in samples}
+                metric.merge(merged[name], samples)
+        return merged
+
+    def render(self):
+        """Return every metric in the Prometheus text exposition format."""
+        lines = []
+        for name, samples in self.collect().items():
+            metric = self.metrics[name]
+            lines.append(f"# HELP {name} {metric.documentation}")
+            lines.append(f"# TYPE {name} {metric.kind}")
+            lines.extend(metric.render(samples))
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+ACTION_DURATION = registry.histogram(
+    "minesweeper_action_duration_seconds",
+    "Duration of the game API actions.",
+    LATENCY_BUCKETS,
+    labelnames=("action", "mode"),
+)
+BOARD_CELLS = registry.histogram(
+    "minesweeper_board_cells",
+    "Number of cells of the created boards.",
+    (81, 256, 480, 1000, 2500, 5000, 10000, 25000, 65025),
+    labelnames=("mode",),
+)
+BOARD_GENERATION_DURATION = registry.histogram(
+    "minesweeper_board_generation_duration_seconds",
+    "Duration of the generation of the board layouts.",
+    LATENCY_BUCKETS,
+    labelnames=("mode", "kind"),
+)
+BOARD_GENERATION_ATTEMPTS = registry.histogram(
+    "minesweeper_board_generation_attempts",
+    "Number of layouts generated for a board.",
+    (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000),
+    labelnames=("mode", "kind"),
+)
+NO_GUESS_FALLBACKS = registry.counter(
+    "minesweeper_no_guess_fallbacks_total",
+    "Number of no-guess boards which fell back to a random layout.",
+    labelnames=("mode",),
+)
+CELLS_OPENED = registry.histogram(
+    "minesweeper_cells_opened",
+    "Number of cells opened by a single reveal.",
+    (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500),
+    labelnames=("mode",),
+)
+GAMES_FINISHED = registry.counter(
+    "minesweeper_games_finished_total",
+    "Number of finished games.",
+    labelnames=("mode", "status"),
+)
+THROTTLED_REQUESTS = registry.counter(
+    "minesweeper_throttled_requests_total",
+    "Number of requests rejected by the rate limits.",
+    labelnames=("scope",),
+)
+COMPRESSION_SAVED_BYTES = registry.counter(
+    "minesweeper_compression_saved_bytes_total",
+    "Number of response bytes saved by the compression.",
+    labelnames=("encoding",),
+)
+COMPRESSION_CPU_SECONDS = registry.histogram(
+    "minesweeper_compression_cpu_seconds",
+    "CPU time spent compressing a response.",
+    (0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1),
+    labelnames=("encoding",),
+)
+
+DB_POOL_CONNECTIONS = registry.gauge(
+    "minesweeper_db_pool_connections",
+    "State of the database connection pools.",
+    labelnames=("database", "stat"),
+)
+
+
+@registry.add_collector
+def collect_pool_stats():
+    """Update the gauges of the connection pools of this process."""
+    if not settings.DB_POOL:
+        return
+    for alias in settings.DATABASES:
+        pool = getattr(connections[alias], "pool", None)
+        if pool is None:
+            continue
+        for stat, value in pool.get_stats().items():
+            DB_POOL_CONNECTIONS.set(value, database=alias, stat=stat)
@@ -0,0 +1,17 @@
+# Generated by Django 5.1.3 on 2026-10-19 01:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("core", "0003_task"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="game",
+            name="no_guess",
+            field=models.BooleanField(default=False),
+        ),
+    ]
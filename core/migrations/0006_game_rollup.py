@@ -0,0 +1,62 @@
+# Generated by Django 5.1.3 on 2026-10-19 01:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("core", "0005_player_stats"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="game",
+            name="analytics_recorded",
+            field=models.BooleanField(default=False),
+        ),
+        migrations.CreateModel(
+            name="GameRollup",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "period",
+                    models.CharField(
+                        choices=[("hour", "Hour"), ("day", "Day")], max_length=4
+                    ),
+                ),
+                ("start", models.DateTimeField()),
+                (
+                    "mode",
+                    models.CharField(
+                        choices=[
+                            ("easy", "Easy"),
+                            ("medium", "Medium"),
+                            ("hard", "Hard"),
+                            ("custom", "Custom"),
+                        ],
+                        max_length=10,
+                    ),
+                ),
+                ("games", models.PositiveIntegerField(default=0)),
+                ("wins", models.PositiveIntegerField(default=0)),
+                ("losses", models.PositiveIntegerField(default=0)),
+                ("duration_sum", models.FloatField(default=0)),
+                ("duration_histogram", models.JSONField(default=list)),
+            ],
+            options={
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("period", "start", "mode"), name="unique_rollup"
+                    )
+                ],
+            },
+        ),
+    ]
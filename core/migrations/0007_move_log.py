@@ -0,0 +1,80 @@
+# Generated by Django 5.1.3 on 2026-10-19 01:34
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("core", "0006_game_rollup"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="BoardSnapshot",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("moves", models.PositiveIntegerField()),
+                ("board", models.BinaryField()),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                (
+                    "game",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="snapshots",
+                        to="core.game",
+                    ),
+                ),
+            ],
+            options={
+                "unique_together": {("game", "moves")},
+            },
+        ),
+        migrations.CreateModel(
+            name="Move",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "action",
+                    models.PositiveSmallIntegerField(
+                        choices=[(1, "Reveal"), (2, "Flag")]
+                    ),
+                ),
+                ("row", models.PositiveSmallIntegerField()),
+                ("column", models.PositiveSmallIntegerField()),
+                ("played_at", models.DateTimeField()),
+                (
+                    "game",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="moves",
+                        to="core.game",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["game", "played_at", "id"],
+                        name="core_move_game_id_653baa_idx",
+                    )
+                ],
+            },
+        ),
+    ]
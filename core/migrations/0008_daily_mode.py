@@ -0,0 +1,41 @@
+# Generated by Django 5.1.3 on 2026-10-19 01:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("core", "0007_move_log"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="game",
+            name="mode",
+            field=models.CharField(
+                choices=[
+                    ("easy", "Easy"),
+                    ("medium", "Medium"),
+                    ("hard", "Hard"),
+                    ("custom", "Custom"),
+                    ("daily", "Daily challenge"),
+                ],
+                default="easy",
+                max_length=10,
+            ),
+        ),
+        migrations.AlterField(
+            model_name="gamerollup",
+            name="mode",
+            field=models.CharField(
+                choices=[
+                    ("easy", "Easy"),
+                    ("medium", "Medium"),
+                    ("hard", "Hard"),
+                    ("custom", "Custom"),
+                    ("daily", "Daily challenge"),
+                ],
+                max_length=10,
+            ),
+        ),
+    ]
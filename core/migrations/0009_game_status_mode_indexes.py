@@ -0,0 +1,22 @@
+# Generated by Django 5.1.3 on 2026-10-19 01:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("core", "0008_daily_mode"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="game",
+            index=models.Index(
+                fields=["status", "id"], name="core_game_status_30a694_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="game",
+            index=models.Index(fields=["mode", "id"], name="core_game_mode_194509_idx"),
+        ),
+    ]
@@ -1,3 +1,5 @@
+from bisect import bisect_left
+
 from django.db import models
 from django.utils.timezone import now
 
@@ -13,6 +15,7 @@ class GameMode(models.TextChoices):
     MEDIUM = "medium", "Medium"
     HARD = "hard", "Hard"
     CUSTOM = "custom", "Custom"
+    DAILY = "daily", "Daily challenge"
 
 
 class Game(models.Model):
@@ -34,29 +37,138 @@ class Game(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
     finished_at = models.DateTimeField(null=True, blank=True)
     duration = models.FloatField(null=True, blank=True)
+    no_guess = models.BooleanField(default=False)
+    stats_recorded = models.BooleanField(default=False)
+    analytics_recorded = models.BooleanField(default=False)
 
     def is_active(self):
         return self.status == GameStatus.ACTIVE
 
+    def save(self, *args, **kwargs):
+        """Place new games on their shard when the games are sharded."""
+        from .sharding import allocate_game_id, is_sharded, shard_for
+
+        if self._state.adding and self.id is None and is_sharded():
+            self.id = allocate_game_id()
+            kwargs["using"] = shard_for(self.id)
+        super().save(*args, **kwargs)
+
     def end_game(self, status):
         self.status = status
         self.finished_at = now()
         self.duration = (self.finished_at - self.created_at).total_seconds()
         self.save()
 
+    class Meta:
+        indexes = [
+            models.Index(fields=("status", "id")),
+            models.Index(fields=("mode", "id")),
+        ]
+
     def __str__(self):
         return f"Game {self.id}"
 
 
+class PlayerStats(models.Model):
+    """The statistics of a player, updated once for each of their finished games."""
+
+    user = models.CharField(max_length=20, unique=True)
+    games = models.PositiveIntegerField(default=0)
+    wins = models.PositiveIntegerField(default=0)
+    losses = models.PositiveIntegerField(default=0)
+    current_streak = models.PositiveIntegerField(default=0)
+    best_streak = models.PositiveIntegerField(default=0)
+    best_times = models.JSONField(default=dict)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def add_game(self, game):
+        """Count a finished game of the player."""
+        self.games += 1
+        if game.status != GameStatus.WON:
+            self.losses += 1
+            self.current_streak = 0
+            return
+        self.wins += 1
+        self.current_streak += 1
+        self.best_streak = max(self.best_streak, self.current_streak)
+        best_time = self.best_times.get(game.mode)
+        if game.duration is not None and (
+            best_time is None or game.duration < best_time
+        ):
+            self.best_times[game.mode] = game.duration
+
+    @property
+    def win_rate(self):
+        return self.wins / self.games if self.games else 0.0
+
+    def __str__(self):
+        return f"Stats of {self.user}"
+
+
+class RollupPeriod(models.TextChoices):
+    HOUR = "hour", "Hour"
+    DAY = "day", "Day"
+
+
+class GameRollup(models.Model):
+    """The finished games of a mode during an hour or a day."""
+
+    period = models.CharField(max_length=4, choices=RollupPeriod.choices)
+    start = models.DateTimeField()
+    mode = models.CharField(max_length=10, choices=GameMode.choices)
+    games = models.PositiveIntegerField(default=0)
+    wins = models.PositiveIntegerField(default=0)
+    losses = models.PositiveIntegerField(default=0)
+    duration_sum = models.FloatField(default=0)
+    duration_histogram = models.JSONField(default=list)
+
+    # Upper bounds in seconds of the duration histogram buckets, the last
+    # bucket counting the longer games.
+    DURATION_BUCKETS = (10, 30, 60, 120, 300, 600, 1800, 3600)
+
+    def add_game(self, game):
+        """Count a finished game of the mode in the rollup."""
+        if not self.duration_histogram:
+            self.duration_histogram = [0] * (len(self.DURATION_BUCKETS) + 1)
+        self.games += 1
+        if game.status == GameStatus.WON:
+            self.wins += 1
+        else:
+            self.losses += 1
+        if game.duration is not None:
+            self.duration_sum += game.duration
+            self.duration_histogram[
+                bisect_left(self.DURATION_BUCKETS, game.duration)
+            ] += 1
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=("period", "start", "mode"), name="unique_rollup"
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.mode} games of the {self.period} of {self.start}"
+
+
+class GameSequence(models.Model):
+    """Allocate the ids of the games when they are sharded across databases."""
+
+
 class CellManager(models.Manager):
     def get_neighbors(self, cell):
-        return self.filter(
-            game=cell.game,
-            row__gte=cell.row - 1,
-            row__lte=cell.row + 1,
-            column__gte=cell.column - 1,
-            column__lte=cell.column + 1,
-        ).exclude(id=cell.id)
+        return (
+            self.using(cell._state.db)
+            .filter(
+                game=cell.game,
+                row__gte=cell.row - 1,
+                row__lte=cell.row + 1,
+                column__gte=cell.column - 1,
+                column__lte=cell.column + 1,
+            )
+            .exclude(id=cell.id)
+        )
 
 
 class Cell(models.Model):
@@ -79,4 +191,69 @@ class Cell(models.Model):
         unique_together = ("game", "row", "column")
 
     def __str__(self):
-        return f"Cell {self.row}x{self.column} - Game {self.game.id}"
+        return f"Cell {self.row}x{self.column} - Game {self.game_id}"
+
+
+class MoveAction(models.IntegerChoices):
+    REVEAL = 1, "Reveal"
+    FLAG = 2, "Flag"
+
+
+class Move(models.Model):
+    """A reveal or a flag played on a game, in the append-only move log."""
+
+    game = models.ForeignKey(Game, related_name="moves", on_delete=models.CASCADE)
+    action = models.PositiveSmallIntegerField(choices=MoveAction.choices)
+    row = models.PositiveSmallIntegerField()
+    column = models.PositiveSmallIntegerField()
+    played_at = models.DateTimeField()
+
+    class Meta:
+        indexes = [models.Index(fields=("game", "played_at", "id"))]
+
+    def __str__(self):
+        return f"{self.get_action_display()} {self.row}x{self.column} - Game {self.game_id}"
+
+
+class BoardSnapshot(models.Model):
+    """The state of the cells of a game after its first `moves` moves."""
+
+    game = models.ForeignKey(Game, related_name="snapshots", on_delete=models.CASCADE)
+    moves = models.PositiveIntegerField()
+    # One byte per cell, see `core.movelog` for the flags.
+    board = models.BinaryField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ("game", "moves")
+
+    def __str__(self):
+        return f"Snapshot {self.moves} - Game {self.game_id}"
+
+
+class TaskStatus(models.TextChoices):
+    PENDING = "pending", "Pending"
+    RUNNING = "running", "Running"
+    FAILED = "failed", "Failed"
+
+
+class Task(models.Model):
+    """A background task queued by the `database` task backend."""
+
+    name = models.CharField(max_length=200)
+    args = models.JSONField(default=list)
+    status = models.CharField(
+        max_length=10,
+        choices=TaskStatus.choices,
+        default=TaskStatus.PENDING,
+    )
+    attempts = models.PositiveSmallIntegerField(default=0)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [models.Index(fields=("status", "id"))]
+
+    def __str__(self):
+        return f"Task {self.id} - {self.name}"
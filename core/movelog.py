@@ -0,0 +1,314 @@
+"""
+Append-only log of the moves of the games.
+
+The reveals and flags processed by `GameService` are buffered in the process
+once committed, and written with one bulk insert per database when
+`MOVE_LOG_BATCH_SIZE` moves are buffered, `MOVE_LOG_FLUSH_INTERVAL` seconds
+after the first buffered move, or when a game ends, off the request path.
+
+Every `MOVE_SNAPSHOT_INTERVAL` moves of a game, a `BoardSnapshot` stores the
+state of its cells, computed by replaying the logged moves on the previous
+snapshot. Only the moves played more than `MOVE_SNAPSHOT_DELAY` seconds ago are
+snapshotted: the buffers of the other processes may still hold more recent
+moves, which would otherwise be missing from the snapshot. A state is then
+rebuilt from the closest snapshot instead of the first move. Each cell of a
+board state is one byte of `REVEALED` and `FLAGGED` flags.
+"""
+
+import atexit
+import logging
+import threading
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils.timezone import now
+
+from .models import BoardSnapshot, Cell, Move, MoveAction
+from .sharding import db_for, game_queryset
+from .solver import neighbors_table
+from .tasks import enqueue, task
+
+logger = logging.getLogger("minesweeper.movelog")
+
+REVEALED = 1
+FLAGGED = 2
+
+
+class MoveBuffer:
+    """Buffer the moves of the process and write them in batches."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.moves = []
+        self.timer = None
+
+    def add(self, move, db):
+        with self.lock:
+            self.moves.append((db, move))
+            full = len(self.moves) >= settings.MOVE_LOG_BATCH_SIZE
+            if not full and self.timer is None:
+                self._start_timer(settings.MOVE_LOG_FLUSH_INTERVAL)
+        if full:
+            self._flush_soon()
+
+    def _start_timer(self, interval):
+        if self.timer is not None:
+            self.timer.cancel()
+        self.timer = threading.Timer(interval, self._flush_in_background)
+        self.timer.daemon = True
+        self.timer.start()
+
+    def _flush_soon(self):
+        """
+        Flush a full buffer off the request path.
+
+        The flush is a background task, or runs on the timer thread with the
+        database task backend, whose tasks run in another process.
+        """
+        if settings.TASK_BACKEND != "database":
+            enqueue(flush_move_log)
+            return
+        with self.lock:
+            if self.timer is None or self.timer.interval:
+                self._start_timer(0)
+
+    def _flush_in_background(self):
+        close_old_connections()
+        try:
+            self.flush()
+        finally:
+            close_old_connections()
+
+    def flush(self):
+        """Write the buffered moves and take the snapshots which are due."""
+        with self.lock:
+            moves, self.moves = self.moves, []
+            if self.timer is not None:
+                self.timer.cancel()
+                self.timer = None
+        if not moves:
+            return
+        by_db = {}
+        for db, move in moves:
+            by_db.setdefault(db, []).append(move)
+        for db, db_moves in by_db.items():
+            try:
+                Move.objects.using(db).bulk_create(db_moves)
+            except Exception:
+                logger.exception("Failed to write %d moves to %s", len(db_moves), db)
+                continue
+            for game_id in {move.game_id for move in db_moves}:
+                try:
+                    take_snapshot(game_id)
+                except Exception:
+                    logger.exception("Failed to take a snapshot of game %s", game_id)
+
+
+buffer = MoveBuffer()
+atexit.register(buffer.flush)
+
+
+def record_move(game, action, row, column):
+    """
+    Log a move of a game once the current transaction is committed.
+
+    Args:
+        game (Game): The game instance.
+        action (MoveAction): The action of the move.
+        row (int): The row of the cell.
+        column (int): The column of the cell.
+    """
+    db = db_for(game)
+    move = Move(game_id=game.id, action=action, row=row, column=column, played_at=now())
+    transaction.on_commit(lambda: buffer.add(move, db), using=db)
+
+
+@task
+def flush_move_log():
+    """Write the moves buffered by this process."""
+    buffer.flush()
+
+
+def flush_moves(game):
+    """
+    Write the buffered moves in the background once the game is committed.
+
+    The buffer belongs to this process, so the flush is left to the flush timer
+    with the database task backend, whose tasks run in another process.
+    """
+    if settings.TASK_BACKEND != "database":
+        enqueue(flush_move_log, using=db_for(game))
+
+
+def _layout(game):
+    """Return the mines and the adjacent mines of every cell of a game."""
+    size = game.rows * game.columns
+    mines = bytearray(size)
+    counts = [0] * size
+    cells = (
+        Cell.objects.using(db_for(game))
+        .filter(game=game)
+        .values_list("row", "column", "is_mine", "adjacent_mines")
+    )
+    for row, column, is_mine, adjacent_mines in cells:
+        index = row * game.columns + column
+        mines[index] = is_mine
+        counts[index] = adjacent_mines
+    return mines, counts
+
+
+def apply_move(game, board, mines, counts, move):
+    """
+    Apply a move to a board state, like `GameService` applies it to the cells.
+
+    Args:
+        game (Game): The game of the board.
+        board (bytearray): The state of the cells, updated in place.
+        mines (bytearray): 1 for the mines.
+        counts (list): The number of adjacent mines of every cell.
+        move (Move): The move to apply.
+    """
+    index = move.row * game.columns + move.column
+    if move.action == MoveAction.FLAG:
+        board[index] ^= FLAGGED
+        return
+    if mines[index]:
+        board[index] |= REVEALED
+        return
+    board[index] &= ~FLAGGED
+    neighbors = neighbors_table(game.rows, game.columns)
+    stack = [index]
+    while stack:
+        index = stack.pop()
+        if board[index] & REVEALED:
+            continue
+        board[index] |= REVEALED
+        if not counts[index]:
+            stack.extend(neighbors[index])
+
+
+def _snapshot_before(game, position=None):
+    """Return the position and the board of the last snapshot before a move."""
+    snapshots = BoardSnapshot.objects.using(db_for(game)).filter(game=game)
+    if position is not None:
+        snapshots = snapshots.filter(moves__lte=position)
+    snapshot = snapshots.order_by("-moves").first()
+    if snapshot is None:
+        return 0, bytearray(game.rows * game.columns)
+    return snapshot.moves, bytearray(snapshot.board)
+
+
+def _logged_moves(game):
+    return (
+        Move.objects.using(db_for(game)).filter(game=game).order_by("played_at", "id")
+    )
+
+
+def initial_snapshot(game, revealed):
+    """
+    Return the unsaved snapshot of a game before its first move.
+
+    Args:
+        game (Game): The game instance.
+        revealed (iterable): The indexes of the cells revealed from the start.
+    """
+    board = bytearray(game.rows * game.columns)
+    for index in revealed:
+        board[index] = REVEALED
+    return BoardSnapshot(game=game, moves=0, board=bytes(board))
+
+
+def take_initial_snapshot(game, revealed):
+    """Store the state of a game before its first move."""
+    initial_snapshot(game, revealed).save(using=db_for(game))
+
+
+def take_snapshot(game_id):
+    """Store a snapshot of a game once enough moves are logged since the last one."""
+    game = game_queryset(game_id).get(id=game_id)
+    # Every process has written its moves played before the cutoff, so those
+    # moves are a prefix of the log which does not change any more
+    cutoff = now() - timedelta(seconds=settings.MOVE_SNAPSHOT_DELAY)
+    moves = _logged_moves(game).filter(played_at__lte=cutoff)
+    position, board = _snapshot_before(game)
+    if moves.count() - position < settings.MOVE_SNAPSHOT_INTERVAL:
+        return
+    layout = _layout(game)
+    for move in moves[position:]:
+        apply_move(game, board, *layout, move)
+        position += 1
+    BoardSnapshot.objects.using(db_for(game)).create(
+        game=game, moves=position, board=bytes(board)
+    )
+
+
+def board_at(game, position, layout):
+    """
+    Rebuild the state of the cells of a game after its first moves.
+
+    Args:
+        game (Game): The game instance.
+        position (int): The number of moves to apply.
+        layout (tuple): The mines and the adjacent mines of the game cells.
+
+    Returns:
+        bytearray: The state of every cell.
+    """
+    start, board = _snapshot_before(game, position)
+    if position > start:
+        for move in _logged_moves(game)[start:position]:
+            apply_move(game, board, *layout, move)
+    return board
+
+
+def render_board(game, board, layout):
+    """
+    Return the rows of a board state as text.
+
+    Hidden cells are `.`, flagged cells `F`, revealed mines `*` and the other
+    revealed cells their number of adjacent mines.
+    """
+    mines, counts = layout
+    rows = []
+    for row in range(game.rows):
+        cells = []
+        for index in range(row * game.columns, (row + 1) * game.columns):
+            if board[index] & FLAGGED:
+                cells.append("F")
+            elif not board[index] & REVEALED:
+                cells.append(".")
+            else:
+                cells.append("*" if mines[index] else str(counts[index]))
+        rows.append("".join(cells))
+    return rows
+
+
+def replay(game, start=0, chunk_size=500):
+    """
+    Yield the state of a game after `start` moves, then its following moves.
+
+    Args:
+        game (Game): The game instance.
+        start (int): The number of moves already played.
+        chunk_size (int): The number of moves fetched at once.
+
+    Yields:
+        dict: The board state first, then every move.
+    """
+    layout = _layout(game)
+    yield {
+        "game": game.id,
+        "rows": game.rows,
+        "columns": game.columns,
+        "moves": start,
+        "board": render_board(game, board_at(game, start, layout), layout),
+    }
+    moves = _logged_moves(game)[start:].iterator(chunk_size=chunk_size)
+    for move in moves:
+        yield {
+            "action": MoveAction(move.action).label.lower(),
+            "row": move.row,
+            "column": move.column,
+            "played_at": move.played_at.isoformat(),
+        }
@@ -1,19 +1,50 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils.timezone import now
 from rest_framework import serializers
 
+from minesweeper.instrumentation import timed
+
 from .constants import MINES_MUST_BE_SMALLER_THAN_CELLS, ROWS_COLS_MINES_REQUIRED
-from .models import Game, Cell, GameMode
+from .analytics import duration_percentile
+from .models import Game, Cell, GameMode, GameRollup, PlayerStats, RollupPeriod
 
 
 GAME_CONFIG = {
     "easy": {"rows": 9, "columns": 9, "mines": 10},
     "medium": {"rows": 16, "columns": 16, "mines": 40},
     "hard": {"rows": 30, "columns": 16, "mines": 99},
+    "daily": {"rows": 16, "columns": 16, "mines": 40},
 }
 
 
+def validate_board(data):
+    """
+    Set the board size of a game mode, or check the size of a custom board.
+
+    Raises:
+        ValidationError: If the custom board size is missing or invalid.
+    """
+    mode = data.get("mode")
+    if mode != GameMode.CUSTOM:
+        data.update(GAME_CONFIG[mode])
+        return data
+
+    rows = data.get("rows")
+    columns = data.get("columns")
+    mines = data.get("mines")
+    if not all((rows, columns, mines)):
+        raise serializers.ValidationError({"required": ROWS_COLS_MINES_REQUIRED})
+    if mines >= rows * columns:
+        raise serializers.ValidationError({"mines": MINES_MUST_BE_SMALLER_THAN_CELLS})
+    return data
+
+
 class CellSerializer(serializers.ModelSerializer):
     adjacent_mines = serializers.SerializerMethodField()
     is_mine = serializers.SerializerMethodField()
+    is_revealed = serializers.SerializerMethodField()
 
     class Meta:
         model = Cell
@@ -30,9 +61,18 @@ class CellSerializer(serializers.ModelSerializer):
             "is_mine": {"write_only": True},
         }
 
+    def get_is_revealed(self, obj):
+        """
+        Return True if the cell is revealed or the game is finished.
+
+        The cells of a finished game are revealed in the background, so they are
+        shown as revealed before that work is done.
+        """
+        return obj.is_revealed or not obj.game.is_active()
+
     def get_adjacent_mines(self, obj):
         """Return the number of adjacent mines only if the cell is revealed."""
-        if obj.is_revealed:
+        if self.get_is_revealed(obj):
             return obj.adjacent_mines
         return None
 
@@ -52,7 +92,7 @@ class GameSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Game
-        fields = "__all__"
+        exclude = ("stats_recorded", "analytics_recorded")
         read_only_fields = (
             "id",
             "status",
@@ -63,32 +103,119 @@ class GameSerializer(serializers.ModelSerializer):
             "duration",
         )
 
+    def to_representation(self, instance):
+        with timed("serialize"):
+            return super().to_representation(instance)
+
     def get_duration(self, obj):
         return obj.duration
 
     def validate(self, data):
         if self.instance is None:
-            mode = data.get("mode")
-            if mode != GameMode.CUSTOM:
-                data.update(GAME_CONFIG[mode])
-                return data
-
-            rows = data.get("rows")
-            columns = data.get("columns")
-            mines = data.get("mines")
-            if not all((rows, columns, mines)):
-                raise serializers.ValidationError(
-                    {"required": ROWS_COLS_MINES_REQUIRED}
-                )
-            if mines >= rows * columns:
-                raise serializers.ValidationError(
-                    {"mines": MINES_MUST_BE_SMALLER_THAN_CELLS}
-                )
-            return data
+            return validate_board(data)
+        # The board of a game is generated once, on creation.
+        data.pop("no_guess", None)
         return data
 
 
+class BulkGameSerializer(serializers.Serializer):
+    users = serializers.ListField(
+        child=serializers.CharField(max_length=20),
+        min_length=1,
+        max_length=settings.BULK_CREATE_MAX_GAMES,
+    )
+    mode = serializers.ChoiceField(GameMode.choices, default=GameMode.EASY)
+    rows = serializers.IntegerField(min_value=1, required=False)
+    columns = serializers.IntegerField(min_value=1, required=False)
+    mines = serializers.IntegerField(min_value=1, required=False)
+    no_guess = serializers.BooleanField(default=False)
+    shared_layout = serializers.BooleanField(default=True)
+
+    def validate(self, data):
+        return validate_board(data)
+
+
+class GameSummarySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Game
+        fields = ("id", "user", "mode", "rows", "columns", "mines", "no_guess")
+
+
 class LeaderboardGameSerializer(serializers.ModelSerializer):
     class Meta:
         model = Game
         fields = ("user", "mode", "duration", "finished_at")
+
+
+class PlayerStatsSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = PlayerStats
+        fields = (
+            "user",
+            "games",
+            "wins",
+            "losses",
+            "win_rate",
+            "current_streak",
+            "best_streak",
+            "best_times",
+        )
+
+
+class AnalyticsQuerySerializer(serializers.Serializer):
+    period = serializers.ChoiceField(RollupPeriod.choices, default=RollupPeriod.DAY)
+    mode = serializers.ChoiceField(GameMode.choices, required=False)
+    since = serializers.DateTimeField(required=False)
+    until = serializers.DateTimeField(required=False)
+
+    def validate(self, data):
+        data.setdefault("until", now())
+        data.setdefault("since", data["until"] - timedelta(days=30))
+        return data
+
+
+class ExportQuerySerializer(serializers.Serializer):
+    since = serializers.DateTimeField(required=False)
+    until = serializers.DateTimeField(required=False)
+    mode = serializers.ChoiceField(GameMode.choices, required=False)
+    boards = serializers.BooleanField(default=False)
+    gzip = serializers.BooleanField(default=False)
+
+
+class GameRollupSerializer(serializers.ModelSerializer):
+    win_rate = serializers.SerializerMethodField()
+    average_duration = serializers.SerializerMethodField()
+    duration_p50 = serializers.SerializerMethodField()
+    duration_p90 = serializers.SerializerMethodField()
+    duration_p99 = serializers.SerializerMethodField()
+
+    class Meta:
+        model = GameRollup
+        fields = (
+            "start",
+            "mode",
+            "games",
+            "wins",
+            "losses",
+            "win_rate",
+            "average_duration",
+            "duration_p50",
+            "duration_p90",
+            "duration_p99",
+        )
+
+    def get_win_rate(self, obj):
+        return obj.wins / obj.games if obj.games else 0.0
+
+    def get_average_duration(self, obj):
+        timed_games = sum(obj.duration_histogram)
+        return obj.duration_sum / timed_games if timed_games else None
+
+    def get_duration_p50(self, obj):
+        return duration_percentile(obj.duration_histogram, 50)
+
+    def get_duration_p90(self, obj):
+        return duration_percentile(obj.duration_histogram, 90)
+
+    def get_duration_p99(self, obj):
+        return duration_percentile(obj.duration_histogram, 99)
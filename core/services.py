@@ -1,11 +1,28 @@
-from random import sample
-
-from django.db import transaction
+import hashlib
+import hmac
+import random
+from functools import lru_cache
+from time import perf_counter
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.utils.timezone import now
 from rest_framework.status import HTTP_404_NOT_FOUND, HTTP_400_BAD_REQUEST, HTTP_200_OK
 
+from minesweeper.instrumentation import timed
+
+from . import metrics, solver
+from .analytics import enqueue_rollup_update
 from .constants import CANNOT_FLAG_REVEALED_CELL, CELL_ALREADY_REVEALED, CELL_NOT_FOUND
-from .models import Cell, GameStatus
-from .serializers import GameSerializer, CellSerializer
+from .models import BoardSnapshot, Cell, Game, GameMode, GameStatus, MoveAction
+from .movelog import flush_moves, initial_snapshot, record_move, take_initial_snapshot
+from .serializers import GAME_CONFIG, GameSerializer, CellSerializer
+from .sharding import allocate_game_ids, db_for, game_queryset, is_sharded, shard_for
+from .stats import enqueue_stats_update
+from .tasks import enqueue, task
+
+# The daily board is generated deterministically, without a time budget.
+DAILY_MAX_ATTEMPTS = 1000
 
 
 class GameService:
@@ -14,76 +31,182 @@ class GameService:
     @staticmethod
     def initialize_cells(game):
         """
-        Create the cells of the game, place the mines, and calculate adjacencies.
+        Generate the board of the game and create its cells.
+
+        No-guess games start with the opening around the start cell revealed.
 
         Args:
             game (Game): The game instance for which cells are being initialized.
         """
-        cells = GameService._create_cells(game)
-        GameService._place_mines(game, cells)
-        GameService._calculate_adjacencies(cells)
+        with timed("generation"):
+            no_guess = game.no_guess
+            layout, counts, revealed = GameService._board_for(game)
+            if game.no_guess != no_guess:
+                game.save(update_fields=["no_guess", "updated_at"])
+            Cell.objects.using(db_for(game)).bulk_create(
+                GameService._build_cells(game, layout, counts, revealed)
+            )
+            if revealed:
+                take_initial_snapshot(game, revealed)
+        metrics.BOARD_CELLS.observe(game.rows * game.columns, mode=game.mode)
 
     @staticmethod
-    def _create_cells(game):
+    def create_games(users, config, shared_layout):
         """
-        Create game cells using bulk_create to optimize database access.
+        Create a game for each user.
+
+        Each distinct board is generated once, and the games, their cells and
+        their snapshots are inserted with one bulk insert each per shard. The
+        no-guess boards share one `NO_GUESS_TIME_BUDGET`, after which the
+        remaining games are created as regular games.
 
         Args:
-            game (Game): The game instance for which cells are being created.
+            users (list): The users of the games.
+            config (dict): The mode, rows, columns, mines and no_guess of the games.
+            shared_layout (bool): Give every game the same board.
 
         Returns:
-            QuerySet: A queryset of the created cells.
+            list: The created games, in the order of the users.
+        """
+        games = [Game(user=user, **config) for user in users]
+        with timed("generation"):
+            if shared_layout or games[0].mode == GameMode.DAILY:
+                boards = [GameService._board_for(games[0])] * len(games)
+                for game in games[1:]:
+                    game.no_guess = games[0].no_guess
+            else:
+                deadline = perf_counter() + settings.NO_GUESS_TIME_BUDGET
+                boards = [GameService._board_for(game, deadline) for game in games]
+            GameService._insert_games(games, boards)
+        for game in games:
+            metrics.BOARD_CELLS.observe(game.rows * game.columns, mode=game.mode)
+        return games
+
+    @staticmethod
+    def _insert_games(games, boards):
+        """
+        Insert games and their boards with bulk inserts on each shard.
+
+        Args:
+            games (list): The unsaved games.
+            boards (list): The mines, adjacent mines and revealed cells of each game.
         """
-        cells = [
-            Cell(game=game, row=row, column=col)
-            for row in range(game.rows)
-            for col in range(game.columns)
-        ]
-        Cell.objects.bulk_create(cells)
-        return Cell.objects.filter(game=game)
+        if is_sharded():
+            for game, game_id in zip(games, allocate_game_ids(len(games))):
+                game.id = game_id
+            by_shard = {}
+            for game, board in zip(games, boards):
+                by_shard.setdefault(shard_for(game.id), []).append((game, board))
+        else:
+            by_shard = {DEFAULT_DB_ALIAS: list(zip(games, boards))}
+
+        for db, entries in by_shard.items():
+            with transaction.atomic(using=db):
+                Game.objects.using(db).bulk_create([game for game, _ in entries])
+                Cell.objects.using(db).bulk_create(
+                    [
+                        cell
+                        for game, board in entries
+                        for cell in GameService._build_cells(game, *board)
+                    ],
+                    batch_size=settings.BULK_CREATE_BATCH_SIZE,
+                )
+                BoardSnapshot.objects.using(db).bulk_create(
+                    [
+                        initial_snapshot(game, board[2])
+                        for game, board in entries
+                        if board[2]
+                    ]
+                )
 
     @staticmethod
-    def _place_mines(game, cells):
+    def _board_for(game, deadline=None):
         """
-        Randomly place mines in the game cells.
+        Return the board of a game: the daily challenge, or a new board.
 
         Args:
-            game (Game): The game instance for which mines are being placed.
-            cells (QuerySet): The queryset of cells in the game.
+            game (Game): The game instance for which the board is returned.
+            deadline (float): The `perf_counter` time after which no-guess
+                boards are no longer generated.
+
+        Returns:
+            tuple: The mines, the adjacent mines and the revealed cells indexes.
         """
-        mine_cells = sample(list(cells), game.mines)
-        for mine in mine_cells:
-            mine.is_mine = True
-        Cell.objects.bulk_update(mine_cells, ["is_mine"])
+        if game.mode == GameMode.DAILY:
+            board, game.no_guess = daily_board(now().date())
+            return board
+        return GameService._generate_layout(game, deadline=deadline)
 
     @staticmethod
-    def _calculate_adjacencies(cells):
+    def _generate_layout(game, rng=random, deadline=None):
         """
-        Calculate the number of adjacent mines for each cell.
+        Place the mines of the game in memory.
+
+        A no-guess game which cannot be generated before the deadline keeps its
+        last layout and becomes a regular game, and one generated after the
+        deadline gets a random layout.
 
         Args:
-            cells (QuerySet): The queryset of cells in the game.
+            game (Game): The game instance for which the board is generated.
+            rng (Random): The random generator.
+            deadline (float): The `perf_counter` time to give up at,
+                `NO_GUESS_TIME_BUDGET` seconds from now by default.
+
+        Returns:
+            tuple: The mines, the adjacent mines and the revealed cells indexes.
         """
-        updates = []
-        for cell in cells:
-            if not cell.is_mine:
-                cell.adjacent_mines = GameService._calculate_adjacent_mines(cell)
-                updates.append(cell)
-        Cell.objects.bulk_update(updates, ["adjacent_mines"])
+        rows, columns = game.rows, game.columns
+        kind = "no_guess" if game.no_guess else "random"
+        start = perf_counter()
+        if deadline is None:
+            deadline = start + settings.NO_GUESS_TIME_BUDGET
+        if game.no_guess and start < deadline:
+            start_index = solver.start_cell(rows, columns)
+            layout, counts, attempts, solved = solver.no_guess_mines(
+                rows, columns, game.mines, start_index, rng, deadline
+            )
+            revealed = solver.opening(rows, columns, counts, start_index)
+        else:
+            layout = solver.random_mines(rows, columns, game.mines, rng)
+            counts = solver.adjacent_counts(rows, columns, layout)
+            attempts, solved, revealed = 1, not game.no_guess, ()
+        metrics.BOARD_GENERATION_DURATION.observe(
+            perf_counter() - start, mode=game.mode, kind=kind
+        )
+        metrics.BOARD_GENERATION_ATTEMPTS.observe(attempts, mode=game.mode, kind=kind)
+        if not solved:
+            metrics.NO_GUESS_FALLBACKS.inc(mode=game.mode)
+            game.no_guess = False
+        return layout, counts, revealed
 
     @staticmethod
-    def _calculate_adjacent_mines(cell):
+    def _build_cells(game, layout, counts, revealed):
         """
-        Calculate the number of mines adjacent to a given cell.
+        Build the unsaved cells of a game from its board.
 
         Args:
-            cell (Cell): The cell for which adjacent mines are being calculated.
+            game (Game): The game instance for which cells are being created.
+            layout (bytearray): 1 for the mines and 0 for the safe cells.
+            counts (list): The number of adjacent mines of every cell.
+            revealed (set): The indexes of the cells revealed from the start.
 
         Returns:
-            int: The number of adjacent mines.
+            list: The cells of the game.
         """
-        neighbors = Cell.objects.get_neighbors(cell)
-        return sum(1 for neighbor in neighbors if neighbor.is_mine)
+        cells = []
+        for index, is_mine in enumerate(layout):
+            row, column = divmod(index, game.columns)
+            cells.append(
+                Cell(
+                    game=game,
+                    row=row,
+                    column=column,
+                    is_mine=bool(is_mine),
+                    is_revealed=index in revealed,
+                    adjacent_mines=0 if is_mine else counts[index],
+                )
+            )
+        return cells
 
     @staticmethod
     def _get_cell(game, row, column):
@@ -99,7 +222,9 @@ class GameService:
             Cell or None: The cell if found, otherwise None.
         """
         try:
-            return Cell.objects.get(game=game, row=row, column=column)
+            return Cell.objects.using(db_for(game)).get(
+                game=game, row=row, column=column
+            )
         except Cell.DoesNotExist:
             return None
 
@@ -123,6 +248,7 @@ class GameService:
         if cell.is_revealed:
             return CELL_ALREADY_REVEALED, HTTP_400_BAD_REQUEST
 
+        record_move(game, MoveAction.REVEAL, row, column)
         if cell.is_mine:
             GameService._end_game(game, GameStatus.LOST)
             return GameSerializer(game).data, HTTP_200_OK
@@ -130,43 +256,65 @@ class GameService:
         if cell.is_flagged:
             cell.toggle_flag()
 
-        GameService._reveal_cells(cell)
+        with timed("flood_fill"):
+            opened = GameService._reveal_cells(cell)
+        metrics.CELLS_OPENED.observe(opened, mode=game.mode)
 
-        if GameService._check_win_condition(game):
+        with timed("win_check"):
+            won = GameService._check_win_condition(game)
+        if won:
             GameService._end_game(game, GameStatus.WON)
             return GameSerializer(game).data, HTTP_200_OK
 
         return GameSerializer(game).data, HTTP_200_OK
 
     @staticmethod
-    def _reveal_cells(cell):
+    def _reveal_cells(cell, revealed=None):
         """
         Recursively reveal cells starting from the given cell.
 
         Args:
             cell (Cell): The cell to start revealing from.
+            revealed (set): The ids of the cells already revealed by this call.
+
+        Returns:
+            int: The number of cells revealed.
         """
-        if cell.is_revealed:
-            return
+        if revealed is None:
+            revealed = set()
+        if cell.is_revealed or cell.id in revealed:
+            return 0
         cell.is_revealed = True
         cell.save()
+        revealed.add(cell.id)
 
         if cell.adjacent_mines == 0:
             neighbors = Cell.objects.get_neighbors(cell)
             for neighbor in neighbors:
-                GameService._reveal_cells(neighbor)
+                GameService._reveal_cells(neighbor, revealed)
+        return len(revealed)
 
     @staticmethod
     def _end_game(game, status):
         """
-        End the game with a given status and reveal all cells.
+        End the game with a given status and enqueue the post-game work.
+
+        Revealing all cells, updating the player stats and the analytics rollups
+        run in the background once the move is committed, the serializers
+        already show the cells of finished games as revealed. The buffered moves
+        are written so the game can be replayed right away.
 
         Args:
             game (Game): The game instance.
             status (GameStatus): The status to set for the game.
         """
-        game.end_game(status)
-        GameService._reveal_all_cells(game)
+        with timed("end_game"):
+            game.end_game(status)
+        enqueue(reveal_all_cells, game.id, using=db_for(game))
+        enqueue_stats_update(game)
+        enqueue_rollup_update(game)
+        flush_moves(game)
+        metrics.GAMES_FINISHED.inc(mode=game.mode, status=status)
 
     @staticmethod
     def _reveal_all_cells(game):
@@ -176,11 +324,12 @@ class GameService:
         Args:
             game (Game): The game instance.
         """
-        cells = Cell.objects.filter(game=game)
-        with transaction.atomic():
+        db = db_for(game)
+        cells = Cell.objects.using(db).filter(game=game)
+        with transaction.atomic(using=db):
             for cell in cells:
                 cell.is_revealed = True
-            Cell.objects.bulk_update(cells, ["is_revealed"])
+            Cell.objects.using(db).bulk_update(cells, ["is_revealed"])
 
     @staticmethod
     def _check_win_condition(game):
@@ -193,9 +342,11 @@ class GameService:
         Returns:
             bool: True if the win condition is met, False otherwise.
         """
-        return not Cell.objects.filter(
-            game=game, is_revealed=False, is_mine=False
-        ).exists()
+        return (
+            not Cell.objects.using(db_for(game))
+            .filter(game=game, is_revealed=False, is_mine=False)
+            .exists()
+        )
 
     @staticmethod
     def toggle_flag(game, row, column):
@@ -218,5 +369,53 @@ class GameService:
             return CANNOT_FLAG_REVEALED_CELL, HTTP_400_BAD_REQUEST
 
         cell.toggle_flag()
+        record_move(game, MoveAction.FLAG, row, column)
 
         return CellSerializer(cell).data, HTTP_200_OK
+
+
+def daily_seed(day):
+    """Return the secret seed of the daily challenge of a day."""
+    key = settings.DAILY_SEED_KEY or settings.SECRET_KEY
+    return hmac.new(
+        key.encode(), f"daily-{day.isoformat()}".encode(), hashlib.sha256
+    ).hexdigest()
+
+
+@lru_cache(maxsize=2)
+def daily_board(day):
+    """
+    Return the no-guess board of the daily challenge of a day.
+
+    The board is generated from a seed made of the day and of
+    `DAILY_SEED_KEY`, so every process computes the same board, once, and
+    nobody without the key can compute the board of a coming day.
+
+    Args:
+        day (date): The day of the challenge.
+
+    Returns:
+        tuple: The mines, adjacent mines and revealed cells indexes of the
+            board, and whether it is no-guess.
+    """
+    config = GAME_CONFIG[GameMode.DAILY]
+    rows, columns = config["rows"], config["columns"]
+    start = solver.start_cell(rows, columns)
+    layout, counts, _, solved = solver.no_guess_mines(
+        rows,
+        columns,
+        config["mines"],
+        start,
+        random.Random(daily_seed(day)),
+        deadline=None,
+        max_attempts=DAILY_MAX_ATTEMPTS,
+    )
+    revealed = frozenset(solver.opening(rows, columns, counts, start))
+    return (bytes(layout), tuple(counts), revealed), solved
+
+
+@task
+def reveal_all_cells(game_id):
+    """Reveal all cells of a finished game."""
+    game = game_queryset(game_id).get(id=game_id)
+    GameService._reveal_all_cells(game)
@@ -0,0 +1,123 @@
+"""
+Horizontal sharding of the games and their cells.
+
+Each game lives, with its cells, on one of the `GAME_SHARDS` databases, chosen
+by its id. When there is more than one shard the ids are allocated from the
+`GameSequence` table of the default database, so they are unique across the
+shards, and `Game.save` places the new games on their shard. Queries on a game
+go to its shard, and queries over every game are run on each shard and merged.
+"""
+
+import heapq
+from itertools import islice
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+from .models import Game, GameSequence
+
+SHARDED_MODELS = {"game", "cell", "move", "boardsnapshot"}
+
+
+def is_sharded():
+    """Return True if the games are spread across several databases."""
+    return len(settings.GAME_SHARDS) > 1
+
+
+def shard_for(game_id):
+    """
+    Return the database alias of the shard holding a game.
+
+    Args:
+        game_id (int): The id of the game.
+
+    Returns:
+        str: The database alias of the shard.
+    """
+    shards = settings.GAME_SHARDS
+    return shards[int(game_id) % len(shards)]
+
+
+def db_for(game):
+    """Return the database alias of the shard holding `game`."""
+    return shard_for(game.id)
+
+
+def games_on(shard):
+    """
+    Return the games queryset of a shard.
+
+    The default database is queried without an explicit alias so its reads can
+    still be routed to the read replicas.
+    """
+    if shard == DEFAULT_DB_ALIAS:
+        return Game.objects.all()
+    return Game.objects.using(shard)
+
+
+def game_queryset(game_id):
+    """Return the games queryset of the shard holding the game `game_id`."""
+    return games_on(shard_for(game_id))
+
+
+def allocate_game_id():
+    """Allocate a game id unique across the shards."""
+    return GameSequence.objects.using(DEFAULT_DB_ALIAS).create().id
+
+
+def allocate_game_ids(count):
+    """Allocate `count` game ids unique across the shards with one insert."""
+    sequences = GameSequence.objects.using(DEFAULT_DB_ALIAS).bulk_create(
+        [GameSequence() for _ in range(count)]
+    )
+    return [sequence.id for sequence in sequences]
+
+
+def all_games(queryset=None):
+    """
+    Return the games of every shard, ordered by id.
+
+    Args:
+        queryset (callable): Build the queryset to run on each shard from the
+            games queryset of the shard. Defaults to every game.
+
+    Returns:
+        list: The games of every shard.
+    """
+    queryset = queryset or (lambda games: games)
+    games = [
+        game for shard in settings.GAME_SHARDS for game in queryset(games_on(shard))
+    ]
+    if is_sharded():
+        games.sort(key=lambda game: game.id)
+    return games
+
+
+def top_games(queryset, key, size):
+    """
+    Return the `size` first games of every shard merged by `key`.
+
+    Args:
+        queryset (callable): Build the ordered queryset to run on each shard
+            from the games queryset of the shard.
+        key (callable): The sort key, matching the ordering of the queryset.
+        size (int): The number of games to return.
+
+    Returns:
+        list: The top games across the shards.
+    """
+    per_shard = [
+        list(queryset(games_on(shard))[:size]) for shard in settings.GAME_SHARDS
+    ]
+    if len(per_shard) == 1:
+        return per_shard[0]
+    return list(islice(heapq.merge(*per_shard, key=key), size))
+
+
+class ShardRouter:
+    """Only create the tables of the games on the shards other than default."""
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db == DEFAULT_DB_ALIAS or db not in settings.GAME_SHARDS:
+            return None
+        return app_label == "core" and model_name in SHARDED_MODELS
@@ -0,0 +1,272 @@
+"""
+Board layouts and the no-guess solver.
+
+Boards are flat arrays indexed by `row * columns + column`. The solver plays a
+board from its starting cell with deductions only: it propagates the
+constraints of the revealed numbers on the frontier, first one number at a
+time, then by pairs of overlapping numbers and finally with the mine count.
+After each change only the numbers around the changed cells are examined
+again. A board is no-guess when the solver reveals every safe cell.
+"""
+
+from functools import lru_cache
+from time import perf_counter
+
+UNKNOWN, SAFE, MINE = 0, 1, 2
+
+
+class Timeout(Exception):
+    """The time budget of the board generation is exhausted."""
+
+
+@lru_cache(maxsize=32)
+def neighbors_table(rows, columns):
+    """Return the indexes of the neighbors of every cell of a board."""
+    table = []
+    for row in range(rows):
+        for column in range(columns):
+            table.append(
+                tuple(
+                    neighbor_row * columns + neighbor_column
+                    for neighbor_row in range(max(row - 1, 0), min(row + 2, rows))
+                    for neighbor_column in range(
+                        max(column - 1, 0), min(column + 2, columns)
+                    )
+                    if (neighbor_row, neighbor_column) != (row, column)
+                )
+            )
+    return tuple(table)
+
+
+def start_cell(rows, columns):
+    """Return the index of the cell revealed first on no-guess boards."""
+    return rows // 2 * columns + columns // 2
+
+
+def random_mines(rows, columns, mines, rng, excluded=()):
+    """
+    Place mines at random.
+
+    Args:
+        rows (int): The number of rows of the board.
+        columns (int): The number of columns of the board.
+        mines (int): The number of mines to place.
+        rng (Random): The random generator.
+        excluded (iterable): The indexes of the cells which cannot be mines.
+
+    Returns:
+        bytearray: 1 for the mines and 0 for the safe cells.
+    """
+    excluded = set(excluded)
+    candidates = [index for index in range(rows * columns) if index not in excluded]
+    layout = bytearray(rows * columns)
+    for index in rng.sample(candidates, mines):
+        layout[index] = 1
+    return layout
+
+
+def adjacent_counts(rows, columns, layout):
+    """Return the number of adjacent mines of every cell of a layout."""
+    neighbors = neighbors_table(rows, columns)
+    counts = [0] * (rows * columns)
+    for index, is_mine in enumerate(layout):
+        if is_mine:
+            for neighbor in neighbors[index]:
+                counts[neighbor] += 1
+    return counts
+
+
+def opening(rows, columns, counts, start):
+    """Return the indexes revealed by revealing the safe cell `start`."""
+    neighbors = neighbors_table(rows, columns)
+    revealed = {start}
+    stack = [start]
+    while stack:
+        index = stack.pop()
+        if counts[index]:
+            continue
+        for neighbor in neighbors[index]:
+            if neighbor not in revealed:
+                revealed.add(neighbor)
+                stack.append(neighbor)
+    return revealed
+
+
+class _Solver:
+    def __init__(self, rows, columns, layout, counts, deadline):
+        self.neighbors = neighbors_table(rows, columns)
+        self.layout = layout
+        self.counts = counts
+        self.deadline = deadline
+        self.state = bytearray(rows * columns)
+        self.hidden_safe = len(layout) - sum(layout)
+        self.hidden_mines = sum(layout)
+        self.pending = set()
+
+    def reveal(self, index):
+        """Reveal a safe cell, flood filling the zeros."""
+        stack = [index]
+        self.state[index] = SAFE
+        while stack:
+            index = stack.pop()
+            self.hidden_safe -= 1
+            self._touch(index)
+            if self.counts[index]:
+                continue
+            for neighbor in self.neighbors[index]:
+                if self.state[neighbor] == UNKNOWN:
+                    self.state[neighbor] = SAFE
+                    stack.append(neighbor)
+
+    def flag(self, index):
+        self.state[index] = MINE
+        self.hidden_mines -= 1
+        self._touch(index)
+
+    def _touch(self, index):
+        """Examine again the revealed numbers around a changed cell."""
+        if self.state[index] == SAFE:
+            self.pending.add(index)
+        for neighbor in self.neighbors[index]:
+            if self.state[neighbor] == SAFE:
+                self.pending.add(neighbor)
+
+    def constraint(self, index):
+        """Return the hidden neighbors of a number and the mines among them."""
+        unknown = []
+        mines = self.counts[index]
+        for neighbor in self.neighbors[index]:
+            state = self.state[neighbor]
+            if state == UNKNOWN:
+                unknown.append(neighbor)
+            elif state == MINE:
+                mines -= 1
+        return unknown, mines
+
+    def apply(self, safe, mines):
+        """Reveal the `safe` cells and flag the `mines`. Return True on progress."""
+        for index in mines:
+            if self.state[index] == UNKNOWN:
+                self.flag(index)
+        for index in safe:
+            if self.state[index] == UNKNOWN:
+                if self.layout[index]:
+                    raise AssertionError("the solver deduced a mine as safe")
+                self.reveal(index)
+        return bool(safe or mines)
+
+    def single(self, index):
+        unknown, mines = self.constraint(index)
+        if not unknown:
+            return False
+        if mines == 0:
+            return self.apply(unknown, ())
+        if mines == len(unknown):
+            return self.apply((), unknown)
+        return False
+
+    def pairs(self):
+        """Deduce from pairs of numbers sharing hidden neighbors."""
+        constraints = {}
+        by_cell = {}
+        for index, state in enumerate(self.state):
+            if state != SAFE or not self.counts[index]:
+                continue
+            unknown, mines = self.constraint(index)
+            if unknown:
+                constraints[index] = (frozenset(unknown), mines)
+                for cell in unknown:
+                    by_cell.setdefault(cell, []).append(index)
+        for first, (first_cells, first_mines) in constraints.items():
+            others = {other for cell in first_cells for other in by_cell[cell]}
+            for other in others:
+                if other == first:
+                    continue
+                other_cells, other_mines = constraints[other]
+                only_first = first_cells - other_cells
+                # The mines of the first number not shared with the other must
+                # all be in the cells only the first number touches.
+                if first_mines - other_mines == len(only_first):
+                    only_other = other_cells - first_cells
+                    if self.apply(only_other, only_first):
+                        return True
+        return False
+
+    def mine_count(self):
+        """Deduce from the number of mines left."""
+        unknown = [index for index, state in enumerate(self.state) if state == UNKNOWN]
+        if self.hidden_mines == 0:
+            return self.apply(unknown, ())
+        if self.hidden_mines == len(unknown):
+            return self.apply((), unknown)
+        return False
+
+    def solve(self, start):
+        self.reveal(start)
+        while self.hidden_safe:
+            if self.deadline is not None and perf_counter() > self.deadline:
+                raise Timeout
+            if self.pending:
+                self.single(self.pending.pop())
+            elif not (self.pairs() or self.mine_count()):
+                return False
+        return True
+
+
+def is_no_guess(rows, columns, layout, counts, start, deadline=None):
+    """
+    Return True if every safe cell can be revealed from `start` without guessing.
+
+    Args:
+        rows (int): The number of rows of the board.
+        columns (int): The number of columns of the board.
+        layout (bytearray): 1 for the mines and 0 for the safe cells.
+        counts (list): The number of adjacent mines of every cell.
+        start (int): The index of the safe cell revealed first.
+        deadline (float): The `perf_counter` time to give up at.
+
+    Raises:
+        Timeout: If the deadline passes before the board is solved.
+    """
+    return _Solver(rows, columns, layout, counts, deadline).solve(start)
+
+
+def no_guess_mines(rows, columns, mines, start, rng, deadline, max_attempts=None):
+    """
+    Generate random layouts until one can be solved from `start` without guessing.
+
+    The start cell and, when there is room for it, its neighbors are kept free of
+    mines so the game begins with an opening. Once the deadline passes the last
+    layout is returned as a fallback, and so it is after `max_attempts`
+    attempts, which keeps the generation deterministic for a seeded `rng`.
+
+    Args:
+        rows (int): The number of rows of the board.
+        columns (int): The number of columns of the board.
+        mines (int): The number of mines to place.
+        start (int): The index of the cell revealed first.
+        rng (Random): The random generator.
+        deadline (float): The `perf_counter` time to give up at, or None.
+        max_attempts (int): The number of layouts to try, or None.
+
+    Returns:
+        tuple: The layout, its adjacent counts, the number of attempts and
+            whether the layout is no-guess.
+    """
+    excluded = {start}
+    if mines <= rows * columns - len(neighbors_table(rows, columns)[start]) - 1:
+        excluded.update(neighbors_table(rows, columns)[start])
+    attempts = 0
+    while True:
+        attempts += 1
+        layout = random_mines(rows, columns, mines, rng, excluded)
+        counts = adjacent_counts(rows, columns, layout)
+        try:
+            if is_no_guess(rows, columns, layout, counts, start, deadline):
+                return layout, counts, attempts, True
+        except Timeout:
+            return layout, counts, attempts, False
+        if deadline is not None and perf_counter() > deadline:
+            return layout, counts, attempts, False
+        if attempts == max_attempts:
+            return layout, counts, attempts, False
@@ -0,0 +1,133 @@
+"""
+Per-player statistics.
+
+The `PlayerStats` of a player are updated in the background once each of their
+games is finished and has a user, so reading them is a single row lookup. The
+`stats_recorded` flag of the games makes the update idempotent, and lets
+`manage.py backfill_player_stats` count the games finished before.
+"""
+
+import heapq
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.db.models.functions import Coalesce
+
+from .models import GameStatus, PlayerStats
+from .sharding import db_for, game_queryset, games_on
+from .tasks import enqueue, task
+
+
+def needs_stats(game):
+    """Return True if a game should be, and is not yet, counted in the stats."""
+    return bool(game.user) and not game.is_active() and not game.stats_recorded
+
+
+def enqueue_stats_update(game):
+    """Update the stats of the player of a game once the game is committed."""
+    if needs_stats(game):
+        enqueue(update_player_stats, game.id, using=db_for(game))
+
+
+@task
+def update_player_stats(game_id):
+    """Count a finished game in the stats of its player."""
+    games = game_queryset(game_id)
+    db = games.db
+    with transaction.atomic(using=db), transaction.atomic(using=DEFAULT_DB_ALIAS):
+        game = games.select_for_update().get(id=game_id)
+        if not needs_stats(game):
+            return
+        stats, _ = PlayerStats.objects.select_for_update().get_or_create(user=game.user)
+        stats.add_game(game)
+        stats.save()
+        games.filter(id=game_id).update(stats_recorded=True)
+
+
+def unrecorded_games(chunk_size):
+    """
+    Iterate over the finished games not counted in the stats yet.
+
+    The games of every shard are merged in the order they finished, so the
+    streaks are counted as they were played.
+
+    Args:
+        chunk_size (int): The number of games fetched at once from each shard.
+
+    Returns:
+        iterator: The games, ordered by finish time.
+    """
+    per_shard = [
+        games_on(shard)
+        .filter(stats_recorded=False, user__isnull=False)
+        .exclude(status=GameStatus.ACTIVE)
+        .exclude(user="")
+        .annotate(finished=Coalesce("finished_at", "updated_at"))
+        .order_by("finished", "id")
+        .only("id", "user", "status", "mode", "duration")
+        .iterator(chunk_size=chunk_size)
+        for shard in settings.GAME_SHARDS
+    ]
+    return heapq.merge(*per_shard, key=lambda game: (game.finished, game.id))
+
+
+def record_games(games):
+    """
+    Count a chunk of finished games in the stats of their players.
+
+    The games are locked and read again first, so the ones counted meanwhile
+    by `update_player_stats` are skipped. The stats of the players of the
+    chunk are read with one query and written with one bulk update and one
+    bulk insert.
+
+    Args:
+        games (list): The finished games, in the order they finished.
+
+    Returns:
+        int: The number of games counted.
+    """
+    by_shard = {}
+    for game in games:
+        by_shard.setdefault(db_for(game), []).append(game.id)
+    with ExitStack() as stack:
+        for shard in sorted(by_shard):
+            stack.enter_context(transaction.atomic(using=shard))
+        stack.enter_context(transaction.atomic(using=DEFAULT_DB_ALIAS))
+        unrecorded = set()
+        for shard, ids in by_shard.items():
+            unrecorded.update(
+                games_on(shard)
+                .select_for_update()
+                .filter(id__in=ids, stats_recorded=False)
+                .values_list("id", flat=True)
+            )
+        games = [game for game in games if game.id in unrecorded]
+
+        users = {game.user for game in games}
+        existing = PlayerStats.objects.select_for_update().in_bulk(
+            users, field_name="user"
+        )
+        created = {}
+        for game in games:
+            stats = existing.get(game.user) or created.get(game.user)
+            if stats is None:
+                stats = created[game.user] = PlayerStats(user=game.user)
+            stats.add_game(game)
+        PlayerStats.objects.bulk_update(
+            existing.values(),
+            [
+                "games",
+                "wins",
+                "losses",
+                "current_streak",
+                "best_streak",
+                "best_times",
+            ],
+        )
+        PlayerStats.objects.bulk_create(created.values())
+        for shard, ids in by_shard.items():
+            games_on(shard).filter(id__in=unrecorded.intersection(ids)).update(
+                stats_recorded=True
+            )
+    return len(games)
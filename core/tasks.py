@@ -0,0 +1,130 @@
+"""
+Background tasks.
+
+Work that does not need to be done before answering a request is enqueued with
+`enqueue`, and runs once the current transaction is committed on the backend
+chosen by `TASK_BACKEND`:
+
+* `immediate`: run synchronously, after the commit.
+* `thread`: run on an in-process thread pool of `TASK_THREADS` threads, and
+  retried up to `TASK_MAX_ATTEMPTS` times on database errors, such as a locked
+  SQLite database, waiting `TASK_RETRY_DELAY` seconds, doubled every retry.
+* `database`: stored in the `Task` table and run by `manage.py run_tasks`.
+"""
+
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+from django.conf import settings
+from django.db import OperationalError, close_old_connections, transaction
+from django.utils.module_loading import import_string
+
+from .models import Task
+
+logger = logging.getLogger("minesweeper.tasks")
+
+
+def task(function):
+    """Mark `function` as a task which can be enqueued."""
+    function.task_name = f"{function.__module__}.{function.__name__}"
+    return function
+
+
+def load_task(name):
+    """
+    Return the task function of a name.
+
+    Raises:
+        ValueError: If the name does not point to a task.
+    """
+    function = import_string(name)
+    if getattr(function, "task_name", None) != name:
+        raise ValueError(f"{name} is not a task")
+    return function
+
+
+def run_task(name, args):
+    """Run a task and log its failure instead of raising it."""
+    try:
+        load_task(name)(*args)
+    except Exception:
+        logger.exception("Task %s%r failed", name, tuple(args))
+        return False
+    return True
+
+
+class ImmediateBackend:
+    def submit(self, name, args):
+        run_task(name, args)
+
+
+class ThreadBackend:
+    def __init__(self):
+        self.executor = ThreadPoolExecutor(
+            max_workers=settings.TASK_THREADS, thread_name_prefix="task"
+        )
+
+    def submit(self, name, args):
+        self.executor.submit(self._run, name, args)
+
+    @staticmethod
+    def _run(name, args):
+        """Run a task, retrying it with a backoff on database errors."""
+        for attempt in range(1, settings.TASK_MAX_ATTEMPTS + 1):
+            close_old_connections()
+            try:
+                load_task(name)(*args)
+                return
+            except OperationalError:
+                if attempt == settings.TASK_MAX_ATTEMPTS:
+                    logger.exception("Task %s%r failed", name, tuple(args))
+                    return
+                logger.warning(
+                    "Task %s%r failed on a database error, retrying",
+                    name,
+                    tuple(args),
+                    exc_info=True,
+                )
+            except Exception:
+                logger.exception("Task %s%r failed", name, tuple(args))
+                return
+            finally:
+                close_old_connections()
+            time.sleep(settings.TASK_RETRY_DELAY * 2 ** (attempt - 1))
+
+
+class DatabaseBackend:
+    def submit(self, name, args):
+        Task.objects.create(name=name, args=list(args))
+
+
+BACKENDS = {
+    "immediate": ImmediateBackend,
+    "thread": ThreadBackend,
+    "database": DatabaseBackend,
+}
+
+
+@lru_cache
+def _get_backend(name):
+    return BACKENDS[name]()
+
+
+def get_backend():
+    """Return the backend configured by `TASK_BACKEND`."""
+    return _get_backend(settings.TASK_BACKEND)
+
+
+def enqueue(function, *args, using=None):
+    """
+    Run a task once the current transaction is committed.
+
+    Args:
+        function (callable): The task, decorated with `task`.
+        *args: The JSON serializable arguments of the task.
+        using (str): The database of the transaction to wait for.
+    """
+    name = function.task_name
+    transaction.on_commit(lambda: get_backend().submit(name, args), using=using)
@@ -0,0 +1,82 @@
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from core.admin import EstimatedCountPaginator, GameAdmin
+from core.models import Cell, Game, GameMode, GameStatus
+from core.services import GameService
+
+
+@override_settings(
+    STORAGES={
+        "staticfiles": {
+            "BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"
+        }
+    }
+)
+class AdminTest(TestCase):
+    """Test module for the admin of the games and the cells"""
+
+    def setUp(self):
+        """set up test creating a superuser and a game"""
+        self.user = User.objects.create_superuser("admin", "admin@example.com", "pw")
+        self.client.force_login(self.user)
+        self.game = Game.objects.create(
+            rows=3, columns=3, mines=1, mode=GameMode.CUSTOM
+        )
+        GameService.initialize_cells(self.game)
+
+    def test_cell_str_without_game_query(self):
+        """Test a cell is named without loading its game"""
+        cell = Cell.objects.filter(game=self.game).first()
+
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                str(cell), f"Cell {cell.row}x{cell.column} - Game {self.game.id}"
+            )
+
+    def test_cell_changelist_queries_independent_of_rows(self):
+        """Test the cell changelist does not query the games row by row"""
+        url = reverse("admin:core_cell_changelist")
+        with self.assertNumQueries(4) as context:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+
+        game = Game.objects.create(rows=5, columns=5, mines=3, mode=GameMode.CUSTOM)
+        GameService.initialize_cells(game)
+        with self.assertNumQueries(len(context.captured_queries)):
+            response = self.client.get(url, {"game__id__exact": game.id})
+        self.assertContains(response, "25 cells")
+
+    def test_game_changelist_filters(self):
+        """Test the games are filtered by status and mode"""
+        Game.objects.create(
+            rows=9, columns=9, mines=10, mode=GameMode.EASY, status=GameStatus.WON
+        )
+        url = reverse("admin:core_game_changelist")
+
+        response = self.client.get(url, {"status__exact": GameStatus.WON})
+        self.assertContains(response, "1 game")
+        response = self.client.get(url, {"mode__exact": GameMode.CUSTOM})
+        self.assertContains(response, "1 game")
+
+    def test_game_board_one_query(self):
+        """Test the board of a game is rendered from one query"""
+        Cell.objects.filter(game=self.game, is_mine=True).update(is_flagged=True)
+        game_admin = GameAdmin(Game, None)
+
+        with self.assertNumQueries(1):
+            board = game_admin.board(self.game)
+        self.assertEqual(board.count("F"), 1)
+        self.assertEqual(board.count("\n"), 2)
+
+        response = self.client.get(
+            reverse("admin:core_game_change", args=[self.game.id])
+        )
+        self.assertContains(response, "<pre")
+
+    def test_paginator_counts_filtered_querysets(self):
+        """Test the filtered querysets are counted exactly"""
+        cells = Cell.objects.filter(game=self.game).order_by("id")
+
+        self.assertEqual(EstimatedCountPaginator(cells, 100).count, 9)
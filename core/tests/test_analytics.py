@@ -0,0 +1,137 @@
+from datetime import datetime, timezone
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.analytics import duration_percentile, period_start, update_rollups
+from core.models import Cell, Game, GameMode, GameRollup, GameStatus, RollupPeriod
+from core.services import GameService
+
+FINISHED_AT = datetime(2026, 3, 2, 14, 35, tzinfo=timezone.utc)
+
+
+def _finished_game(status, mode=GameMode.EASY, duration=20.0, hour=14):
+    return Game.objects.create(
+        rows=9,
+        columns=9,
+        mines=10,
+        mode=mode,
+        status=status,
+        duration=duration,
+        finished_at=FINISHED_AT.replace(hour=hour),
+    )
+
+
+class AnalyticsTest(TestCase):
+    """Test module for the analytics rollups"""
+
+    def setUp(self):
+        """set up test creating the api client"""
+        self.client = APIClient()
+
+    def test_period_start(self):
+        """Test the games are bucketed by hour and by day"""
+        self.assertEqual(
+            period_start(FINISHED_AT, RollupPeriod.HOUR),
+            datetime(2026, 3, 2, 14, tzinfo=timezone.utc),
+        )
+        self.assertEqual(
+            period_start(FINISHED_AT, RollupPeriod.DAY),
+            datetime(2026, 3, 2, tzinfo=timezone.utc),
+        )
+
+    def test_duration_percentile(self):
+        """Test the percentiles are interpolated inside the histogram buckets"""
+        histogram = [0, 2, 2, 0, 0, 0, 0, 0, 0]
+
+        self.assertEqual(duration_percentile(histogram, 50), 30)
+        self.assertEqual(duration_percentile(histogram, 75), 45)
+        self.assertEqual(duration_percentile([0] * 8 + [1], 50), 3600)
+        self.assertIsNone(duration_percentile([0] * 9, 50))
+
+    @override_settings(TASK_BACKEND="immediate")
+    def test_rollups_updated_when_game_ends(self):
+        """Test a lost game is counted in the hourly and daily rollups"""
+        game = Game.objects.create(rows=9, columns=9, mines=10, mode=GameMode.EASY)
+        GameService.initialize_cells(game)
+        mine = Cell.objects.filter(game=game, is_mine=True).first()
+        url = reverse("game-reveal", args=[game.id])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(url, {"row": mine.row, "column": mine.column})
+
+        rollups = GameRollup.objects.filter(mode=GameMode.EASY)
+        self.assertEqual(
+            sorted(rollups.values_list("period", "games", "losses")),
+            [(RollupPeriod.DAY, 1, 1), (RollupPeriod.HOUR, 1, 1)],
+        )
+
+    def test_game_counted_once(self):
+        """Test updating the rollups twice for a game counts it once"""
+        game = _finished_game(GameStatus.WON)
+
+        update_rollups(game.id)
+        update_rollups(game.id)
+
+        rollup = GameRollup.objects.get(period=RollupPeriod.DAY)
+        self.assertEqual((rollup.games, rollup.wins), (1, 1))
+        self.assertEqual(rollup.duration_histogram, [0, 1, 0, 0, 0, 0, 0, 0, 0])
+
+    def test_rebuild_rollups(self):
+        """Test the rollups are rebuilt from the finished games"""
+        _finished_game(GameStatus.WON, hour=10)
+        _finished_game(GameStatus.LOST, hour=11)
+        _finished_game(GameStatus.WON, GameMode.HARD, duration=400.0)
+        Game.objects.create(rows=9, columns=9, mines=10)
+        GameRollup.objects.create(
+            period=RollupPeriod.DAY, start=FINISHED_AT, mode=GameMode.MEDIUM, games=5
+        )
+
+        call_command("rebuild_rollups", chunk_size=2, stdout=StringIO())
+
+        self.assertEqual(GameRollup.objects.filter(period=RollupPeriod.HOUR).count(), 3)
+        day = GameRollup.objects.get(period=RollupPeriod.DAY, mode=GameMode.EASY)
+        self.assertEqual((day.games, day.wins, day.losses), (2, 1, 1))
+        self.assertFalse(GameRollup.objects.filter(mode=GameMode.MEDIUM).exists())
+        self.assertFalse(
+            Game.objects.exclude(status=GameStatus.ACTIVE)
+            .filter(analytics_recorded=False)
+            .exists()
+        )
+
+    def test_analytics_endpoint(self):
+        """Test the analytics endpoint reads the rollups and their totals"""
+        for game in (
+            _finished_game(GameStatus.WON, duration=20.0, hour=10),
+            _finished_game(GameStatus.LOST, duration=40.0, hour=11),
+            _finished_game(GameStatus.WON, GameMode.HARD, duration=400.0),
+        ):
+            update_rollups(game.id)
+        params = {"period": "hour", "since": "2026-03-02", "until": "2026-03-03"}
+
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse("analytics-list"), params)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data["rollups"]), 3)
+        easy = response.data["totals"][GameMode.EASY]
+        self.assertEqual((easy["games"], easy["win_rate"]), (2, 0.5))
+        self.assertEqual(easy["average_duration"], 30.0)
+        self.assertEqual(easy["duration_p50"], 30.0)
+
+    def test_analytics_endpoint_filters(self):
+        """Test the analytics endpoint filters by mode and validates its params"""
+        update_rollups(_finished_game(GameStatus.WON, GameMode.HARD).id)
+        url = reverse("analytics-list")
+
+        response = self.client.get(
+            url, {"mode": GameMode.EASY, "since": "2026-03-01", "until": "2026-03-03"}
+        )
+        self.assertEqual(response.data["rollups"], [])
+
+        response = self.client.get(url, {"period": "week"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,30 @@
+from django.test import TestCase
+
+from core.benchmarks import measure, parse_board, run_benchmarks
+
+
+class BenchmarksTest(TestCase):
+    """Test module for the GameService benchmarks"""
+
+    def test_parse_board(self):
+        """Test parsing the game modes and the custom boards"""
+        self.assertEqual(parse_board("hard"), (30, 16, 99))
+        self.assertEqual(parse_board("10x20"), (10, 20, 30))
+        self.assertEqual(parse_board("10x20x5"), (10, 20, 5))
+
+    def test_measure(self):
+        """Test measuring a case reports time, queries and memory"""
+        result = measure("toggle_flag", "easy", repeat=2, seed=1)
+
+        self.assertEqual(result["case"], "toggle_flag")
+        self.assertEqual(result["repeat"], 2)
+        self.assertGreater(result["time_median_s"], 0)
+        self.assertGreater(result["queries"], 0)
+        self.assertGreater(result["peak_memory_kb"], 0)
+
+    def test_run_benchmarks_board_independent_cases(self):
+        """Test the leaderboard is only measured on the first board"""
+        results = list(run_benchmarks(["leaderboard"], ["easy", "medium"], 1, 1))
+
+        self.assertEqual(len(results), 1)
+        self.assertNotIn("error", results[0])
@@ -0,0 +1,144 @@
+import random
+import time
+from datetime import date
+from unittest import mock
+
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core import solver
+from core.models import Cell, Game, GameMode
+from core.services import daily_board, daily_seed
+
+
+def _mines(game):
+    return set(
+        Cell.objects.filter(game=game, is_mine=True).values_list("row", "column")
+    )
+
+
+class BulkCreateTest(TestCase):
+    """Test module for the bulk game creation"""
+
+    def setUp(self):
+        """set up test creating the api client"""
+        random.seed(0)
+        self.client = APIClient()
+        self.url = reverse("game-bulk")
+
+    def test_bulk_create_shared_layout(self):
+        """Test the games of the users share one board"""
+        data = {"users": ["ana", "bob", "eve"], "mode": GameMode.MEDIUM}
+
+        response = self.client.post(self.url, data, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual([game["user"] for game in response.data], data["users"])
+        games = Game.objects.filter(id__in=[game["id"] for game in response.data])
+        self.assertEqual(len({frozenset(_mines(game)) for game in games}), 1)
+        for game in games:
+            self.assertEqual(game.cells.count(), 256)
+
+    def test_bulk_create_distinct_layouts(self):
+        """Test each game gets its own board"""
+        data = {"users": ["ana", "bob", "eve"], "shared_layout": False}
+
+        response = self.client.post(self.url, data, format="json")
+
+        games = Game.objects.filter(id__in=[game["id"] for game in response.data])
+        self.assertEqual(len({frozenset(_mines(game)) for game in games}), 3)
+
+    def test_bulk_create_constant_queries(self):
+        """Test the number of queries does not depend on the number of games"""
+        board = {"mode": GameMode.CUSTOM, "rows": 2, "columns": 2, "mines": 1}
+        with self.assertNumQueries(4):
+            self.client.post(self.url, {"users": ["ana"], **board}, format="json")
+        with self.assertNumQueries(4):
+            self.client.post(
+                self.url,
+                {
+                    "users": [f"user{i}" for i in range(20)],
+                    "shared_layout": False,
+                    **board,
+                },
+                format="json",
+            )
+
+    def test_bulk_create_no_guess(self):
+        """Test no-guess games are created with their opening revealed"""
+        data = {"users": ["ana", "bob"], "mode": GameMode.HARD, "no_guess": True}
+
+        response = self.client.post(self.url, data, format="json")
+
+        for game in response.data:
+            self.assertTrue(game["no_guess"])
+            self.assertTrue(Cell.objects.filter(game=game["id"], is_revealed=True))
+
+    @override_settings(NO_GUESS_TIME_BUDGET=0.05)
+    def test_bulk_create_no_guess_shared_budget(self):
+        """Test the no-guess boards of a bulk creation share one time budget"""
+        no_guess_mines = solver.no_guess_mines
+
+        def slow_no_guess_mines(*args):
+            time.sleep(0.1)
+            return no_guess_mines(*args[:-1], deadline=None)
+
+        data = {
+            "users": ["ana", "bob", "eve"],
+            "mode": GameMode.MEDIUM,
+            "no_guess": True,
+            "shared_layout": False,
+        }
+        with mock.patch.object(
+            solver, "no_guess_mines", side_effect=slow_no_guess_mines
+        ) as generate:
+            response = self.client.post(self.url, data, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(generate.call_count, 1)
+        self.assertEqual(
+            [game["no_guess"] for game in response.data], [True, False, False]
+        )
+
+    def test_bulk_create_invalid(self):
+        """Test the users and the custom board size are required"""
+        response = self.client.post(self.url, {"users": []}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        data = {"users": ["ana"], "mode": GameMode.CUSTOM}
+        response = self.client.post(self.url, data, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_daily_challenge(self):
+        """Test the daily challenge games share the cached board of the day"""
+        daily_board.cache_clear()
+        url = reverse("game-list")
+
+        first = self.client.post(url, {"mode": GameMode.DAILY}, format="json")
+        second = self.client.post(url, {"mode": GameMode.DAILY}, format="json")
+        bulk = self.client.post(
+            self.url,
+            {"users": ["ana"], "mode": GameMode.DAILY, "shared_layout": False},
+            format="json",
+        )
+
+        self.assertEqual(first.status_code, status.HTTP_201_CREATED)
+        self.assertTrue(first.data["no_guess"])
+        games = [first.data["id"], second.data["id"], bulk.data[0]["id"]]
+        self.assertEqual(len({frozenset(_mines(game)) for game in games}), 1)
+        self.assertEqual(daily_board.cache_info().misses, 1)
+
+    def test_daily_seed_is_secret(self):
+        """Test the daily seed depends on the key, not only on the day"""
+        day = date(2024, 1, 1)
+
+        with override_settings(DAILY_SEED_KEY="first"):
+            seed = daily_seed(day)
+            self.assertEqual(daily_seed(day), seed)
+            self.assertNotEqual(daily_seed(date(2024, 1, 2)), seed)
+        with override_settings(DAILY_SEED_KEY="second"):
+            self.assertNotEqual(daily_seed(day), seed)
+        with override_settings(DAILY_SEED_KEY=""):
+            self.assertNotEqual(daily_seed(day), seed)
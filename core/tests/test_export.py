@@ -0,0 +1,123 @@
+import gzip
+import json
+import os
+import tempfile
+from datetime import datetime, timezone
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.export import export_games, gzip_stream, ndjson
+from core.models import Cell, Game, GameMode, GameStatus
+
+FINISHED_AT = datetime(2026, 3, 2, 14, 35, tzinfo=timezone.utc)
+
+
+def _game(status=GameStatus.WON, mode=GameMode.CUSTOM, day=2):
+    game = Game.objects.create(
+        rows=2,
+        columns=2,
+        mines=1,
+        mode=mode,
+        status=status,
+        duration=12.5,
+        finished_at=FINISHED_AT.replace(day=day),
+    )
+    Cell.objects.bulk_create(
+        Cell(
+            game=game,
+            row=row,
+            column=column,
+            is_mine=(row, column) == (0, 0),
+            adjacent_mines=0 if (row, column) == (0, 0) else 1,
+        )
+        for row in range(2)
+        for column in range(2)
+    )
+    return game
+
+
+class ExportTest(TestCase):
+    """Test module for the export of the finished games"""
+
+    def setUp(self):
+        """set up test creating the api client"""
+        self.client = APIClient()
+
+    def test_export_finished_games(self):
+        """Test only the finished games are exported, filtered by date and mode"""
+        won = _game()
+        lost = _game(GameStatus.LOST, day=3)
+        _game(GameStatus.LOST, mode=GameMode.EASY)
+        _game(GameStatus.ACTIVE)
+
+        games = list(export_games(mode=GameMode.CUSTOM))
+        self.assertEqual([game["id"] for game in games], [won.id, lost.id])
+        self.assertEqual(games[0]["status"], GameStatus.WON)
+        self.assertNotIn("board", games[0])
+
+        since = FINISHED_AT.replace(day=3)
+        games = list(export_games(since=since, mode=GameMode.CUSTOM))
+        self.assertEqual([game["id"] for game in games], [lost.id])
+        games = list(export_games(until=since, mode=GameMode.CUSTOM))
+        self.assertEqual([game["id"] for game in games], [won.id])
+
+    def test_export_boards_one_query_per_chunk(self):
+        """Test the boards of a chunk of games are read with one query"""
+        for _ in range(4):
+            _game()
+
+        with self.assertNumQueries(3):
+            games = list(export_games(boards=True, chunk_size=2))
+        self.assertEqual(len(games), 4)
+        self.assertEqual(games[0]["board"], ["*1", "11"])
+
+    def test_ndjson_gzip(self):
+        """Test the gzip stream decompresses to one JSON line per game"""
+        game = _game()
+
+        content = gzip.decompress(b"".join(gzip_stream(ndjson(export_games()))))
+        lines = content.decode().splitlines()
+        self.assertEqual(len(lines), 1)
+        record = json.loads(lines[0])
+        self.assertEqual(record["id"], game.id)
+        self.assertEqual(record["finished_at"], "2026-03-02T14:35:00Z")
+
+    def test_export_endpoint(self):
+        """Test the export endpoint streams the games, compressed on demand"""
+        game = _game()
+        _game(mode=GameMode.EASY)
+        url = reverse("game-export")
+
+        response = self.client.get(url, {"mode": GameMode.CUSTOM, "boards": "true"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        lines = b"".join(response.streaming_content).decode().splitlines()
+        self.assertEqual(len(lines), 1)
+        self.assertEqual(json.loads(lines[0])["id"], game.id)
+        self.assertEqual(json.loads(lines[0])["board"], ["*1", "11"])
+
+        response = self.client.get(url, {"gzip": "true"})
+        self.assertEqual(response["Content-Type"], "application/gzip")
+        content = gzip.decompress(b"".join(response.streaming_content))
+        self.assertEqual(len(content.splitlines()), 2)
+
+        response = self.client.get(url, {"mode": "unknown"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_export_command(self):
+        """Test the export command writes the compressed games to a file"""
+        _game()
+        _game(day=3)
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "games.ndjson.gz")
+            call_command(
+                "export_games", since="2026-03-03T00:00:00Z", gzip=True, output=path
+            )
+            with gzip.open(path, "rt") as output:
+                lines = output.read().splitlines()
+        self.assertEqual(len(lines), 1)
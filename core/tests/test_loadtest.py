@@ -0,0 +1,102 @@
+import random
+
+from unittest import mock
+
+from django.test import TestCase
+
+from core.loadtest import (
+    InProcessClient,
+    Recorder,
+    Throttled,
+    next_move,
+    percentile,
+    play_game,
+)
+from core.models import Game, GameMode, GameStatus
+
+
+def _cell(row, column, is_revealed=False, is_flagged=False, adjacent_mines=None):
+    return {
+        "row": row,
+        "column": column,
+        "is_revealed": is_revealed,
+        "is_flagged": is_flagged,
+        "adjacent_mines": adjacent_mines,
+    }
+
+
+class LoadTest(TestCase):
+    """Test module for the load generation"""
+
+    def test_percentile(self):
+        """Test the nearest-rank percentile"""
+        values = list(range(1, 101))
+
+        self.assertEqual(percentile(values, 50), 50)
+        self.assertEqual(percentile(values, 99), 99)
+        self.assertEqual(percentile([], 99), 0.0)
+
+    def test_next_move_flags_deduced_mine(self):
+        """Test the solver flags a cell which must be a mine"""
+        board = {
+            (0, 0): _cell(0, 0, is_revealed=True, adjacent_mines=1),
+            (0, 1): _cell(0, 1),
+        }
+
+        self.assertEqual(next_move(board, random.Random(0)), ("flag", (0, 1)))
+
+    def test_next_move_reveals_deduced_safe_cell(self):
+        """Test the solver reveals a cell which must be safe"""
+        board = {
+            (0, 0): _cell(0, 0, is_revealed=True, adjacent_mines=1),
+            (0, 1): _cell(0, 1, is_flagged=True),
+            (1, 0): _cell(1, 0),
+        }
+
+        self.assertEqual(next_move(board, random.Random(0)), ("reveal", (1, 0)))
+
+    def test_play_game(self):
+        """Test a simulated player plays a game until it ends"""
+        recorder = Recorder()
+
+        result = play_game(InProcessClient(), recorder, GameMode.EASY, random.Random(0))
+
+        self.assertIn(result, (GameStatus.WON, GameStatus.LOST))
+        self.assertFalse(Game.objects.get().is_active())
+        report = recorder.report(1)
+        self.assertEqual(report["endpoints"]["game-list"]["requests"], 1)
+        self.assertGreater(report["endpoints"]["game-reveal"]["requests"], 0)
+
+    def test_throttled_requests_retried(self):
+        """Test a throttled request is counted apart and sent again after its delay"""
+        recorder = Recorder()
+        responses = [Throttled(2.0), (201, {"id": 1})]
+
+        def post():
+            response = responses.pop(0)
+            if isinstance(response, Exception):
+                raise response
+            return response
+
+        with mock.patch("core.loadtest.sleep") as sleep:
+            result = recorder.call("game-list", post)
+
+        self.assertEqual(result, (201, {"id": 1}))
+        sleep.assert_called_once_with(2.0)
+        report = recorder.report(1)["endpoints"]["game-list"]
+        self.assertEqual((report["requests"], report["errors"]), (1, 0))
+        self.assertEqual(report["throttled"], 1)
+
+    def test_throttled_requests_give_up(self):
+        """Test a request still throttled after the retries is given up"""
+        recorder = Recorder()
+
+        def post():
+            raise Throttled(1.0)
+
+        with mock.patch("core.loadtest.sleep"):
+            result = recorder.call("game-list", post)
+
+        self.assertEqual(result, (429, None))
+        report = recorder.report(1)["endpoints"]["game-list"]
+        self.assertEqual((report["requests"], report["throttled"]), (0, 4))
@@ -0,0 +1,148 @@
+import gzip
+import json
+from unittest import skipUnless
+
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from core import metrics
+from core.models import Game, GameMode, Cell
+from core.services import GameService
+from minesweeper.instrumentation import RequestTimer, timed
+from minesweeper.middleware import CompressionMiddleware, brotli
+
+
+class ServerTimingMiddlewareTest(TestCase):
+    """Test module for the Server-Timing middleware"""
+
+    def setUp(self):
+        """set up test creating a game and initialize cells"""
+        self.client = APIClient()
+        self.game = Game.objects.create(rows=9, columns=9, mines=10, mode=GameMode.EASY)
+        GameService.initialize_cells(self.game)
+
+    def test_server_timing_header(self):
+        """Test the timings are sent in the Server-Timing header"""
+        url = reverse("game-detail", args=[self.game.id])
+        response = self.client.get(url, format="json")
+
+        header = response["Server-Timing"]
+        self.assertIn("db;dur=", header)
+        self.assertIn("serialize;dur=", header)
+        self.assertIn("render;dur=", header)
+        self.assertIn("total;dur=", header)
+
+    def test_server_timing_game_service_phases(self):
+        """Test the GameService phases are reported on reveal"""
+        cell = Cell.objects.filter(game=self.game, is_mine=False).first()
+        url = reverse("game-reveal", args=[self.game.id])
+        data = {"row": cell.row, "column": cell.column}
+
+        response = self.client.post(url, data, format="json")
+
+        self.assertIn("flood_fill;dur=", response["Server-Timing"])
+        self.assertIn("win_check;dur=", response["Server-Timing"])
+
+    @override_settings(SLOW_REQUEST_THRESHOLD_MS=0)
+    def test_slow_request_is_logged(self):
+        """Test slow requests are logged as a structured line"""
+        with self.assertLogs("minesweeper.timing", level="INFO") as logs:
+            self.client.get(reverse("game-list"), format="json")
+
+        self.assertIn('"path": "/api/games/"', logs.output[0])
+        self.assertIn('"queries":', logs.output[0])
+
+
+class RequestTimerTest(TestCase):
+    """Test module for the request timer"""
+
+    def test_timed_without_request_is_noop(self):
+        """Test timed blocks outside a request do not fail"""
+        with timed("generation"):
+            pass
+
+    def test_server_timing_value(self):
+        """Test the Server-Timing header value format"""
+        timer = RequestTimer()
+        timer.add("flood_fill", 0.5)
+        timer.add("flood_fill", 0.25)
+
+        self.assertEqual(
+            timer.server_timing(1),
+            'db;dur=0.00;desc="0 queries", flood_fill;dur=750.00, total;dur=1000.00',
+        )
+
+
+class CompressionMiddlewareTest(TestCase):
+    """Test module for the compression middleware"""
+
+    def setUp(self):
+        """set up test creating a large game"""
+        self.client = APIClient()
+        self.game = Game.objects.create(
+            rows=30, columns=30, mines=100, mode=GameMode.CUSTOM
+        )
+        GameService.initialize_cells(self.game)
+        self.url = reverse("game-detail", args=[self.game.id])
+
+    def test_accept_encoding(self):
+        """Test the preferred encoding the client accepts is chosen"""
+        encoding = CompressionMiddleware._encoding
+
+        self.assertEqual(encoding("gzip, deflate"), "gzip")
+        self.assertEqual(encoding("br;q=1.0, gzip;q=0.8"), "br" if brotli else "gzip")
+        self.assertIsNone(encoding("gzip;q=0, br;q=0"))
+        self.assertIsNone(encoding(""))
+
+    def test_gzip_response(self):
+        """Test a large response is gzip compressed and the metrics recorded"""
+        saved = metrics.COMPRESSION_SAVED_BYTES.samples.get(("gzip",), 0)
+
+        response = self.client.get(self.url, HTTP_ACCEPT_ENCODING="gzip")
+
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertIn("Accept-Encoding", response["Vary"])
+        self.assertIn("compress;dur=", response["Server-Timing"])
+        content = json.loads(gzip.decompress(response.content))
+        self.assertEqual(content["id"], self.game.id)
+        self.assertEqual(int(response["Content-Length"]), len(response.content))
+        self.assertGreater(
+            metrics.COMPRESSION_SAVED_BYTES.samples[("gzip",)], saved + 10000
+        )
+
+    @skipUnless(brotli, "brotli is not installed")
+    def test_brotli_response(self):
+        """Test brotli is preferred when the client accepts it"""
+        response = self.client.get(self.url, HTTP_ACCEPT_ENCODING="gzip, br")
+
+        self.assertEqual(response["Content-Encoding"], "br")
+        content = json.loads(brotli.decompress(response.content))
+        self.assertEqual(content["id"], self.game.id)
+
+    def test_uncompressed_responses(self):
+        """Test the responses are sent as they are without an accepted encoding"""
+        response = self.client.get(self.url)
+        self.assertFalse(response.has_header("Content-Encoding"))
+        self.assertIn("Accept-Encoding", response["Vary"])
+
+        response = self.client.get(self.url, HTTP_ACCEPT_ENCODING="identity")
+        self.assertFalse(response.has_header("Content-Encoding"))
+
+    @override_settings(COMPRESSION_MIN_SIZE=10**6)
+    def test_small_response_not_compressed(self):
+        """Test the responses smaller than the minimum size are not compressed"""
+        response = self.client.get(self.url, HTTP_ACCEPT_ENCODING="gzip")
+
+        self.assertFalse(response.has_header("Content-Encoding"))
+        self.assertEqual(json.loads(response.content)["id"], self.game.id)
+
+    def test_streaming_response(self):
+        """Test a streaming response is compressed chunk by chunk"""
+        url = reverse("game-replay", args=[self.game.id])
+
+        response = self.client.get(url, HTTP_ACCEPT_ENCODING="gzip")
+
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        content = gzip.decompress(b"".join(response.streaming_content))
+        self.assertEqual(json.loads(content.splitlines()[0])["game"], self.game.id)
@@ -0,0 +1,208 @@
+import json
+import random
+from unittest import mock
+
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils.timezone import now
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.constants import INVALID_REPLAY_START
+from core.models import BoardSnapshot, Cell, Game, GameMode, Move, MoveAction
+from core.movelog import (
+    FLAGGED,
+    REVEALED,
+    MoveBuffer,
+    _layout,
+    apply_move,
+    board_at,
+    buffer,
+    take_snapshot,
+)
+from core.services import GameService
+
+
+@override_settings(
+    MOVE_LOG_BATCH_SIZE=1,
+    MOVE_SNAPSHOT_INTERVAL=2,
+    MOVE_SNAPSHOT_DELAY=0,
+    TASK_BACKEND="immediate",
+)
+class MoveLogTest(TestCase):
+    """Test module for the move log"""
+
+    def setUp(self):
+        """set up test creating a game on a seeded board"""
+        random.seed(0)
+        self.client = APIClient()
+        self.game = Game.objects.create(rows=9, columns=9, mines=10, mode=GameMode.EASY)
+        GameService.initialize_cells(self.game)
+        self.cells = Cell.objects.filter(game=self.game)
+
+    def _play(self, action, cell):
+        url = reverse(f"game-{action}", args=[self.game.id])
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(url, {"row": cell.row, "column": cell.column})
+
+    def _board_from_cells(self):
+        board = bytearray(81)
+        for cell in self.cells:
+            index = cell.row * 9 + cell.column
+            board[index] = REVEALED * cell.is_revealed | FLAGGED * cell.is_flagged
+        return board
+
+    def _play_safe_moves(self, count):
+        for cell in self.cells.filter(is_mine=False).order_by("row", "column"):
+            cell.refresh_from_db()
+            if cell.is_revealed:
+                continue
+            self._play("flag", cell)
+            self._play("reveal", cell)
+            count -= 2
+            if count <= 0 or not self.game.cells.filter(is_revealed=False).exists():
+                return
+
+    def test_moves_are_logged(self):
+        """Test the reveals and flags are logged in the order they are played"""
+        mine = self.cells.filter(is_mine=True).first()
+        self._play("flag", mine)
+        self._play("flag", mine)
+
+        moves = Move.objects.filter(game=self.game).order_by("played_at", "id")
+        self.assertEqual([move.get_action_display() for move in moves], ["Flag"] * 2)
+
+    @override_settings(MOVE_LOG_BATCH_SIZE=3)
+    def test_moves_are_buffered(self):
+        """Test the moves are written in batches and when the game ends"""
+        mine = self.cells.filter(is_mine=True).first()
+        self._play("flag", mine)
+        self._play("flag", mine)
+        self.assertFalse(Move.objects.filter(game=self.game).exists())
+
+        self._play("reveal", mine)
+
+        self.assertEqual(Move.objects.filter(game=self.game).count(), 3)
+        self.assertEqual(buffer.moves, [])
+
+    @override_settings(MOVE_LOG_BATCH_SIZE=2)
+    def test_full_buffer_is_flushed_in_background(self):
+        """Test a full buffer is flushed by a task, not by the move filling it"""
+        mine = self.cells.filter(is_mine=True).first()
+        move = Move(
+            game=self.game, action=MoveAction.FLAG, row=mine.row, column=mine.column
+        )
+        move_buffer = MoveBuffer()
+        move_buffer.add(move, "default")
+
+        with mock.patch("core.movelog.enqueue") as enqueue:
+            move_buffer.add(move, "default")
+
+        enqueue.assert_called_once()
+        self.assertEqual(len(move_buffer.moves), 2)
+        move_buffer.timer.cancel()
+
+    @override_settings(MOVE_LOG_BATCH_SIZE=1, TASK_BACKEND="database")
+    def test_full_buffer_wakes_timer(self):
+        """Test a full buffer is flushed by the timer with the database backend"""
+        mine = self.cells.filter(is_mine=True).first()
+        move = Move(
+            game=self.game, action=MoveAction.FLAG, row=mine.row, column=mine.column
+        )
+        move_buffer = MoveBuffer()
+
+        with mock.patch.object(MoveBuffer, "_start_timer") as start_timer:
+            move_buffer.add(move, "default")
+
+        start_timer.assert_called_once_with(0)
+        self.assertEqual(len(move_buffer.moves), 1)
+
+    def test_board_is_rebuilt_from_snapshots(self):
+        """Test rebuilding a board from a snapshot matches the cells"""
+        self._play_safe_moves(6)
+        moves = Move.objects.filter(game=self.game).count()
+        layout = _layout(self.game)
+        self.game.refresh_from_db()
+
+        self.assertTrue(self.game.is_active())
+        self.assertGreaterEqual(BoardSnapshot.objects.filter(game=self.game).count(), 2)
+        self.assertEqual(board_at(self.game, moves, layout), self._board_from_cells())
+        with_snapshots = board_at(self.game, moves - 1, layout)
+        BoardSnapshot.objects.filter(game=self.game).delete()
+        self.assertEqual(board_at(self.game, moves - 1, layout), with_snapshots)
+
+    @override_settings(MOVE_SNAPSHOT_INTERVAL=1, MOVE_SNAPSHOT_DELAY=10)
+    def test_snapshots_wait_for_every_process(self):
+        """Test moves flushed out of order by two processes are snapshotted in order"""
+        first, second = MoveBuffer(), MoveBuffer()
+        mine, safe = self.cells.filter(is_mine=True).first(), self.cells.first()
+        moves = [
+            Move(
+                game=self.game,
+                action=MoveAction.FLAG,
+                row=cell.row,
+                column=cell.column,
+                played_at=now(),
+            )
+            for cell in (mine, mine, safe)
+        ]
+        first.add(moves[0], "default")
+        second.add(moves[1], "default")
+        second.add(moves[2], "default")
+
+        second.flush()
+        first.flush()
+        self.assertFalse(BoardSnapshot.objects.filter(game=self.game).exists())
+
+        with override_settings(MOVE_SNAPSHOT_DELAY=0):
+            take_snapshot(self.game.id)
+        snapshot = BoardSnapshot.objects.get(game=self.game)
+        self.assertEqual(snapshot.moves, 3)
+        board = bytearray(81)
+        for move in moves:
+            apply_move(self.game, board, *_layout(self.game), move)
+        self.assertEqual(bytes(snapshot.board), bytes(board))
+
+    def test_replay(self):
+        """Test the replay streams the board and the following moves"""
+        self._play_safe_moves(4)
+        url = reverse("game-replay", args=[self.game.id])
+
+        response = self.client.get(url, {"from": 1})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        lines = [
+            json.loads(line)
+            for line in b"".join(response.streaming_content).splitlines()
+        ]
+        self.assertEqual(lines[0]["moves"], 1)
+        self.assertEqual(len(lines[0]["board"]), 9)
+        self.assertIn("F", "".join(lines[0]["board"]))
+        self.assertEqual(
+            len(lines) - 1, Move.objects.filter(game=self.game).count() - 1
+        )
+        self.assertEqual(lines[1]["action"], "reveal")
+
+    def test_replay_invalid_start(self):
+        """Test the replay rejects an invalid number of moves"""
+        url = reverse("game-replay", args=[self.game.id])
+
+        response = self.client.get(url, {"from": "first"})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data, INVALID_REPLAY_START)
+
+    def test_no_guess_game_initial_snapshot(self):
+        """Test the opening of a no-guess game is stored before the first move"""
+        game = Game.objects.create(
+            rows=9, columns=9, mines=10, mode=GameMode.EASY, no_guess=True
+        )
+        GameService.initialize_cells(game)
+
+        snapshot = BoardSnapshot.objects.get(game=game)
+        self.assertEqual(snapshot.moves, 0)
+        self.assertEqual(
+            sum(bytes(snapshot.board)),
+            Cell.objects.filter(game=game, is_revealed=True).count(),
+        )
@@ -0,0 +1,94 @@
+import os
+import tempfile
+from io import StringIO
+from pathlib import Path
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+
+class ProfilingMiddlewareTest(TestCase):
+    """Test module for the profiling middleware"""
+
+    def setUp(self):
+        """set up test creating a profiles directory"""
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.profiling_settings = override_settings(
+            PROFILING_ENABLED=True,
+            PROFILING_DIR=self.directory.name,
+            PROFILING_TOKEN="secret",
+            PROFILING_SAMPLE_RATE=0,
+        )
+        self.profiling_settings.enable()
+        self.addCleanup(self.profiling_settings.disable)
+        self.client = APIClient()
+        self.url = reverse("game-list")
+
+    def test_profile_with_token_header(self):
+        """Test a request with the token header is profiled"""
+        response = self.client.get(self.url, HTTP_X_PROFILE="secret")
+
+        profile_id = response["X-Profile-Id"]
+        self.assertTrue(Path(self.directory.name, f"{profile_id}.prof").exists())
+
+    def test_profile_with_token_query_param(self):
+        """Test a request with the token query param is profiled"""
+        response = self.client.get(self.url, {"profile": "secret"})
+
+        self.assertIn("X-Profile-Id", response)
+
+    def test_no_profile_with_wrong_token(self):
+        """Test a request with a wrong token is not profiled"""
+        response = self.client.get(self.url, HTTP_X_PROFILE="wrong")
+
+        self.assertNotIn("X-Profile-Id", response)
+        self.assertEqual(list(Path(self.directory.name).glob("*.prof")), [])
+
+    def test_profile_sample_rate(self):
+        """Test requests are profiled according to the sample rate"""
+        with override_settings(PROFILING_SAMPLE_RATE=1):
+            response = self.client.get(self.url)
+
+        self.assertIn("X-Profile-Id", response)
+
+    @override_settings(PROFILING_MAX_DUMPS=2)
+    def test_oldest_dumps_deleted(self):
+        """Test only the last PROFILING_MAX_DUMPS dumps are kept"""
+        for age in (3, 2, 1):
+            path = Path(self.directory.name, f"old-{age}.prof")
+            path.write_bytes(b"")
+            os.utime(path, (path.stat().st_atime, path.stat().st_mtime - age * 60))
+
+        response = self.client.get(self.url, HTTP_X_PROFILE="secret")
+
+        self.assertEqual(
+            sorted(path.stem for path in Path(self.directory.name).glob("*.prof")),
+            sorted([response["X-Profile-Id"], "old-1"]),
+        )
+
+    def test_profile_summary_command(self):
+        """Test the summary of the collected profiles"""
+        self.client.get(self.url, HTTP_X_PROFILE="secret")
+        self.client.get(self.url, HTTP_X_PROFILE="secret")
+        output = StringIO()
+
+        call_command("profile_summary", dir=self.directory.name, stdout=output)
+
+        self.assertIn("2 profile dumps", output.getvalue())
+        self.assertIn("cumulative", output.getvalue())
+
+    def test_profile_summary_command_without_dumps(self):
+        """Test the summary fails when there are no profiles"""
+        with self.assertRaises(CommandError):
+            call_command("profile_summary", dir=self.directory.name)
+
+    @override_settings(PROFILING_ENABLED=False)
+    def test_profiling_disabled(self):
+        """Test requests are not profiled when profiling is disabled"""
+        response = APIClient().get(self.url, HTTP_X_PROFILE="secret")
+
+        self.assertNotIn("X-Profile-Id", response)
@@ -0,0 +1,142 @@
+import time
+from datetime import timedelta
+from unittest import mock
+
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils.timezone import now
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.test import APIClient
+
+from core.models import Cell, Game, GameMode, GameStatus
+from core.services import GameService
+from core.views import LAST_WRITE_COOKIE
+from minesweeper.routers import ReplicaRouter, replica_reads
+
+
+@override_settings(DATABASE_REPLICAS=["replica_0"])
+class ReplicaRouterTest(TestCase):
+    """Test module for the read replica router"""
+
+    def setUp(self):
+        """set up test creating the router"""
+        self.router = ReplicaRouter()
+
+    def test_reads_go_to_primary_by_default(self):
+        """Test reads outside replica_reads use the default database"""
+        self.assertIsNone(self.router.db_for_read(Game))
+
+    def test_reads_go_to_replica(self):
+        """Test reads inside replica_reads use a replica"""
+        with replica_reads():
+            self.assertEqual(self.router.db_for_read(Game), "replica_0")
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_reads_without_replicas(self):
+        """Test reads inside replica_reads without replicas use the default database"""
+        with replica_reads():
+            self.assertIsNone(self.router.db_for_read(Game))
+
+    def test_related_reads_stay_on_instance_database(self):
+        """Test related objects are read from the database of the instance"""
+        game = Game(rows=9, columns=9, mines=10)
+        game._state.db = "replica_0"
+
+        self.assertEqual(self.router.db_for_read(Cell, instance=game), "replica_0")
+
+    def test_writes_go_to_primary(self):
+        """Test objects read from a replica are written to the primary database"""
+        game = Game(rows=9, columns=9, mines=10)
+        game._state.db = "replica_0"
+
+        self.assertEqual(self.router.db_for_write(Game, instance=game), "default")
+
+
+@override_settings(DATABASE_REPLICAS=["default"])
+class GameViewSetReplicaTest(TestCase):
+    """Test module for the endpoints reading from the replicas"""
+
+    def setUp(self):
+        """set up test creating a game and spying on the replica choice"""
+        self.client = APIClient()
+        self.game = Game.objects.create(rows=9, columns=9, mines=10, mode=GameMode.EASY)
+        GameService.initialize_cells(self.game)
+        patcher = mock.patch(
+            "minesweeper.routers.random.choice", side_effect=lambda aliases: aliases[0]
+        )
+        self.choice = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_list_reads_from_replica(self):
+        """Test the game list is read from a replica"""
+        response = self.client.get(reverse("game-list"))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(self.choice.called)
+
+    def test_leaderboard_reads_from_replica(self):
+        """Test the leaderboard is read from a replica"""
+        response = self.client.get(reverse("game-leaderboard"))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(self.choice.called)
+
+    def test_retrieve_finished_game_from_replica(self):
+        """Test a finished game is served from a replica"""
+        Game.objects.filter(id=self.game.id).update(
+            status=GameStatus.WON, updated_at=now() - timedelta(minutes=1)
+        )
+        url = reverse("game-detail", args=[self.game.id])
+
+        with mock.patch("core.views.ModelViewSet.retrieve") as primary_retrieve:
+            response = self.client.get(url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["status"], GameStatus.WON)
+        primary_retrieve.assert_not_called()
+
+    def test_retrieve_after_write_from_primary(self):
+        """Test a client which just wrote reads the games from the primary database"""
+        Game.objects.filter(id=self.game.id).update(status=GameStatus.WON)
+        response = self.client.patch(
+            reverse("game-detail", args=[self.game.id]), {"user": "ana"}
+        )
+        self.assertIn(LAST_WRITE_COOKIE, response.cookies)
+
+        with mock.patch(
+            "core.views.ModelViewSet.retrieve", return_value=Response()
+        ) as primary_retrieve:
+            self.client.get(reverse("game-detail", args=[self.game.id]))
+
+        primary_retrieve.assert_called_once()
+
+    def test_retrieve_after_expired_write_from_replica(self):
+        """Test a client which wrote long ago reads the games from a replica"""
+        Game.objects.filter(id=self.game.id).update(status=GameStatus.WON)
+        self.client.cookies[LAST_WRITE_COOKIE] = str(time.time() - 60)
+
+        with mock.patch("core.views.ModelViewSet.retrieve") as primary_retrieve:
+            response = self.client.get(reverse("game-detail", args=[self.game.id]))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        primary_retrieve.assert_not_called()
+
+    def test_retrieve_active_game_from_primary(self):
+        """Test an active game is served from the primary database"""
+        url = reverse("game-detail", args=[self.game.id])
+
+        with mock.patch(
+            "core.views.ModelViewSet.retrieve", return_value=Response()
+        ) as primary_retrieve:
+            self.client.get(url)
+
+        primary_retrieve.assert_called_once()
+
+    def test_moves_read_from_primary(self):
+        """Test the moves do not read from a replica"""
+        data = {"row": 0, "column": 0}
+
+        self.client.post(reverse("game-flag", args=[self.game.id]), data)
+
+        self.choice.assert_not_called()
@@ -0,0 +1,199 @@
+import json
+from io import StringIO
+from unittest import skipUnless
+
+from django.conf import settings
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import (
+    Cell,
+    Game,
+    GameMode,
+    GameRollup,
+    GameStatus,
+    PlayerStats,
+    RollupPeriod,
+)
+from core.sharding import ShardRouter, db_for, games_on, shard_for, top_games
+
+SHARDS = ["default", "shard_0", "shard_1"]
+
+
+@override_settings(GAME_SHARDS=SHARDS)
+class ShardingTest(TestCase):
+    """Test module for the placement of the games on the shards"""
+
+    def test_shard_for(self):
+        """Test the games are placed on the shards by id"""
+        self.assertEqual(shard_for(3), "default")
+        self.assertEqual(shard_for(4), "shard_0")
+        self.assertEqual(shard_for("5"), "shard_1")
+
+    def test_top_games_merges_shards(self):
+        """Test the top games of every shard are merged"""
+        durations = {"default": [1, 5], "shard_0": [2, 3], "shard_1": [4]}
+
+        top = top_games(lambda games: durations[games.db], key=lambda d: d, size=3)
+
+        self.assertEqual(top, [1, 2, 3])
+
+    def test_router_only_migrates_games_and_cells_on_shards(self):
+        """Test the shards only get the tables of the games"""
+        router = ShardRouter()
+
+        self.assertTrue(router.allow_migrate("shard_0", "core", "game"))
+        self.assertTrue(router.allow_migrate("shard_0", "core", "cell"))
+        self.assertTrue(router.allow_migrate("shard_0", "core", "move"))
+        self.assertFalse(router.allow_migrate("shard_0", "core", "gamesequence"))
+        self.assertFalse(router.allow_migrate("shard_0", "auth", "user"))
+        self.assertIsNone(router.allow_migrate("default", "core", "gamesequence"))
+
+
+@skipUnless(len(settings.GAME_SHARDS) > 1, "Set DATABASE_SHARD_URLS to run")
+@override_settings(TASK_BACKEND="immediate")
+class ShardedGameViewSetTest(TestCase):
+    """Test module for the game endpoints on several shards"""
+
+    databases = "__all__"
+
+    def setUp(self):
+        """set up test creating a game on every shard"""
+        self.client = APIClient()
+        self.url_list = reverse("game-list")
+        self.games = []
+        for _ in settings.GAME_SHARDS:
+            response = self.client.post(
+                self.url_list, {"mode": GameMode.EASY}, format="json"
+            )
+            self.games.append(
+                Game.objects.using(shard_for(response.data["id"])).get(
+                    id=response.data["id"]
+                )
+            )
+
+    def test_games_are_spread_across_shards(self):
+        """Test each game and its cells live on its own shard"""
+        self.assertEqual(
+            {game._state.db for game in self.games}, set(settings.GAME_SHARDS)
+        )
+        for game in self.games:
+            self.assertEqual(game._state.db, db_for(game))
+            self.assertEqual(
+                Cell.objects.using(db_for(game)).filter(game=game).count(), 81
+            )
+
+    def test_play_on_shard(self):
+        """Test revealing and flagging cells of a game on a shard"""
+        game = self.games[-1]
+        cells = Cell.objects.using(db_for(game)).filter(game=game)
+        mine = cells.filter(is_mine=True).first()
+        data = {"row": mine.row, "column": mine.column}
+
+        response = self.client.post(
+            reverse("game-flag", args=[game.id]), data, format="json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.data["is_flagged"])
+
+        with self.captureOnCommitCallbacks(execute=True, using=db_for(game)):
+            response = self.client.post(
+                reverse("game-reveal", args=[game.id]), data, format="json"
+            )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["status"], GameStatus.LOST)
+        self.assertFalse(cells.filter(is_revealed=False).exists())
+
+    def test_retrieve_and_delete_on_shard(self):
+        """Test retrieving and deleting a game on a shard"""
+        game = self.games[-1]
+        url = reverse("game-detail", args=[game.id])
+
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data["cells"]), 81)
+
+        response = self.client.delete(url)
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertFalse(games_on(db_for(game)).filter(id=game.id).exists())
+
+    def test_list_games_of_every_shard(self):
+        """Test the game list gathers the games of every shard"""
+        response = self.client.get(self.url_list)
+
+        self.assertEqual(
+            [game["id"] for game in response.data], [game.id for game in self.games]
+        )
+
+    def test_leaderboard_merges_shards(self):
+        """Test the leaderboard merges the fastest games of every shard"""
+        for duration, game in zip((30, 10, 20), self.games):
+            game.status = GameStatus.WON
+            game.duration = duration
+            game.save()
+
+        response = self.client.get(reverse("game-leaderboard"), {"size": 2})
+
+        durations = [entry["duration"] for entry in response.data[GameMode.EASY]]
+        self.assertEqual(durations, [10, 20])
+
+    def test_backfill_player_stats_across_shards(self):
+        """Test the player stats count the games of every shard"""
+        for game in self.games:
+            game.user = "player"
+            game.end_game(GameStatus.WON)
+
+        call_command("backfill_player_stats", chunk_size=2, stdout=StringIO())
+
+        stats = PlayerStats.objects.get(user="player")
+        self.assertEqual((stats.wins, stats.best_streak), (3, 3))
+        for game in self.games:
+            game.refresh_from_db()
+            self.assertTrue(game.stats_recorded)
+
+    def test_rebuild_rollups_across_shards(self):
+        """Test the rollups count the games of every shard"""
+        for game in self.games:
+            game.end_game(GameStatus.LOST)
+
+        call_command("rebuild_rollups", chunk_size=2, stdout=StringIO())
+
+        rollup = GameRollup.objects.get(period=RollupPeriod.DAY)
+        self.assertEqual(rollup.losses, 3)
+
+    def test_bulk_create_across_shards(self):
+        """Test the games created in bulk are placed on their shards"""
+        data = {"users": ["ana", "bob", "eve", "max"], "shared_layout": False}
+
+        response = self.client.post(reverse("game-bulk"), data, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        for game in response.data:
+            shard = shard_for(game["id"])
+            self.assertEqual(
+                Cell.objects.using(shard).filter(game_id=game["id"]).count(), 81
+            )
+        self.assertEqual(
+            {shard_for(game["id"]) for game in response.data}, set(settings.GAME_SHARDS)
+        )
+
+    def test_export_across_shards(self):
+        """Test the export streams the finished games and boards of every shard"""
+        for game in self.games:
+            game.end_game(GameStatus.LOST)
+
+        response = self.client.get(reverse("game-export"), {"boards": "true"})
+
+        records = [
+            json.loads(line)
+            for line in b"".join(response.streaming_content).splitlines()
+        ]
+        self.assertEqual(
+            sorted(record["id"] for record in records),
+            sorted(game.id for game in self.games),
+        )
+        for record in records:
+            self.assertEqual("".join(record["board"]).count("*"), 10)
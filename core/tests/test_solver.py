@@ -0,0 +1,96 @@
+import random
+from time import perf_counter
+
+from django.test import SimpleTestCase
+
+from core.solver import (
+    Timeout,
+    adjacent_counts,
+    is_no_guess,
+    neighbors_table,
+    no_guess_mines,
+    opening,
+    random_mines,
+    start_cell,
+)
+
+
+def _layout(rows):
+    """Return the size and the layout of a board drawn with `*` for mines."""
+    return (
+        len(rows),
+        len(rows[0]),
+        bytearray(char == "*" for row in rows for char in row),
+    )
+
+
+class SolverTest(SimpleTestCase):
+    """Test module for the board layouts and the no-guess solver"""
+
+    def test_neighbors_table(self):
+        """Test the neighbors of the corner, edge and inner cells"""
+        neighbors = neighbors_table(3, 3)
+
+        self.assertEqual(sorted(neighbors[0]), [1, 3, 4])
+        self.assertEqual(sorted(neighbors[1]), [0, 2, 3, 4, 5])
+        self.assertEqual(len(neighbors[4]), 8)
+
+    def test_random_mines(self):
+        """Test the mines are placed outside the excluded cells"""
+        layout = random_mines(4, 4, 15, random.Random(1), excluded={5})
+
+        self.assertEqual(sum(layout), 15)
+        self.assertEqual(layout[5], 0)
+
+    def test_adjacent_counts_and_opening(self):
+        """Test the adjacent mines and the cells opened by a zero"""
+        rows, columns, layout = _layout(["*..", "...", "..."])
+        counts = adjacent_counts(rows, columns, layout)
+
+        self.assertEqual(counts, [0, 1, 0, 1, 1, 0, 0, 0, 0])
+        self.assertEqual(opening(rows, columns, counts, 8), set(range(1, 9)))
+
+    def test_solvable_board(self):
+        """Test a board solved from its opening with deductions only"""
+        rows, columns, layout = _layout(["*...", "....", "...*", "...."])
+        counts = adjacent_counts(rows, columns, layout)
+
+        self.assertTrue(is_no_guess(rows, columns, layout, counts, 12))
+
+    def test_board_needing_a_guess(self):
+        """Test a board with a 50/50 is not no-guess"""
+        rows, columns, layout = _layout(["*.", "..", "..", ".."])
+        counts = adjacent_counts(rows, columns, layout)
+
+        self.assertFalse(is_no_guess(rows, columns, layout, counts, 7))
+
+    def test_timeout(self):
+        """Test the solver gives up once the deadline has passed"""
+        rows, columns, layout = _layout(["*...", "....", "...*", "...."])
+        counts = adjacent_counts(rows, columns, layout)
+
+        with self.assertRaises(Timeout):
+            is_no_guess(rows, columns, layout, counts, 12, perf_counter() - 1)
+
+    def test_no_guess_mines(self):
+        """Test the generated layout is no-guess with an opening at the start"""
+        start = start_cell(16, 30)
+        layout, counts, attempts, solved = no_guess_mines(
+            16, 30, 99, start, random.Random(1), perf_counter() + 10
+        )
+
+        self.assertTrue(solved)
+        self.assertGreaterEqual(attempts, 1)
+        self.assertEqual(sum(layout), 99)
+        self.assertEqual(counts[start], 0)
+        self.assertTrue(is_no_guess(16, 30, layout, counts, start))
+
+    def test_no_guess_mines_fallback(self):
+        """Test a layout is still returned once the time budget is exhausted"""
+        layout, _, attempts, solved = no_guess_mines(
+            16, 30, 99, start_cell(16, 30), random.Random(1), perf_counter() - 1
+        )
+
+        self.assertFalse(solved)
+        self.assertEqual(attempts, 1)
+        self.assertEqual(sum(layout), 99)
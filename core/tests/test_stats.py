@@ -0,0 +1,139 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils.timezone import now
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Cell, Game, GameMode, GameStatus, PlayerStats
+from core.services import GameService
+from core.stats import record_games, unrecorded_games, update_player_stats
+
+
+def _finished_game(user, status, mode=GameMode.EASY, duration=10.0, minutes=0):
+    return Game.objects.create(
+        user=user,
+        rows=9,
+        columns=9,
+        mines=10,
+        mode=mode,
+        status=status,
+        duration=duration,
+        finished_at=now() + timedelta(minutes=minutes),
+    )
+
+
+class PlayerStatsTest(TestCase):
+    """Test module for the player stats"""
+
+    def setUp(self):
+        """set up test creating the api client"""
+        self.client = APIClient()
+
+    def test_add_game(self):
+        """Test the wins, streaks and best times of a player"""
+        stats = PlayerStats(user="player")
+        for status_, duration in (
+            (GameStatus.WON, 30.0),
+            (GameStatus.WON, 20.0),
+            (GameStatus.LOST, 5.0),
+            (GameStatus.WON, 25.0),
+        ):
+            stats.add_game(Game(status=status_, mode=GameMode.EASY, duration=duration))
+
+        self.assertEqual((stats.games, stats.wins, stats.losses), (4, 3, 1))
+        self.assertEqual((stats.current_streak, stats.best_streak), (1, 2))
+        self.assertEqual(stats.best_times, {GameMode.EASY: 20.0})
+        self.assertEqual(stats.win_rate, 0.75)
+
+    @override_settings(TASK_BACKEND="immediate")
+    def test_stats_updated_when_game_ends(self):
+        """Test the stats of the player are updated once the game is lost"""
+        game = Game.objects.create(
+            user="player", rows=9, columns=9, mines=10, mode=GameMode.EASY
+        )
+        GameService.initialize_cells(game)
+        mine = Cell.objects.filter(game=game, is_mine=True).first()
+        url = reverse("game-reveal", args=[game.id])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(url, {"row": mine.row, "column": mine.column})
+
+        stats = PlayerStats.objects.get(user="player")
+        self.assertEqual((stats.games, stats.losses), (1, 1))
+        game.refresh_from_db()
+        self.assertTrue(game.stats_recorded)
+
+    @override_settings(TASK_BACKEND="immediate")
+    def test_stats_updated_when_user_is_set(self):
+        """Test a finished game is counted once its user is set"""
+        game = _finished_game(None, GameStatus.WON)
+        url = reverse("game-detail", args=[game.id])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(url, {"user": "player"}, format="json")
+
+        self.assertEqual(PlayerStats.objects.get(user="player").wins, 1)
+
+    def test_game_counted_once(self):
+        """Test updating the stats twice for a game counts it once"""
+        game = _finished_game("player", GameStatus.WON)
+
+        update_player_stats(game.id)
+        update_player_stats(game.id)
+
+        self.assertEqual(PlayerStats.objects.get(user="player").games, 1)
+
+    def test_retrieve_stats(self):
+        """Test retrieving the stats of a player"""
+        update_player_stats(_finished_game("player one", GameStatus.WON).id)
+
+        response = self.client.get(reverse("player-detail", args=["player one"]))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["wins"], 1)
+        self.assertEqual(response.data["win_rate"], 1.0)
+        self.assertEqual(response.data["best_times"], {GameMode.EASY: 10.0})
+
+    def test_retrieve_stats_unknown_player(self):
+        """Test retrieving the stats of a player without games"""
+        response = self.client.get(reverse("player-detail", args=["nobody"]))
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_backfill(self):
+        """Test the backfill counts the games in the order they finished"""
+        _finished_game("player", GameStatus.WON, minutes=3)
+        _finished_game("player", GameStatus.LOST, minutes=1)
+        _finished_game("player", GameStatus.WON, minutes=2)
+        _finished_game("other", GameStatus.WON, GameMode.HARD, 50.0)
+        _finished_game(None, GameStatus.WON)
+
+        call_command("backfill_player_stats", chunk_size=2, stdout=StringIO())
+
+        stats = PlayerStats.objects.get(user="player")
+        self.assertEqual((stats.games, stats.wins, stats.current_streak), (3, 2, 2))
+        self.assertEqual(PlayerStats.objects.get(user="other").best_times["hard"], 50)
+        self.assertEqual(PlayerStats.objects.count(), 2)
+
+    def test_backfill_skips_games_counted_meanwhile(self):
+        """Test the backfill skips the games counted after they were read"""
+        game = _finished_game("player", GameStatus.WON)
+        chunk = list(unrecorded_games(10))
+        update_player_stats(game.id)
+
+        self.assertEqual(record_games(chunk), 0)
+        self.assertEqual(PlayerStats.objects.get(user="player").games, 1)
+
+    def test_backfill_reset(self):
+        """Test the backfill skips counted games unless the stats are reset"""
+        update_player_stats(_finished_game("player", GameStatus.WON).id)
+
+        call_command("backfill_player_stats", stdout=StringIO())
+        self.assertEqual(PlayerStats.objects.get(user="player").games, 1)
+
+        call_command("backfill_player_stats", reset=True, stdout=StringIO())
+        self.assertEqual(PlayerStats.objects.get(user="player").games, 1)
@@ -0,0 +1,156 @@
+from datetime import timedelta
+
+from django.core.management import call_command
+from django.db import OperationalError
+from django.test import TestCase, override_settings
+from django.utils.timezone import now
+
+from core.models import Task, TaskStatus
+from core.tasks import ThreadBackend, enqueue, load_task, task
+
+calls = []
+
+
+@task
+def record(value):
+    calls.append(value)
+
+
+@task
+def fail():
+    raise RuntimeError("failed")
+
+
+@task
+def locked(value):
+    calls.append(value)
+    if len(calls) < 3:
+        raise OperationalError("database is locked")
+
+
+def not_a_task():
+    pass
+
+
+class TasksTest(TestCase):
+    """Test module for the background tasks"""
+
+    def setUp(self):
+        """set up test clearing the recorded calls"""
+        calls.clear()
+
+    def test_load_task(self):
+        """Test only functions marked as tasks can be loaded"""
+        self.assertIs(load_task(record.task_name), record)
+        with self.assertRaises(ValueError):
+            load_task("core.tests.test_tasks.not_a_task")
+
+    @override_settings(TASK_BACKEND="immediate")
+    def test_enqueue_runs_after_commit(self):
+        """Test a task is only run once the transaction is committed"""
+        with self.captureOnCommitCallbacks(execute=True):
+            enqueue(record, 1)
+            self.assertEqual(calls, [])
+
+        self.assertEqual(calls, [1])
+
+    @override_settings(TASK_BACKEND="immediate")
+    def test_failing_task_is_logged(self):
+        """Test a failing task is logged instead of failing the request"""
+        with self.assertLogs("minesweeper.tasks", level="ERROR"):
+            with self.captureOnCommitCallbacks(execute=True):
+                enqueue(fail)
+
+    def test_thread_backend(self):
+        """Test the thread backend runs the tasks on its thread pool"""
+        backend = ThreadBackend()
+
+        backend.submit(record.task_name, [2])
+        backend.executor.shutdown(wait=True)
+
+        self.assertEqual(calls, [2])
+
+    @override_settings(TASK_MAX_ATTEMPTS=3, TASK_RETRY_DELAY=0)
+    def test_thread_backend_retries_database_errors(self):
+        """Test the thread backend retries a task failing on database errors"""
+        with self.assertLogs("minesweeper.tasks", level="WARNING") as logs:
+            ThreadBackend._run(locked.task_name, [8])
+
+        self.assertEqual(calls, [8, 8, 8])
+        self.assertEqual([entry.levelname for entry in logs.records], ["WARNING"] * 2)
+
+    @override_settings(TASK_MAX_ATTEMPTS=2, TASK_RETRY_DELAY=0)
+    def test_thread_backend_gives_up(self):
+        """Test the thread backend logs a task still failing after TASK_MAX_ATTEMPTS"""
+        with self.assertLogs("minesweeper.tasks", level="WARNING") as logs:
+            ThreadBackend._run(locked.task_name, [9])
+
+        self.assertEqual(calls, [9, 9])
+        self.assertEqual(
+            [entry.levelname for entry in logs.records], ["WARNING", "ERROR"]
+        )
+
+
+@override_settings(TASK_BACKEND="database", TASK_MAX_ATTEMPTS=2)
+class DatabaseTasksTest(TestCase):
+    """Test module for the database task backend and its worker"""
+
+    def setUp(self):
+        """set up test clearing the recorded calls"""
+        calls.clear()
+
+    def test_enqueue_stores_task(self):
+        """Test the task is stored once the transaction is committed"""
+        with self.captureOnCommitCallbacks(execute=True):
+            enqueue(record, 3)
+
+        queued_task = Task.objects.get()
+        self.assertEqual(queued_task.name, record.task_name)
+        self.assertEqual(queued_task.args, [3])
+        self.assertEqual(queued_task.status, TaskStatus.PENDING)
+
+    def test_worker_runs_and_deletes_task(self):
+        """Test the worker runs the pending tasks and deletes them"""
+        with self.captureOnCommitCallbacks(execute=True):
+            enqueue(record, 4)
+
+        call_command("run_tasks", "--burst")
+
+        self.assertEqual(calls, [4])
+        self.assertFalse(Task.objects.exists())
+
+    def test_worker_retries_failed_task(self):
+        """Test a failing task is retried until TASK_MAX_ATTEMPTS"""
+        with self.captureOnCommitCallbacks(execute=True):
+            enqueue(fail)
+
+        with self.assertLogs("minesweeper.tasks", level="ERROR") as logs:
+            call_command("run_tasks", "--burst")
+
+        queued_task = Task.objects.get()
+        self.assertEqual(len(logs.output), 2)
+        self.assertEqual(queued_task.status, TaskStatus.FAILED)
+        self.assertEqual(queued_task.attempts, 2)
+        self.assertIn("failed", queued_task.error)
+
+    def test_worker_reclaims_expired_lease(self):
+        """Test a task left running past its lease is run again, then failed"""
+        expired = now() - timedelta(seconds=301)
+        stale = Task.objects.create(
+            name=record.task_name, args=[5], status=TaskStatus.RUNNING, attempts=1
+        )
+        exhausted = Task.objects.create(
+            name=record.task_name, args=[6], status=TaskStatus.RUNNING, attempts=2
+        )
+        running = Task.objects.create(
+            name=record.task_name, args=[7], status=TaskStatus.RUNNING, attempts=1
+        )
+        Task.objects.filter(id__in=[stale.id, exhausted.id]).update(updated_at=expired)
+
+        call_command("run_tasks", "--burst")
+
+        self.assertEqual(calls, [5])
+        self.assertEqual(
+            dict(Task.objects.values_list("id", "status")),
+            {exhausted.id: TaskStatus.FAILED, running.id: TaskStatus.RUNNING},
+        )
@@ -0,0 +1,229 @@
+import os
+import tempfile
+
+from django.conf import settings as django_settings
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core import metrics
+from core.models import Game, GameMode
+from core.services import GameService
+from core.throttling import TokenBucketStore, board_size, parse_rate
+
+RATES = {
+    "client": "100/min",
+    "create_small": "2/min",
+    "create_medium": "2/min",
+    "create_large": "1/min",
+    "bulk": "3/min",
+    "move": "2/min",
+}
+
+
+class TokenBucketStoreTest(TestCase):
+    """Test module for the token bucket store"""
+
+    def setUp(self):
+        """set up test creating a store on a temporary file"""
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, "throttle.sqlite3")
+        self.store = TokenBucketStore(self.path)
+
+    def test_parse_rate(self):
+        """Test a rate gives the bucket capacity and its refill per second"""
+        self.assertEqual(parse_rate("30/min"), (30, 0.5))
+        self.assertEqual(parse_rate("10/s"), (10, 10))
+
+    def test_take_until_empty(self):
+        """Test a bucket allows a burst then waits for the refill"""
+        self.assertEqual(self.store.take("key", 2, 0.5, now=100), 0)
+        self.assertEqual(self.store.take("key", 2, 0.5, now=100), 0)
+        self.assertEqual(self.store.take("key", 2, 0.5, now=100), 2)
+        self.assertEqual(self.store.take("key", 2, 0.5, now=101), 1)
+        self.assertEqual(self.store.take("key", 2, 0.5, now=102), 0)
+        self.assertEqual(self.store.take("other", 2, 0.5, now=102), 0)
+
+    def test_buckets_shared_between_stores(self):
+        """Test the buckets are shared by the stores of the same file"""
+        other = TokenBucketStore(self.path)
+
+        self.assertEqual(self.store.take("key", 1, 1, now=100), 0)
+        self.assertEqual(other.take("key", 1, 1, now=100), 1)
+
+    def test_cost_above_capacity_refused(self):
+        """Test a request costing more than the capacity is always refused"""
+        self.assertEqual(self.store.take("key", 2, 1, cost=5, now=100), 2)
+        self.assertEqual(self.store.take("key", 2, 1, cost=2, now=100), 0)
+
+    def test_board_size(self):
+        """Test the board size of the create requests"""
+        self.assertEqual(board_size({"mode": GameMode.EASY}), "small")
+        self.assertEqual(board_size({"mode": GameMode.HARD}), "medium")
+        self.assertEqual(
+            board_size({"mode": GameMode.CUSTOM, "rows": 50, "columns": 50}), "large"
+        )
+        self.assertEqual(board_size({"mode": GameMode.CUSTOM}), "small")
+
+    def test_default_bulk_rate_allows_max_games(self):
+        """Test the default bulk rate allows the largest bulk creation"""
+        capacity, _ = parse_rate(django_settings.THROTTLE_RATES["bulk"])
+
+        self.assertGreaterEqual(capacity, django_settings.BULK_CREATE_MAX_GAMES)
+
+
+class ThrottlingTest(TestCase):
+    """Test module for the throttling of the game endpoints"""
+
+    def setUp(self):
+        """set up test enabling the throttling on a temporary file"""
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        settings = override_settings(
+            THROTTLE_ENABLED=True,
+            THROTTLE_DB=os.path.join(directory.name, "throttle.sqlite3"),
+            THROTTLE_RATES=RATES,
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.client = APIClient()
+        self.url_list = reverse("game-list")
+
+    def _rejections(self, scope):
+        return metrics.THROTTLED_REQUESTS.samples.get((scope,), 0)
+
+    def test_create_throttled_by_board_size(self):
+        """Test the large boards have their own create limit"""
+        large = {"mode": GameMode.CUSTOM, "rows": 30, "columns": 30, "mines": 10}
+        rejections = self._rejections("create_large")
+
+        response = self.client.post(self.url_list, large, format="json")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        response = self.client.post(self.url_list, large, format="json")
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(response["Retry-After"], "60")
+        self.assertEqual(self._rejections("create_large"), rejections + 1)
+
+        response = self.client.post(
+            self.url_list, {"mode": GameMode.EASY}, format="json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+    def test_forwarded_for_cannot_be_spoofed(self):
+        """Test a client sending a new X-Forwarded-For on each request is limited"""
+        data = {"mode": GameMode.CUSTOM, "rows": 30, "columns": 30, "mines": 10}
+
+        for index, expected in enumerate(
+            (status.HTTP_201_CREATED, status.HTTP_429_TOO_MANY_REQUESTS)
+        ):
+            response = self.client.post(
+                self.url_list,
+                data,
+                format="json",
+                HTTP_X_FORWARDED_FOR=f"10.0.0.{index}",
+            )
+            self.assertEqual(response.status_code, expected)
+
+    @override_settings(REST_FRAMEWORK={"NUM_PROXIES": 1})
+    def test_client_behind_proxy(self):
+        """Test the client address is the one added by the proxy"""
+        data = {"mode": GameMode.CUSTOM, "rows": 30, "columns": 30, "mines": 10}
+
+        for index, expected in enumerate(
+            (status.HTTP_201_CREATED, status.HTTP_429_TOO_MANY_REQUESTS)
+        ):
+            response = self.client.post(
+                self.url_list,
+                data,
+                format="json",
+                HTTP_X_FORWARDED_FOR=f"10.0.0.{index}, 203.0.113.7",
+            )
+            self.assertEqual(response.status_code, expected)
+        response = self.client.post(
+            self.url_list,
+            data,
+            format="json",
+            HTTP_X_FORWARDED_FOR="203.0.113.8",
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+    def test_bulk_takes_one_token_per_game(self):
+        """Test a bulk creation counts every game it creates in its own bucket"""
+        url = reverse("game-bulk")
+
+        response = self.client.post(url, {"users": ["ana", "bob"]}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        response = self.client.post(url, {"users": ["eve", "joe"]}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(response["Retry-After"], "20")
+
+        response = self.client.post(
+            self.url_list, {"mode": GameMode.EASY}, format="json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+    def test_bulk_above_max_games_rejected(self):
+        """Test a bulk creation of too many games is rejected, not throttled"""
+        users = [
+            f"user{index}" for index in range(django_settings.BULK_CREATE_MAX_GAMES + 1)
+        ]
+
+        with override_settings(THROTTLE_RATES={**RATES, "bulk": "1000/hour"}):
+            response = self.client.post(
+                reverse("game-bulk"), {"users": users}, format="json"
+            )
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Game.objects.exists())
+
+    def test_moves_throttled_per_game(self):
+        """Test the moves of a game are limited whoever plays them"""
+        games = []
+        for _ in range(2):
+            game = Game.objects.create(rows=3, columns=3, mines=1, mode=GameMode.CUSTOM)
+            GameService.initialize_cells(game)
+            games.append(game)
+        data = {"row": 0, "column": 0}
+
+        for _ in range(2):
+            response = self.client.post(
+                reverse("game-flag", args=[games[0].id]), data, format="json"
+            )
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+        other_client = APIClient(REMOTE_ADDR="10.0.0.2")
+        response = other_client.post(
+            reverse("game-flag", args=[games[0].id]), data, format="json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(response["Retry-After"], "30")
+
+        response = self.client.post(
+            reverse("game-flag", args=[games[1].id]), data, format="json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_moves_throttled_per_game_id(self):
+        """Test the moves of a game share its bucket however its id is written"""
+        game = Game.objects.create(rows=3, columns=3, mines=1, mode=GameMode.CUSTOM)
+        GameService.initialize_cells(game)
+        data = {"row": 0, "column": 0}
+
+        for game_id in (game.id, f"0{game.id}", f"00{game.id}"):
+            response = self.client.post(
+                f"/api/games/{game_id}/flag/", data, format="json"
+            )
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+        response = self.client.post("/api/games/x/flag/", data, format="json")
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    @override_settings(THROTTLE_ENABLED=False)
+    def test_throttling_disabled(self):
+        """Test the limits are not enforced when the throttling is disabled"""
+        for _ in range(3):
+            response = self.client.post(
+                self.url_list, {"mode": GameMode.EASY}, format="json"
+            )
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
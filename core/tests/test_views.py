@@ -1,4 +1,4 @@
-from django.test import TestCase
+from django.test import TestCase, override_settings
 from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APIClient
@@ -36,6 +36,18 @@ class GameViewSetTest(TestCase):
         self.assertEqual(response.status_code, status.HTTP_201_CREATED)
         self.assertEqual(Game.objects.count(), 2)
 
+    def test_game_hides_bookkeeping_flags(self):
+        """Test the stats and analytics flags are not part of the game payloads"""
+        created = self.client.post(
+            self.url_list, {"mode": GameMode.EASY}, format="json"
+        )
+        retrieved = self.client.get(reverse("game-detail", args=[self.game.id]))
+
+        for response in (created, retrieved):
+            self.assertNotIn("stats_recorded", response.data)
+            self.assertNotIn("analytics_recorded", response.data)
+            self.assertIn("duration", response.data)
+
     def test_create_game_custom_mode(self):
         """Test creating a new game with custom mode"""
         data = {"rows": 5, "columns": 5, "mines": 2, "mode": GameMode.CUSTOM}
@@ -45,6 +57,34 @@ class GameViewSetTest(TestCase):
         self.assertEqual(response.status_code, status.HTTP_201_CREATED)
         self.assertEqual(Game.objects.count(), 2)
 
+    def test_create_no_guess_game(self):
+        """Test creating a no-guess game starts with an opening revealed"""
+        data = {"mode": GameMode.HARD, "no_guess": True}
+
+        response = self.client.post(self.url_list, data, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertTrue(response.data["no_guess"])
+        revealed = [cell for cell in response.data["cells"] if cell["is_revealed"]]
+        self.assertGreaterEqual(len(revealed), 9)
+        start = next(
+            cell for cell in revealed if (cell["row"], cell["column"]) == (15, 8)
+        )
+        self.assertEqual(start["adjacent_mines"], 0)
+        game = Game.objects.get(id=response.data["id"])
+        self.assertEqual(game.cells.filter(is_mine=True).count(), 99)
+
+    @override_settings(NO_GUESS_TIME_BUDGET=0)
+    def test_create_no_guess_game_fallback(self):
+        """Test a no-guess game out of time budget is created as a regular game"""
+        data = {"mode": GameMode.HARD, "no_guess": True}
+
+        response = self.client.post(self.url_list, data, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertFalse(response.data["no_guess"])
+        self.assertFalse(Game.objects.get(id=response.data["id"]).no_guess)
+
     def test_update_user_game(self):
         """Test updating an existing game with its user"""
         url = reverse("game-detail", args=[self.game.id])
@@ -214,6 +254,29 @@ class GameViewSetTest(TestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(response.data["status"], GameStatus.LOST)
 
+    def test_reveal_mine_cell_reveals_all_cells_after_commit(self):
+        """Test all cells are revealed by a task once the move is committed"""
+        mine_cell = Cell.objects.filter(game=self.game, is_mine=True).first()
+        data = {"row": mine_cell.row, "column": mine_cell.column}
+
+        with self.settings(TASK_BACKEND="immediate"):
+            with self.captureOnCommitCallbacks() as callbacks:
+                response = self.client.post(self.url_reveal, data, format="json")
+
+            for cell in response.data["cells"]:
+                self.assertTrue(cell["is_revealed"])
+                self.assertIsNotNone(cell["is_mine"])
+            self.assertTrue(
+                Cell.objects.filter(game=self.game, is_revealed=False).exists()
+            )
+
+            for callback in callbacks:
+                callback()
+
+        self.assertFalse(
+            Cell.objects.filter(game=self.game, is_revealed=False).exists()
+        )
+
     def test_reveal_cell_inactive_game(self):
         """Test revealing a cell in an inactive game"""
         self.game.status = GameStatus.WON
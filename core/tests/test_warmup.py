@@ -0,0 +1,55 @@
+from unittest import mock
+
+from django.db import connection
+from django.test import TestCase
+from django.urls import clear_url_caches, get_resolver
+
+from core import metrics
+from core.serializers import GameSerializer
+from core.tasks import _get_backend
+from minesweeper.warmup import after_fork, warm_up, warm_up_serializers
+
+
+class WarmUpTest(TestCase):
+    """Test module for the warm-up of the workers"""
+
+    def test_warm_up(self):
+        """Test the routes are built and the connections opened"""
+        clear_url_caches()
+
+        with mock.patch.object(
+            connection, "ensure_connection", wraps=connection.ensure_connection
+        ) as ensure_connection:
+            self.assertGreater(warm_up(), 0)
+
+        self.assertTrue(get_resolver()._populated)
+        self.assertTrue(get_resolver()._reverse_dict)
+        ensure_connection.assert_called_once()
+        self.assertIsNotNone(connection.connection)
+
+    def test_warm_up_without_databases(self):
+        """Test the connections are not opened for a process which forks"""
+        with mock.patch.object(connection, "ensure_connection") as ensure_connection:
+            warm_up(databases=False)
+
+        ensure_connection.assert_not_called()
+
+    def test_warm_up_serializers(self):
+        """Test the fields of every serializer are built"""
+        serializers = warm_up_serializers()
+
+        self.assertIn(GameSerializer, [type(serializer) for serializer in serializers])
+        for serializer in serializers:
+            self.assertIn("fields", serializer.__dict__)
+
+    def test_after_fork_resets_process_state(self):
+        """Test a forked worker starts with its own metrics and task backend"""
+        metrics.GAMES_FINISHED.inc(mode="easy", status="won")
+        process_id = metrics.registry.process_id
+        backend = _get_backend("thread")
+
+        after_fork()
+
+        self.assertNotEqual(metrics.registry.process_id, process_id)
+        self.assertEqual(metrics.GAMES_FINISHED.samples, {})
+        self.assertIsNot(_get_backend("thread"), backend)
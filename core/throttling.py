@@ -0,0 +1,240 @@
+"""
+Rate limiting of the game endpoints with token buckets.
+
+A rate of `N/period` is a bucket of N tokens refilled at N tokens per period,
+so a client can send bursts of N requests. The buckets are rows of a SQLite
+file, `THROTTLE_DB`, which every worker process of the machine updates in an
+immediate transaction, so the limits hold whichever worker serves a request.
+If the file cannot be used, the requests are let through.
+
+The limits, set in `THROTTLE_RATES`, are:
+* `client`: the requests of a client to the game endpoints
+* `create_small`, `create_medium` and `create_large`: the games created by a
+  client, by board size
+* `bulk`: the games created by the bulk creations of a client, one token each
+* `move`: the reveals and flags of a game, whoever plays them
+"""
+
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+from django.conf import settings
+from rest_framework.throttling import BaseThrottle
+
+from . import metrics
+from .serializers import GAME_CONFIG
+
+logger = logging.getLogger("minesweeper.throttling")
+
+PERIODS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+# Boards up to these numbers of cells are small and medium, the others large
+SMALL_BOARD_CELLS = 100
+MEDIUM_BOARD_CELLS = 500
+
+# Buckets untouched for this many seconds are full again and can be deleted
+PURGE_AGE = PERIODS["d"]
+PURGE_EVERY = 1000
+
+
+def parse_rate(rate):
+    """
+    Parse a rate like `30/min`.
+
+    Returns:
+        tuple: The capacity of the bucket and its refill rate per second.
+    """
+    count, period = rate.split("/")
+    count = int(count)
+    return count, count / PERIODS[period[0]]
+
+
+class TokenBucketStore:
+    """Token buckets in a SQLite file shared by the processes of the machine."""
+
+    def __init__(self, path):
+        self.path = path
+        self.local = threading.local()
+        self.takes = 0
+
+    def _connection(self):
+        """Return the connection of the thread, reconnecting in forked processes."""
+        if getattr(self.local, "pid", None) != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=1, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS bucket "
+                "(key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)"
+            )
+            self.local.connection = connection
+            self.local.pid = os.getpid()
+        return self.local.connection
+
+    def take(self, key, capacity, rate, cost=1, now=None):
+        """
+        Take tokens from a bucket.
+
+        Args:
+            key (str): The key of the bucket.
+            capacity (int): The number of tokens of a full bucket.
+            rate (float): The number of tokens added per second.
+            cost (int): The number of tokens to take. Taking more tokens than
+                the capacity is always refused.
+            now (float): The current time, `time.time()` by default.
+
+        Returns:
+            float: 0 if the tokens were taken, otherwise the seconds to wait
+                until the bucket holds enough tokens, or is full if it can
+                never hold them.
+        """
+        if cost > capacity:
+            return capacity / rate
+        now = time.time() if now is None else now
+        connection = self._connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            row = connection.execute(
+                "SELECT tokens, updated FROM bucket WHERE key = ?", (key,)
+            ).fetchone()
+            tokens = capacity
+            if row is not None:
+                tokens = min(capacity, row[0] + max(now - row[1], 0) * rate)
+            wait = 0.0
+            if tokens >= cost:
+                tokens -= cost
+            else:
+                wait = (cost - tokens) / rate
+            connection.execute(
+                "INSERT INTO bucket (key, tokens, updated) VALUES (?, ?, ?) "
+                "ON CONFLICT (key) DO UPDATE "
+                "SET tokens = excluded.tokens, updated = excluded.updated",
+                (key, tokens, now),
+            )
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        self.takes += 1
+        if self.takes % PURGE_EVERY == 0:
+            connection.execute(
+                "DELETE FROM bucket WHERE updated < ?", (now - PURGE_AGE,)
+            )
+        return wait
+
+    def clear(self):
+        """Delete every bucket."""
+        self._connection().execute("DELETE FROM bucket")
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_store():
+    """Return the token bucket store of the `THROTTLE_DB` file."""
+    with _stores_lock:
+        store = _stores.get(settings.THROTTLE_DB)
+        if store is None:
+            store = _stores[settings.THROTTLE_DB] = TokenBucketStore(
+                settings.THROTTLE_DB
+            )
+        return store
+
+
+def board_size(data):
+    """Return `small`, `medium` or `large` for the board of a create request."""
+    board = GAME_CONFIG.get(data.get("mode"))
+    try:
+        if board is not None:
+            cells = board["rows"] * board["columns"]
+        else:
+            cells = int(data.get("rows")) * int(data.get("columns"))
+    except (TypeError, ValueError):
+        # Invalid boards are rejected by the serializers
+        return "small"
+    if cells <= SMALL_BOARD_CELLS:
+        return "small"
+    if cells <= MEDIUM_BOARD_CELLS:
+        return "medium"
+    return "large"
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """Base class of the throttles taking a token of a bucket for every request."""
+
+    def get_bucket(self, request, view):
+        """
+        Return the bucket of a request, or None if the request is not throttled.
+
+        Returns:
+            tuple: The scope of the rate, the key of the bucket and the number
+                of tokens to take.
+        """
+        raise NotImplementedError
+
+    def allow_request(self, request, view):
+        self.delay = 0
+        if not settings.THROTTLE_ENABLED:
+            return True
+        bucket = self.get_bucket(request, view)
+        if bucket is None:
+            return True
+        scope, key, cost = bucket
+        capacity, rate = parse_rate(settings.THROTTLE_RATES[scope])
+        try:
+            self.delay = get_store().take(f"{scope}:{key}", capacity, rate, cost)
+        except sqlite3.Error:
+            logger.exception("Failed to throttle a request, letting it through")
+            return True
+        if self.delay:
+            metrics.THROTTLED_REQUESTS.inc(scope=scope)
+            return False
+        return True
+
+    def wait(self):
+        return self.delay
+
+
+class ClientThrottle(TokenBucketThrottle):
+    """Limit the requests of a client."""
+
+    def get_bucket(self, request, view):
+        return "client", self.get_ident(request), 1
+
+
+class GameCreateThrottle(TokenBucketThrottle):
+    """
+    Limit the games created by a client, with a rate for each board size.
+
+    The bulk creations have their own bucket, from which they take a token per
+    game. The lists of more than `BULK_CREATE_MAX_GAMES` users are rejected by
+    the serializer, so they are charged that many tokens only.
+    """
+
+    def get_bucket(self, request, view):
+        if view.action == "create":
+            return f"create_{board_size(request.data)}", self.get_ident(request), 1
+        if view.action == "bulk":
+            users = request.data.get("users")
+            cost = len(users) if isinstance(users, list) and users else 1
+            cost = min(cost, settings.BULK_CREATE_MAX_GAMES)
+            return "bulk", self.get_ident(request), cost
+        return None
+
+
+class GameMoveThrottle(TokenBucketThrottle):
+    """Limit the reveals and flags of a game."""
+
+    def get_bucket(self, request, view):
+        if view.action not in ("reveal", "flag"):
+            return None
+        try:
+            game_id = int(view.kwargs[view.lookup_field])
+        except ValueError:
+            # Invalid ids are answered with a 404
+            return None
+        return "move", game_id, 1
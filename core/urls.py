@@ -1,12 +1,20 @@
 from django.urls import include, path
 from rest_framework.routers import DefaultRouter
 
-from core.views import GameViewSet
+from core.views import (
+    AnalyticsViewSet,
+    GameViewSet,
+    PlayerStatsViewSet,
+    metrics_view,
+)
 
 
 router = DefaultRouter()
 router.register(r"games", GameViewSet, basename="game")
+router.register(r"players", PlayerStatsViewSet, basename="player")
+router.register(r"analytics", AnalyticsViewSet, basename="analytics")
 
 urlpatterns = [
+    path("metrics/", metrics_view, name="metrics"),
     path("", include(router.urls)),
 ]
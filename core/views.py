@@ -1,23 +1,145 @@
+import json
+from time import perf_counter, time
+
+from django.conf import settings
+from django.http import Http404, HttpResponse, StreamingHttpResponse
 from rest_framework.decorators import action
+from rest_framework.permissions import SAFE_METHODS
 from rest_framework.response import Response
-from rest_framework.status import HTTP_400_BAD_REQUEST
-from rest_framework.viewsets import ModelViewSet
+from rest_framework.status import HTTP_201_CREATED, HTTP_400_BAD_REQUEST
+from rest_framework.mixins import RetrieveModelMixin
+from rest_framework.viewsets import GenericViewSet, ModelViewSet
+
+from minesweeper.routers import replica_reads
 
-from .constants import GAME_NOT_ACTIVE
-from .models import Game, GameStatus, GameMode
-from .serializers import GameSerializer, LeaderboardGameSerializer
+from . import metrics
+from .constants import GAME_NOT_ACTIVE, INVALID_REPLAY_START
+from .analytics import period_start, total_rollups
+from .export import export_games, gzip_stream, ndjson
+from .models import Game, GameRollup, GameStatus, GameMode, PlayerStats
+from .movelog import replay
+from .serializers import (
+    AnalyticsQuerySerializer,
+    BulkGameSerializer,
+    ExportQuerySerializer,
+    GameRollupSerializer,
+    GameSerializer,
+    GameSummarySerializer,
+    LeaderboardGameSerializer,
+    PlayerStatsSerializer,
+)
 from .services import GameService
+from .sharding import all_games, game_queryset, top_games
+from .stats import enqueue_stats_update
+from .throttling import ClientThrottle, GameCreateThrottle, GameMoveThrottle
+
+
+# Cookie holding the time of the last write of a client to the games
+LAST_WRITE_COOKIE = "last_write"
 
 
 class GameViewSet(ModelViewSet):
     queryset = Game.objects.all()
     serializer_class = GameSerializer
+    throttle_classes = [ClientThrottle, GameCreateThrottle, GameMoveThrottle]
+    metrics_mode = ""
+
+    def dispatch(self, request, *args, **kwargs):
+        """Record the duration of every action in the metrics registry."""
+        start = perf_counter()
+        response = super().dispatch(request, *args, **kwargs)
+        metrics.ACTION_DURATION.observe(
+            perf_counter() - start,
+            action=self.action or "unknown",
+            mode=self.metrics_mode,
+        )
+        return response
+
+    def get_queryset(self):
+        """Return the games of the shard of the requested game."""
+        if self.detail:
+            try:
+                return game_queryset(self.kwargs[self.lookup_field])
+            except ValueError:
+                raise Http404
+        return super().get_queryset()
+
+    def list(self, request, *args, **kwargs):
+        """List the games of every shard from a read replica."""
+        with replica_reads():
+            games = all_games()
+            return Response(self.get_serializer(games, many=True).data)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        """Remember the time of the successful writes of the client."""
+        response = super().finalize_response(request, response, *args, **kwargs)
+        if request.method not in SAFE_METHODS and response.status_code < 400:
+            response.set_cookie(
+                LAST_WRITE_COOKIE,
+                str(time()),
+                max_age=settings.REPLICA_STICKY_SECONDS,
+                httponly=True,
+                samesite="Lax",
+            )
+        return response
+
+    def retrieve(self, request, *args, **kwargs):
+        """
+        Retrieve a finished game from a read replica.
+
+        Active games, and the games of a client which wrote in the last
+        `REPLICA_STICKY_SECONDS`, are read from the primary database so
+        players always see their last move, however far the replica lags.
+        """
+        if settings.DATABASE_REPLICAS and not self._wrote_recently(request):
+            with replica_reads():
+                try:
+                    game = self.get_object()
+                except Http404:
+                    game = None
+                if game is not None and not game.is_active():
+                    return Response(self.get_serializer(game).data)
+        return super().retrieve(request, *args, **kwargs)
+
+    @staticmethod
+    def _wrote_recently(request):
+        """Return True if the client wrote in the last `REPLICA_STICKY_SECONDS`."""
+        try:
+            last_write = float(request.COOKIES[LAST_WRITE_COOKIE])
+        except (KeyError, ValueError):
+            return False
+        return time() - last_write < settings.REPLICA_STICKY_SECONDS
 
     def perform_create(self, serializer):
         """Initialize the cells of the game after creation."""
         game = serializer.save()
+        self.metrics_mode = game.mode
         GameService.initialize_cells(game)
 
+    def perform_update(self, serializer):
+        """Count a finished game in the player stats once its user is set."""
+        game = serializer.save()
+        enqueue_stats_update(game)
+
+    @action(detail=False, methods=["post"])
+    def bulk(self, request):
+        """
+        Create a game for each of the `users`.
+
+        The games share one board unless `shared_layout` is false, and daily
+        challenge games always share the board of the day.
+        """
+        serializer = BulkGameSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        config = dict(serializer.validated_data)
+        users = config.pop("users")
+        shared_layout = config.pop("shared_layout")
+        self.metrics_mode = config["mode"]
+        games = GameService.create_games(users, config, shared_layout)
+        return Response(
+            GameSummarySerializer(games, many=True).data, status=HTTP_201_CREATED
+        )
+
     def _process_cell_action(self, request, cell_action):
         """Process a cell action (flag or reveal) on a game."""
         row = request.data.get("row")
@@ -42,6 +164,53 @@ class GameViewSet(ModelViewSet):
         data, status_code = self._process_cell_action(request, GameService.reveal_cell)
         return Response(data, status=status_code)
 
+    @action(detail=True, methods=["get"])
+    def replay(self, request, pk=None):
+        """
+        Stream the moves of the game as NDJSON.
+
+        The first line is the board after the first `from` moves (0 by
+        default), rebuilt from the closest snapshot, followed by one line for
+        each of the following moves.
+        """
+        try:
+            start = int(request.query_params.get("from", 0))
+        except ValueError:
+            start = -1
+        if start < 0:
+            return Response(INVALID_REPLAY_START, status=HTTP_400_BAD_REQUEST)
+        game = self.get_object()
+        lines = (json.dumps(line) + "\n" for line in replay(game, start))
+        return StreamingHttpResponse(lines, content_type="application/x-ndjson")
+
+    @action(detail=False, methods=["get"])
+    def export(self, request):
+        """
+        Stream the finished games as NDJSON, one game per line.
+
+        The query params are the `since` and `until` finish dates, `mode`,
+        `boards` to add the board of every game, and `gzip` to compress the
+        stream.
+        """
+        query = ExportQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        options = query.validated_data
+        lines = ndjson(
+            export_games(
+                since=options.get("since"),
+                until=options.get("until"),
+                mode=options.get("mode"),
+                boards=options["boards"],
+            )
+        )
+        if not options["gzip"]:
+            return StreamingHttpResponse(lines, content_type="application/x-ndjson")
+        response = StreamingHttpResponse(
+            gzip_stream(lines), content_type="application/gzip"
+        )
+        response["Content-Disposition"] = 'attachment; filename="games.ndjson.gz"'
+        return response
+
     @action(detail=False, methods=["get"])
     def leaderboard(self, request):
         """
@@ -52,10 +221,71 @@ class GameViewSet(ModelViewSet):
 
         modes = [GameMode.EASY, GameMode.MEDIUM, GameMode.HARD, GameMode.CUSTOM]
         leaderboards = {}
-        for mode in modes:
-            leaderboard = Game.objects.filter(
-                status=GameStatus.WON, mode=mode
-            ).order_by("duration")[:size]
-            leaderboards[mode] = LeaderboardGameSerializer(leaderboard, many=True).data
+        with replica_reads():
+            for mode in modes:
+                leaderboard = top_games(
+                    lambda games: games.filter(
+                        status=GameStatus.WON, mode=mode
+                    ).order_by("duration"),
+                    key=lambda game: game.duration,
+                    size=size,
+                )
+                leaderboards[mode] = LeaderboardGameSerializer(
+                    leaderboard, many=True
+                ).data
 
         return Response(leaderboards)
+
+
+class PlayerStatsViewSet(RetrieveModelMixin, GenericViewSet):
+    """Retrieve the stats of a player by their user name."""
+
+    queryset = PlayerStats.objects.all()
+    serializer_class = PlayerStatsSerializer
+    lookup_field = "user"
+    lookup_value_regex = "[^/]+"
+
+
+class AnalyticsViewSet(GenericViewSet):
+    """Aggregate the finished games from the hourly and daily rollups."""
+
+    queryset = GameRollup.objects.all()
+    serializer_class = GameRollupSerializer
+
+    def list(self, request):
+        """
+        Return the rollups of a period between two dates, and their totals by mode.
+
+        The query params are `period` (`hour` or `day`, the default), `mode`,
+        and the `since` and `until` dates, defaulting to the last 30 days.
+        """
+        query = AnalyticsQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        filters = query.validated_data
+        with replica_reads():
+            rollups = self.get_queryset().filter(
+                period=filters["period"],
+                start__gte=period_start(filters["since"], filters["period"]),
+                start__lt=filters["until"],
+            )
+            if "mode" in filters:
+                rollups = rollups.filter(mode=filters["mode"])
+            rollups = list(rollups.order_by("start", "mode"))
+        totals = total_rollups(rollups, filters["since"])
+        return Response(
+            {
+                "rollups": self.get_serializer(rollups, many=True).data,
+                "totals": {
+                    mode: self.get_serializer(total).data
+                    for mode, total in totals.items()
+                },
+            }
+        )
+
+
+def metrics_view(request):
+    """Export the metrics of every worker in the Prometheus text format."""
+    return HttpResponse(
+        metrics.registry.render(),
+        content_type="text/plain; version=0.0.4; charset=utf-8",
+    )
@@ -0,0 +1,81 @@
+"""
+gunicorn settings of the production server.
+
+The application is preloaded and warmed up in the master before the workers
+are forked, so they start without importing Django again and serve their first
+request with built routes and serializers. The master closes its database
+connections before forking, and each worker opens its own before accepting
+requests.
+
+The workers share their metrics in `METRICS_DIR`, a directory of the machine
+by default, whose snapshots of the previous runs are deleted at startup.
+"""
+
+import os
+import tempfile
+from pathlib import Path
+from time import perf_counter
+
+_started = perf_counter()
+
+bind = f":{os.environ.get('PORT', '8000')}"
+workers = int(os.environ.get("WEB_CONCURRENCY", 2))
+preload_app = True
+
+# Read by the settings, which are loaded after this file
+os.environ.setdefault(
+    "METRICS_DIR", os.path.join(tempfile.gettempdir(), "minesweeper-metrics")
+)
+
+
+def on_starting(server):
+    """Delete the metrics snapshots of the previous runs of the server."""
+    if not os.environ["METRICS_DIR"]:
+        return
+    for path in Path(os.environ["METRICS_DIR"]).glob("*.json"):
+        path.unlink(missing_ok=True)
+
+
+def when_ready(server):
+    """Warm up the preloaded application before the workers are forked."""
+    if not server.cfg.preload_app:
+        return
+    from django.db import connections
+
+    from minesweeper.warmup import warm_up
+
+    duration = warm_up(databases=False)
+    connections.close_all()
+    server.log.info(
+        "Warmed up in %.1f ms, ready %.1f ms after starting",
+        duration * 1000,
+        (perf_counter() - _started) * 1000,
+    )
+
+
+def pre_fork(server, worker):
+    """Make sure no database connection of the master is inherited."""
+    from django.db import connections
+
+    connections.close_all()
+
+
+def post_fork(server, worker):
+    """Reset the state the worker inherits from the master."""
+    from minesweeper.warmup import after_fork
+
+    after_fork()
+
+
+def post_worker_init(worker):
+    """Open the database connections before the worker accepts requests."""
+    from minesweeper.warmup import warm_up, warm_up_connections
+
+    start = perf_counter()
+    if worker.cfg.preload_app:
+        warm_up_connections()
+    else:
+        warm_up()
+    worker.log.info(
+        "Worker %s warmed up in %.1f ms", worker.pid, (perf_counter() - start) * 1000
+    )
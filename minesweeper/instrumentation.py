@@ -0,0 +1,99 @@
+"""
+Per-request timing instrumentation.
+
+A `RequestTimer` is bound to the current request by `ServerTimingMiddleware`.
+Code running inside the request can attribute time to named phases with
+`timed()`, which is a no-op outside of an instrumented request.
+"""
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from time import perf_counter
+
+_current_timer = ContextVar("request_timer", default=None)
+
+
+class RequestTimer:
+    """Accumulate database and phase timings for a single request."""
+
+    def __init__(self):
+        self.queries = 0
+        self.query_time = 0.0
+        self.phases = {}
+
+    def add(self, phase, duration):
+        """Add `duration` seconds to the given phase."""
+        self.phases[phase] = self.phases.get(phase, 0.0) + duration
+
+    def query_wrapper(self, execute, sql, params, many, context):
+        """Database execute wrapper counting queries and their duration."""
+        start = perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.query_time += perf_counter() - start
+
+    def server_timing(self, total):
+        """
+        Build the value of the `Server-Timing` header.
+
+        Args:
+            total (float): The total request duration in seconds.
+
+        Returns:
+            str: The header value, with durations in milliseconds.
+        """
+        metrics = [f'db;dur={self.query_time * 1000:.2f};desc="{self.queries} queries"']
+        metrics += [
+            f"{phase};dur={duration * 1000:.2f}"
+            for phase, duration in self.phases.items()
+        ]
+        metrics.append(f"total;dur={total * 1000:.2f}")
+        return ", ".join(metrics)
+
+    def as_dict(self, total):
+        """Return the collected timings in milliseconds."""
+        return {
+            "queries": self.queries,
+            "db_ms": round(self.query_time * 1000, 2),
+            "phases_ms": {
+                phase: round(duration * 1000, 2)
+                for phase, duration in self.phases.items()
+            },
+            "total_ms": round(total * 1000, 2),
+        }
+
+
+def get_current_timer():
+    """Return the timer of the request being processed, if any."""
+    return _current_timer.get()
+
+
+def bind_timer(timer):
+    """Bind `timer` to the current context and return the reset token."""
+    return _current_timer.set(timer)
+
+
+def unbind_timer(token):
+    """Restore the timer that was bound before `bind_timer`."""
+    _current_timer.reset(token)
+
+
+@contextmanager
+def timed(phase):
+    """
+    Attribute the time spent in the block to `phase` of the current request.
+
+    Args:
+        phase (str): The name of the phase, e.g. `flood_fill`.
+    """
+    timer = _current_timer.get()
+    if timer is None:
+        yield
+        return
+    start = perf_counter()
+    try:
+        yield
+    finally:
+        timer.add(phase, perf_counter() - start)
@@ -0,0 +1,275 @@
+import cProfile
+import gzip
+import hmac
+import json
+import logging
+import random
+import re
+import time
+import uuid
+import zlib
+from contextlib import ExitStack
+from pathlib import Path
+from time import perf_counter, thread_time
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.utils.cache import patch_vary_headers
+
+from core import metrics
+
+from .instrumentation import (
+    RequestTimer,
+    bind_timer,
+    get_current_timer,
+    timed,
+    unbind_timer,
+)
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+logger = logging.getLogger("minesweeper.timing")
+
+
+class ServerTimingMiddleware:
+    """
+    Measure each request and report the timings.
+
+    Database query count and time, rendering time, the `GameService` phases and
+    the total time are sent back as `Server-Timing` headers and logged as a JSON
+    line. Requests slower than `SLOW_REQUEST_THRESHOLD_MS` are logged at INFO
+    level, the others at DEBUG level.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        timer = RequestTimer()
+        token = bind_timer(timer)
+        start = perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(timer.query_wrapper))
+                response = self.get_response(request)
+        finally:
+            unbind_timer(token)
+        total = perf_counter() - start
+
+        response["Server-Timing"] = timer.server_timing(total)
+        self._log(request, response, timer, total)
+        return response
+
+    def process_template_response(self, request, response):
+        """Time the rendering of DRF responses, which happens after the view."""
+        timer = get_current_timer()
+        start = perf_counter()
+
+        def record_render(rendered):
+            timer.add("render", perf_counter() - start)
+
+        response.add_post_render_callback(record_render)
+        return response
+
+    @staticmethod
+    def _log(request, response, timer, total):
+        level = logging.DEBUG
+        if total * 1000 >= settings.SLOW_REQUEST_THRESHOLD_MS:
+            level = logging.INFO
+        if not logger.isEnabledFor(level):
+            return
+        line = {
+            "method": request.method,
+            "path": request.path,
+            "status": response.status_code,
+            **timer.as_dict(total),
+        }
+        logger.log(level, json.dumps(line))
+
+
+class ProfilingMiddleware:
+    """
+    Run selected requests under cProfile and dump the stats to `PROFILING_DIR`.
+
+    A request is profiled when it sends the `X-Profile` header or the `profile`
+    query parameter with the `PROFILING_TOKEN` value, or any value if the user
+    is staff. Besides that, `PROFILING_SAMPLE_RATE` of the requests are
+    profiled at random. Only the last `PROFILING_MAX_DUMPS` dumps are kept, the
+    older ones are deleted. The middleware is only loaded when
+    `PROFILING_ENABLED`.
+    """
+
+    def __init__(self, get_response):
+        if not settings.PROFILING_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not self._should_profile(request):
+            return self.get_response(request)
+
+        profiler = cProfile.Profile()
+        response = profiler.runcall(self.get_response, request)
+        response["X-Profile-Id"] = self._dump(profiler, request)
+        return response
+
+    @staticmethod
+    def _should_profile(request):
+        flag = request.headers.get("X-Profile") or request.GET.get("profile")
+        if flag:
+            user = getattr(request, "user", None)
+            if user is not None and user.is_staff:
+                return True
+            token = settings.PROFILING_TOKEN
+            if token and hmac.compare_digest(flag.encode(), token.encode()):
+                return True
+        return random.random() < settings.PROFILING_SAMPLE_RATE
+
+    @staticmethod
+    def _dump(profiler, request):
+        slug = re.sub(r"[^A-Za-z0-9]+", "-", request.path).strip("-")
+        timestamp = time.strftime("%Y%m%dT%H%M%S")
+        profile_id = f"{timestamp}-{request.method}-{slug}-{uuid.uuid4().hex[:8]}"
+        directory = Path(settings.PROFILING_DIR)
+        directory.mkdir(parents=True, exist_ok=True)
+        profiler.dump_stats(directory / f"{profile_id}.prof")
+        ProfilingMiddleware._rotate(directory)
+        return profile_id
+
+    @staticmethod
+    def _rotate(directory):
+        """Delete the oldest dumps beyond `PROFILING_MAX_DUMPS`."""
+        dumps = []
+        for path in directory.glob("*.prof"):
+            try:
+                dumps.append((path.stat().st_mtime, path))
+            except FileNotFoundError:
+                # Deleted by another worker
+                continue
+        dumps.sort(reverse=True)
+        for _, path in dumps[settings.PROFILING_MAX_DUMPS :]:
+            path.unlink(missing_ok=True)
+
+
+class CompressionMiddleware:
+    """
+    Compress the API responses with brotli or gzip.
+
+    Brotli is used when the `brotli` package is installed and the client
+    accepts it, gzip otherwise. Only the JSON, NDJSON and plain text responses
+    are compressed, the HTML pages holding CSRF tokens are left alone, and
+    responses smaller than `COMPRESSION_MIN_SIZE` bytes are sent as they are.
+    The bytes saved and the CPU time spent compressing are recorded in the
+    metrics registry. The middleware is only loaded when `COMPRESSION_ENABLED`.
+    """
+
+    content_types = ("application/json", "application/x-ndjson", "text/plain")
+
+    def __init__(self, get_response):
+        if not settings.COMPRESSION_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if not self._is_compressible(response):
+            return response
+        patch_vary_headers(response, ("Accept-Encoding",))
+        encoding = self._encoding(request.headers.get("Accept-Encoding", ""))
+        if encoding is None:
+            return response
+
+        if response.streaming:
+            response.streaming_content = self._compress_stream(
+                response.streaming_content, encoding
+            )
+            del response.headers["Content-Length"]
+        else:
+            if len(response.content) < settings.COMPRESSION_MIN_SIZE:
+                return response
+            with timed("compress"):
+                start = thread_time()
+                compressed = self._compress(response.content, encoding)
+                cpu = thread_time() - start
+            self._observe(encoding, len(response.content), len(compressed), cpu)
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response["Content-Length"] = str(len(compressed))
+
+        etag = response.get("ETag")
+        if etag and etag.startswith('"'):
+            response["ETag"] = "W/" + etag
+        response["Content-Encoding"] = encoding
+        return response
+
+    def _is_compressible(self, response):
+        if response.has_header("Content-Encoding") or response.status_code == 206:
+            return False
+        content_type = response.get("Content-Type", "").split(";")[0].strip()
+        return content_type in self.content_types
+
+    @staticmethod
+    def _encoding(accept_encoding):
+        """Return the preferred encoding the client accepts, or None."""
+        accepted = {}
+        for item in accept_encoding.split(","):
+            name, _, params = item.partition(";")
+            quality = 1.0
+            params = params.strip()
+            if params.startswith("q="):
+                try:
+                    quality = float(params[2:])
+                except ValueError:
+                    quality = 0.0
+            accepted[name.strip().lower()] = quality
+        if brotli is not None and accepted.get("br", 0) > 0:
+            return "br"
+        if accepted.get("gzip", 0) > 0:
+            return "gzip"
+        return None
+
+    @staticmethod
+    def _compress(content, encoding):
+        if encoding == "br":
+            return brotli.compress(content, quality=settings.COMPRESSION_BROTLI_QUALITY)
+        return gzip.compress(content, compresslevel=settings.COMPRESSION_LEVEL, mtime=0)
+
+    def _compress_stream(self, chunks, encoding):
+        """Compress a streaming response, recording the metrics at its end."""
+        if encoding == "br":
+            compressor = brotli.Compressor(quality=settings.COMPRESSION_BROTLI_QUALITY)
+            compress, finish = compressor.process, compressor.finish
+        else:
+            compressor = zlib.compressobj(
+                settings.COMPRESSION_LEVEL, zlib.DEFLATED, zlib.MAX_WBITS | 16
+            )
+            compress, finish = compressor.compress, compressor.flush
+        size = compressed_size = 0
+        cpu = 0.0
+        for chunk in chunks:
+            start = thread_time()
+            compressed = compress(chunk)
+            cpu += thread_time() - start
+            size += len(chunk)
+            compressed_size += len(compressed)
+            if compressed:
+                yield compressed
+        start = thread_time()
+        compressed = finish()
+        cpu += thread_time() - start
+        compressed_size += len(compressed)
+        self._observe(encoding, size, compressed_size, cpu)
+        yield compressed
+
+    @staticmethod
+    def _observe(encoding, size, compressed_size, cpu):
+        metrics.COMPRESSION_SAVED_BYTES.inc(
+            max(size - compressed_size, 0), encoding=encoding
+        )
+        metrics.COMPRESSION_CPU_SECONDS.observe(cpu, encoding=encoding)
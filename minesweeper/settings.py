@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/3.2/ref/settings/
 """
 
 import os
+import tempfile
 from pathlib import Path
 from decouple import config, Csv
 from dj_database_url import parse as db_url
@@ -51,6 +52,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "minesweeper.middleware.ServerTimingMiddleware",
+    "minesweeper.middleware.CompressionMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "whitenoise.middleware.WhiteNoiseMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
@@ -58,6 +61,7 @@ MIDDLEWARE = [
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "minesweeper.middleware.ProfilingMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
@@ -82,6 +86,8 @@ TEMPLATES = [
 
 WSGI_APPLICATION = "minesweeper.wsgi.application"
 
+TEST_RUNNER = "minesweeper.test_runner.TestRunner"
+
 
 # Database
 # https://docs.djangoproject.com/en/3.2/ref/settings/#databases
@@ -91,6 +97,64 @@ DATABASES = {
     "default": config("DATABASE_URL", default=default_db_url, cast=db_url),
 }
 
+# Read replicas, used by the read-only endpoints (list, leaderboard and finished games)
+# Tests read the replicas from the default database
+
+DATABASE_REPLICAS = []
+for index, replica_url in enumerate(
+    config("DATABASE_REPLICA_URLS", default="", cast=Csv())
+):
+    alias = f"replica_{index}"
+    DATABASES[alias] = db_url(replica_url)
+    DATABASES[alias]["TEST"] = {"MIRROR": "default"}
+    DATABASE_REPLICAS.append(alias)
+
+# Shards holding the games and their cells, besides the default database
+# Games are placed on a shard by id, so the shards must be set up before creating games
+
+GAME_SHARDS = ["default"]
+for index, shard_url in enumerate(
+    config("DATABASE_SHARD_URLS", default="", cast=Csv())
+):
+    alias = f"shard_{index}"
+    DATABASES[alias] = db_url(shard_url)
+    GAME_SHARDS.append(alias)
+
+DATABASE_ROUTERS = [
+    "minesweeper.routers.ReplicaRouter",
+    "core.sharding.ShardRouter",
+]
+
+# Clients which wrote in the last seconds read the games from the primary database
+REPLICA_STICKY_SECONDS = config("REPLICA_STICKY_SECONDS", default=5, cast=int)
+
+# Database connections
+# Connections are kept open for DB_CONN_MAX_AGE seconds and checked before reuse.
+# With DB_POOL, Postgres connections are taken from a psycopg 3 connection pool
+# instead, which checks each connection it hands out with DB_CONN_HEALTH_CHECKS.
+# SQLite transactions take the write lock when they begin, so a transaction
+# waiting for another one waits for the lock instead of failing as locked.
+
+DB_CONN_MAX_AGE = config("DB_CONN_MAX_AGE", default=60, cast=int)
+DB_CONN_HEALTH_CHECKS = config("DB_CONN_HEALTH_CHECKS", default=True, cast=bool)
+DB_POOL = config("DB_POOL", default=False, cast=bool)
+DB_POOL_OPTIONS = {
+    "min_size": config("DB_POOL_MIN_SIZE", default=2, cast=int),
+    "max_size": config("DB_POOL_MAX_SIZE", default=4, cast=int),
+    "timeout": config("DB_POOL_TIMEOUT", default=10, cast=float),
+    "max_idle": config("DB_POOL_MAX_IDLE", default=300, cast=float),
+    "max_lifetime": config("DB_POOL_MAX_LIFETIME", default=3600, cast=float),
+}
+
+for database in DATABASES.values():
+    database["CONN_MAX_AGE"] = DB_CONN_MAX_AGE
+    database["CONN_HEALTH_CHECKS"] = DB_CONN_HEALTH_CHECKS
+    if database["ENGINE"] == "django.db.backends.sqlite3":
+        database.setdefault("OPTIONS", {})["transaction_mode"] = "IMMEDIATE"
+    if DB_POOL and database["ENGINE"] == "django.db.backends.postgresql":
+        database["CONN_MAX_AGE"] = 0
+        database.setdefault("OPTIONS", {})["pool"] = {**DB_POOL_OPTIONS}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/3.2/ref/settings/#auth-password-validators
@@ -147,3 +211,109 @@ CORS_ALLOWED_ORIGINS = config(
     default=["http://localhost:5173,http://127.0.0.1:5173"],
     cast=Csv(),
 )
+
+# Request instrumentation
+# Requests slower than this threshold are logged at INFO level
+
+SLOW_REQUEST_THRESHOLD_MS = config("SLOW_REQUEST_THRESHOLD_MS", default=500, cast=int)
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {
+        "console": {"class": "logging.StreamHandler"},
+    },
+    "loggers": {
+        "minesweeper": {
+            "handlers": ["console"],
+            "level": config("LOG_LEVEL", default="INFO"),
+        },
+    },
+}
+
+# Board generation
+# No-guess boards fall back to a random board after NO_GUESS_TIME_BUDGET seconds,
+# and bulk creations insert their cells in batches of BULK_CREATE_BATCH_SIZE.
+# The daily boards are seeded with DAILY_SEED_KEY, or SECRET_KEY if it is empty
+
+NO_GUESS_TIME_BUDGET = config("NO_GUESS_TIME_BUDGET", default=1.0, cast=float)
+BULK_CREATE_MAX_GAMES = config("BULK_CREATE_MAX_GAMES", default=500, cast=int)
+BULK_CREATE_BATCH_SIZE = config("BULK_CREATE_BATCH_SIZE", default=5000, cast=int)
+DAILY_SEED_KEY = config("DAILY_SEED_KEY", default="")
+
+# Move log
+# The moves are written in batches of MOVE_LOG_BATCH_SIZE, or after
+# MOVE_LOG_FLUSH_INTERVAL seconds, and a game is snapshotted every
+# MOVE_SNAPSHOT_INTERVAL moves. Moves are snapshotted MOVE_SNAPSHOT_DELAY seconds
+# after they are played, once every process has written them, so the delay must
+# be longer than the flush interval
+
+MOVE_LOG_BATCH_SIZE = config("MOVE_LOG_BATCH_SIZE", default=100, cast=int)
+MOVE_LOG_FLUSH_INTERVAL = config("MOVE_LOG_FLUSH_INTERVAL", default=2.0, cast=float)
+MOVE_SNAPSHOT_INTERVAL = config("MOVE_SNAPSHOT_INTERVAL", default=25, cast=int)
+MOVE_SNAPSHOT_DELAY = config("MOVE_SNAPSHOT_DELAY", default=10.0, cast=float)
+
+# Response compression
+# JSON, NDJSON and text responses of at least COMPRESSION_MIN_SIZE bytes are
+# compressed with brotli, when the brotli package is installed, or gzip
+
+COMPRESSION_ENABLED = config("COMPRESSION_ENABLED", default=True, cast=bool)
+COMPRESSION_MIN_SIZE = config("COMPRESSION_MIN_SIZE", default=1024, cast=int)
+COMPRESSION_LEVEL = config("COMPRESSION_LEVEL", default=6, cast=int)
+COMPRESSION_BROTLI_QUALITY = config("COMPRESSION_BROTLI_QUALITY", default=5, cast=int)
+
+# Throttling
+# Token buckets shared by the workers of the machine in the THROTTLE_DB SQLite file.
+# A rate of N/period allows bursts of N requests, refilled over the period.
+# Throttling is off in the test environment of the tests, benchmarks and load tests
+# A bulk creation takes a token of the bulk bucket per game, so THROTTLE_BULK_RATE
+# must allow at least BULK_CREATE_MAX_GAMES games, twice an hour by default
+
+THROTTLE_ENABLED = config("THROTTLE_ENABLED", default=True, cast=bool)
+THROTTLE_DB = config(
+    "THROTTLE_DB",
+    default=os.path.join(tempfile.gettempdir(), "minesweeper-throttle.sqlite3"),
+)
+THROTTLE_RATES = {
+    "client": config("THROTTLE_CLIENT_RATE", default="600/min"),
+    "create_small": config("THROTTLE_CREATE_SMALL_RATE", default="60/min"),
+    "create_medium": config("THROTTLE_CREATE_MEDIUM_RATE", default="30/min"),
+    "create_large": config("THROTTLE_CREATE_LARGE_RATE", default="10/min"),
+    "bulk": config("THROTTLE_BULK_RATE", default=f"{2 * BULK_CREATE_MAX_GAMES}/hour"),
+    "move": config("THROTTLE_MOVE_RATE", default="300/min"),
+}
+
+# Clients are identified by their address as seen by the last of the NUM_PROXIES
+# proxies in X-Forwarded-For (1 on fly.io), or by REMOTE_ADDR without proxies, so
+# they cannot choose their identity by sending the header
+
+REST_FRAMEWORK = {"NUM_PROXIES": config("NUM_PROXIES", default=0, cast=int)}
+
+# Metrics
+# Set METRICS_DIR to share the metrics between the processes, as gunicorn.conf.py
+# does for the gunicorn workers
+
+METRICS_DIR = config("METRICS_DIR", default="")
+METRICS_FLUSH_INTERVAL = config("METRICS_FLUSH_INTERVAL", default=5, cast=float)
+
+# Profiling
+# Requests sending the PROFILING_TOKEN in the X-Profile header or the profile
+# query param are profiled, as well as PROFILING_SAMPLE_RATE of all requests.
+# Only the last PROFILING_MAX_DUMPS dumps are kept
+
+PROFILING_ENABLED = config("PROFILING_ENABLED", default=False, cast=bool)
+PROFILING_DIR = config("PROFILING_DIR", default=str(BASE_DIR / "profiles"))
+PROFILING_SAMPLE_RATE = config("PROFILING_SAMPLE_RATE", default=0.0, cast=float)
+PROFILING_TOKEN = config("PROFILING_TOKEN", default="")
+PROFILING_MAX_DUMPS = config("PROFILING_MAX_DUMPS", default=200, cast=int)
+
+# Background tasks
+# TASK_BACKEND is one of immediate, thread or database (run by `manage.py run_tasks`)
+# A task run by `run_tasks` for more than TASK_LEASE_SECONDS is claimed again,
+# and the thread backend retries database errors after TASK_RETRY_DELAY seconds
+
+TASK_BACKEND = config("TASK_BACKEND", default="thread")
+TASK_THREADS = config("TASK_THREADS", default=2, cast=int)
+TASK_MAX_ATTEMPTS = config("TASK_MAX_ATTEMPTS", default=3, cast=int)
+TASK_LEASE_SECONDS = config("TASK_LEASE_SECONDS", default=300, cast=int)
+TASK_RETRY_DELAY = config("TASK_RETRY_DELAY", default=0.1, cast=float)
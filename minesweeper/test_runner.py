@@ -0,0 +1,18 @@
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+# Settings of the test environment, also used by `isolated_test_environment`
+TEST_SETTINGS = {"THROTTLE_ENABLED": False}
+
+
+class TestRunner(DiscoverRunner):
+    """Run the tests with the rate limits turned off."""
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self.test_settings = override_settings(**TEST_SETTINGS)
+        self.test_settings.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self.test_settings.disable()
+        super().teardown_test_environment(**kwargs)
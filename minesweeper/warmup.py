@@ -0,0 +1,100 @@
+"""
+Warm-up of the application before it serves traffic.
+
+With `preload_app`, the gunicorn master imports the project and warms up the
+routes and the serializers once, then forks the workers which share that
+work. Each worker opens its database connections before accepting requests.
+The state a worker must not share with the master, such as the metrics
+samples or the task threads, is reset after the fork.
+"""
+
+import inspect
+import logging
+from time import perf_counter
+
+from django.db import connections
+from django.urls import get_resolver, resolve
+from rest_framework.serializers import BaseSerializer
+
+logger = logging.getLogger("minesweeper.warmup")
+
+# Paths resolved once so the URL patterns of every endpoint are compiled
+WARM_UP_PATHS = (
+    "/api/games/",
+    "/api/games/1/",
+    "/api/games/1/reveal/",
+    "/api/games/1/flag/",
+    "/api/games/1/replay/",
+    "/api/games/bulk/",
+    "/api/games/export/",
+    "/api/games/leaderboard/",
+    "/api/players/player/",
+    "/api/analytics/",
+    "/api/metrics/",
+)
+
+
+def warm_up_routes():
+    """Build the URL resolver and compile the patterns of the endpoints."""
+    resolver = get_resolver()
+    resolver.reverse_dict
+    for path in WARM_UP_PATHS:
+        resolve(path)
+
+
+def warm_up_serializers():
+    """
+    Build the fields of every serializer of the API.
+
+    Returns:
+        list: The serializers built, one of each class.
+    """
+    from core import serializers
+
+    built = []
+    for _, serializer_class in inspect.getmembers(serializers, inspect.isclass):
+        if (
+            issubclass(serializer_class, BaseSerializer)
+            and serializer_class.__module__ == serializers.__name__
+        ):
+            serializer = serializer_class()
+            serializer.fields
+            built.append(serializer)
+    return built
+
+
+def warm_up_connections():
+    """Open the connections of every database of the process."""
+    for connection in connections.all():
+        try:
+            connection.ensure_connection()
+        except Exception:
+            logger.exception("Failed to connect to the %s database", connection.alias)
+
+
+def warm_up(databases=True):
+    """
+    Warm up the routes, the serializers and, optionally, the connections.
+
+    Args:
+        databases (bool): Open the database connections too. They must not be
+            opened in a process which forks workers afterwards.
+
+    Returns:
+        float: The duration of the warm-up in seconds.
+    """
+    start = perf_counter()
+    warm_up_routes()
+    warm_up_serializers()
+    if databases:
+        warm_up_connections()
+    return perf_counter() - start
+
+
+def after_fork():
+    """Reset the state a forked worker inherits from the master."""
+    from core.metrics import registry
+    from core.tasks import _get_backend
+
+    registry.reset()
+    _get_backend.cache_clear()